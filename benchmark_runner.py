@@ -0,0 +1,208 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import evolveGenerations
+from helpers.calculate_path_distance import calculate_path_distance
+from utils.problem_cache import CACHE_DIRECTORY
+from utils.telemetry import MetricsRecorder, TELEMETRY_GENERATIONS, TELEMETRY_OPERATORS
+from utils.gen_graph import Graph
+import comparison_algorithms
+import argparse
+import logging
+import signal
+import random
+import json
+import time
+import zlib
+import csv
+import os
+
+# Known optimal tour lengths of the TSPLIB instances in Files/
+OPTIMAL_SOLUTIONS = {
+    'ulysses16' : 6859,
+    'ulysses22' : 7013,
+    'st70'      : 675,
+    'rd100'     : 7910,
+    'gr202'     : 40160,
+    'pcb442'    : 50778,
+}
+
+ALGORITHMS = ('naive', 'held_karp', 'branch_and_bound', 'nn', 'greedy', 'double_tree', 'christofides', 'nx', 'ga', 'ga_opt')
+
+RESULT_FIELDS = ['problem', 'num_of_cities', 'run', 'algorithm', 'seed', 'status', 'cost', 'optimal', 'gap', 'wall_time', 'generations', 'error']
+
+# Worker process state, set once per worker by _initBenchmarkWorker
+_graphs = {}
+
+def loadProblem(file_path, cache_directory=CACHE_DIRECTORY):
+    """Load a TSPLIB .tsp file or a Files/graph_*.json coordinate list through the binary problem cache.
+
+    returns:
+        tuple: The problem name, the city coordinates, the distance matrix and the edge weight type (None for JSON graphs)
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    graph = Graph.__new__(Graph)
+    graph.lazy, graph.edge_weight_type = False, None
+    city_coordinates, matrix_graph = graph.loadCachedProblem(file_path, cache_directory)
+    return name, city_coordinates, matrix_graph, graph.edge_weight_type
+
+def expandJobs(problem_names, test_runs, algorithms, base_seed):
+    """Expand the problems x runs x algorithms benchmark matrix into independent jobs with their own seeds."""
+    return [{'problem': problem, 'run': run, 'algorithm': algorithm, 'seed': zlib.crc32(f"{base_seed}/{problem}/{run}/{algorithm}".encode())}
+            for problem in problem_names for run in range(test_runs) for algorithm in algorithms]
+
+def _initBenchmarkWorker(problems, cache_directory):
+    # The parent already wrote the cache files, mapping them shares the pages between all workers
+    for name, file_path in problems.items():
+        _, city_coordinates, matrix_graph, edge_weight_type = loadProblem(file_path, cache_directory)
+        _graphs[name] = Graph.fromMatrix(city_coordinates, matrix_graph, edge_weight_type)
+
+def _onTimeout(signum, frame):
+    raise TimeoutError("benchmark job timed out")
+
+def _runJob(job, config):
+    """Run a single benchmark job in a worker process and return its result row."""
+    graph = _graphs[job['problem']]
+    random.seed(job['seed'])
+    result = dict(job, num_of_cities=graph.num_of_cities, status='ok', cost=None, generations=None, error=None)
+
+    timeout = config['timeout']
+    if timeout and hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, _onTimeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    start_time = time.perf_counter()
+    try:
+        algorithm = job['algorithm']
+        if algorithm == 'naive':
+            if graph.num_of_cities > config['naive_max_cities']:
+                result['status'] = 'skipped'
+            else:
+                _, result['cost'] = comparison_algorithms.naive_tsp(graph)
+        elif algorithm in ('held_karp', 'branch_and_bound'):
+            if graph.num_of_cities > config[f'{algorithm}_max_cities']:
+                result['status'] = 'skipped'
+            else:
+                _, result['cost'] = getattr(comparison_algorithms, f'{algorithm}_tsp')(graph)
+        elif algorithm == 'nn':
+            _, result['cost'] = comparison_algorithms.nearest_neighbor_tsp(graph)
+        elif algorithm in ('greedy', 'double_tree', 'christofides'):
+            _, result['cost'] = getattr(comparison_algorithms, f'{algorithm}_tsp')(graph)
+        elif algorithm == 'nx':
+            import networkx as nx
+            nx_graph = comparison_algorithms.nx_tsp_solver(graph.num_of_cities, graph.matrix_graph)
+            result['cost'] = calculate_path_distance(graph, nx.approximation.traveling_salesman_problem(nx_graph, cycle=True))
+        else:
+            population_size = config['population_size'] or graph.num_of_cities * 30
+            ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph,
+                                  crossover_rate=config['crossover_rate'], mutation_rate=config['mutation_rate'])
+            telemetry = None
+            if config['telemetry_directory']:
+                telemetry_path = os.path.join(config['telemetry_directory'], f"{job['problem']}-{job['run']}-{algorithm}.jsonl")
+                telemetry = MetricsRecorder(telemetry_path, config['telemetry_level'])
+            try:
+                result['generations'] = evolveGenerations(ga, 0, config['num_generations'], config['num_generations'], population_size,
+                                                          opt=algorithm == 'ga_opt', optimal_solution=OPTIMAL_SOLUTIONS.get(job['problem']), telemetry=telemetry)
+            finally:
+                if telemetry is not None:
+                    telemetry.close()
+            result['cost'] = ga.fitness_scores[0].item()
+    except TimeoutError:
+        result['status'] = 'timeout'
+    except Exception as error:
+        result['status'] = 'error'
+        result['error'] = repr(error)
+    finally:
+        if timeout and hasattr(signal, 'SIGALRM'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    result['wall_time'] = time.perf_counter() - start_time
+    return result
+
+class ResultWriter:
+    """Streams result rows to a CSV file, or to a JSON lines file when the path ends with .json or .jsonl"""
+    def __init__(self, file_path):
+        self.file = open(file_path, "w", newline="")
+        self.json = file_path.endswith(('.json', '.jsonl'))
+        if not self.json:
+            self.writer = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, result):
+        if self.json:
+            self.file.write(json.dumps(result) + "\n")
+        else:
+            self.writer.writerow(result)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def runBenchmarks(problem_files, output_path, test_runs=5, algorithms=ALGORITHMS, max_workers=None, timeout=None, base_seed=0,
+                  num_generations=200, population_size=None, crossover_rate=0.7, mutation_rate=0.05, naive_max_cities=10,
+                  held_karp_max_cities=20, branch_and_bound_max_cities=30, cache_directory=CACHE_DIRECTORY, telemetry_directory=None,
+                  telemetry_level=TELEMETRY_GENERATIONS):
+    """Run the benchmark matrix of main.py's testing branch on a process pool.
+
+    Every problem is parsed once into the binary problem cache, which all workers memory-map and reuse for
+    every run and algorithm. Results are written to output_path as soon as each job finishes. With a telemetry_directory
+    every GA job also writes its per-generation metrics there as JSON lines.
+
+    returns:
+        list: The result rows, in completion order
+    """
+    config = dict(timeout=timeout, num_generations=num_generations, population_size=population_size, crossover_rate=crossover_rate,
+                  mutation_rate=mutation_rate, naive_max_cities=naive_max_cities, held_karp_max_cities=held_karp_max_cities,
+                  branch_and_bound_max_cities=branch_and_bound_max_cities, telemetry_directory=telemetry_directory, telemetry_level=telemetry_level)
+    problems = {}
+    results = []
+    writer = ResultWriter(output_path)
+
+    try:
+        for file_path in problem_files:
+            name = loadProblem(file_path, cache_directory)[0]
+            problems[name] = file_path
+
+        jobs = expandJobs(list(problems), test_runs, algorithms, base_seed)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_initBenchmarkWorker, initargs=(problems, cache_directory)) as executor:
+            futures = [executor.submit(_runJob, job, config) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                optimal = OPTIMAL_SOLUTIONS.get(result['problem'])
+                result['optimal'] = optimal
+                result['gap'] = 100 * (result['cost'] - optimal) / optimal if optimal and result['cost'] is not None else None
+                writer.write(result)
+                results.append(result)
+                logging.info("Benchmark %s run %s %s: %s cost %s in %.3f seconds", result['problem'], result['run'], result['algorithm'],
+                             result['status'], result['cost'], result['wall_time'])
+    finally:
+        writer.close()
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the TSP benchmark matrix (problems x runs x algorithms) on a worker pool.")
+    parser.add_argument("problems", nargs="+", help="TSPLIB .tsp files or Files/graph_*.json coordinate files")
+    parser.add_argument("--output", default="benchmark_results.csv", help="Results file, .csv or .json/.jsonl")
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs per problem and algorithm")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=ALGORITHMS)
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-job timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed, every job derives its own seed from it")
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--population-size", type=int, default=None, help="GA population size (default: 30 * num_of_cities)")
+    parser.add_argument("--crossover-rate", type=float, default=0.7)
+    parser.add_argument("--mutation-rate", type=float, default=0.05)
+    parser.add_argument("--cache-directory", default=CACHE_DIRECTORY, help="Where the binary problem cache files are kept")
+    parser.add_argument("--telemetry-directory", default=None, help="Write the per-generation metrics of every GA job to this directory")
+    parser.add_argument("--telemetry-level", type=int, default=TELEMETRY_GENERATIONS, choices=(TELEMETRY_GENERATIONS, TELEMETRY_OPERATORS),
+                        help="1: best, mean, diversity and evaluations per generation, 2: also operator timings")
+    args = parser.parse_args()
+
+    results = runBenchmarks(args.problems, args.output, test_runs=args.runs, algorithms=args.algorithms, max_workers=args.workers,
+                            timeout=args.timeout, base_seed=args.seed, num_generations=args.generations, population_size=args.population_size,
+                            crossover_rate=args.crossover_rate, mutation_rate=args.mutation_rate, cache_directory=args.cache_directory,
+                            telemetry_directory=args.telemetry_directory, telemetry_level=args.telemetry_level)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""End-to-end benchmarks: time-to-target-gap of the GA and the comparison algorithms.
+
+Every benchmark is a setup function that loads its problem and returns the callable that gets timed. The callable
+returns the extra metrics stored with the timing (cost, gap to the optimum, generations).
+"""
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import evolveGenerations
+from benchmark_runner import OPTIMAL_SOLUTIONS
+from utils.gen_graph import Graph
+import comparison_algorithms
+import random
+import os
+
+END_TO_END_PROBLEMS = ('Files//ulysses16.tsp', 'Files//ulysses22.tsp', 'Files//st70.tsp', 'Files//rd100.tsp', 'Files//gr202.tsp', 'Files//pcb442.tsp',
+                       'Files//graph_10.json', 'Files//graph_50.json', 'Files//graph_100.json', 'Files//graph_500.json', 'Files//graph_1000.json')
+
+# The GA stops once it is within this fraction of the optimum (TSPLIB problems) or after MAX_GENERATIONS
+TARGET_GAP = 0.05
+MAX_GENERATIONS = 200
+MAX_POPULATION_SIZE = 1000
+
+# Largest problems the exact algorithms are benchmarked on
+HELD_KARP_MAX_CITIES = 20
+BRANCH_AND_BOUND_MAX_CITIES = 30
+
+def _problemName(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def _gap(cost, optimal):
+    return (cost - optimal) / optimal if optimal else None
+
+def genetic_algorithm(file_path, opt):
+    graph = Graph(tsp_problem=file_path)
+    optimal = OPTIMAL_SOLUTIONS.get(_problemName(file_path))
+    target = optimal * (1 + TARGET_GAP) if optimal else None
+    population_size = min(graph.num_of_cities * 30, MAX_POPULATION_SIZE)
+
+    def run():
+        random.seed(0)
+        ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph, crossover_rate=0.7, mutation_rate=0.05)
+        generation = 0
+        # One generation at a time, so the run stops as soon as the target gap is reached
+        while generation < MAX_GENERATIONS and not (target and ga.fitness_scores[0] <= target):
+            generation = evolveGenerations(ga, generation, generation + 1, MAX_GENERATIONS, population_size, opt=opt)
+        cost = ga.fitness_scores[0].item()
+        return {'cost': cost, 'gap': _gap(cost, optimal), 'generations': generation}
+    return run
+
+def comparison_algorithm(file_path, algorithm):
+    graph = Graph(tsp_problem=file_path)
+    optimal = OPTIMAL_SOLUTIONS.get(_problemName(file_path))
+
+    def run():
+        if algorithm == 'nn_lk':
+            path, _ = comparison_algorithms.nearest_neighbor_tsp(graph)
+            _, cost = comparison_algorithms.local_search_polish(graph, path, 'lk')
+        else:
+            _, cost = getattr(comparison_algorithms, f'{algorithm}_tsp')(graph)
+        cost = float(cost)
+        return {'cost': cost, 'gap': _gap(cost, optimal)}
+    return run
+
+def end_to_end_benchmarks():
+    """All end-to-end benchmarks as a {name: setup} dict, the setup returns the callable to time."""
+    benchmarks = {}
+    for file_path in END_TO_END_PROBLEMS:
+        name = _problemName(file_path)
+        # Loading goes through the binary problem cache, so this is cheap after the first run
+        num_of_cities = Graph(tsp_problem=file_path).num_of_cities
+        benchmarks[f'ga[{name}]'] = lambda file_path=file_path: genetic_algorithm(file_path, opt=False)
+        benchmarks[f'ga_opt[{name}]'] = lambda file_path=file_path: genetic_algorithm(file_path, opt=True)
+        benchmarks[f'nn[{name}]'] = lambda file_path=file_path: comparison_algorithm(file_path, 'nearest_neighbor')
+        benchmarks[f'nn_lk[{name}]'] = lambda file_path=file_path: comparison_algorithm(file_path, 'nn_lk')
+        for algorithm in ('greedy', 'double_tree', 'christofides'):
+            benchmarks[f'{algorithm}[{name}]'] = lambda file_path=file_path, algorithm=algorithm: comparison_algorithm(file_path, algorithm)
+        if num_of_cities <= HELD_KARP_MAX_CITIES:
+            benchmarks[f'held_karp[{name}]'] = lambda file_path=file_path: comparison_algorithm(file_path, 'held_karp')
+        if num_of_cities <= BRANCH_AND_BOUND_MAX_CITIES:
+            benchmarks[f'branch_and_bound[{name}]'] = lambda file_path=file_path: comparison_algorithm(file_path, 'branch_and_bound')
+    return benchmarks
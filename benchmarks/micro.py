@@ -0,0 +1,99 @@
+"""Micro-benchmarks of the hot GA and graph building functions.
+
+Every benchmark is a setup function that prepares its inputs and returns the callable that gets timed.
+"""
+from genetic_algorithm import GeneticAlgorithm
+from crossover_operators import CROSSOVER_OPERATORS
+from utils.gen_graph import Graph
+import numpy as np
+import tsplib95
+import random
+import os
+
+# Problems the micro-benchmarks run on, small enough to keep every benchmark well under a second per call
+MICRO_PROBLEMS = ('Files//st70.tsp', 'Files//pcb442.tsp')
+
+def _problemName(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def _geneticAlgorithm(file_path, crossover='ox', local_search='2opt', population_size=200):
+    random.seed(0)
+    graph = Graph(tsp_problem=file_path)
+    return GeneticAlgorithm(pop_size=population_size, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph,
+                            crossover_rate=1.0, mutation_rate=0.05, crossover=crossover, local_search=local_search)
+
+def fitness_function(file_path):
+    ga = _geneticAlgorithm(file_path)
+    individual = ga.population[0]
+    return lambda: ga.fitnessFunction(individual)
+
+def population_fitness(file_path):
+    ga = _geneticAlgorithm(file_path)
+    return lambda: ga.populationFitness(ga.population)
+
+def crossover_function(file_path, crossover):
+    ga = _geneticAlgorithm(file_path, crossover=crossover)
+    parent1, parent2 = ga.population[0], ga.population[1]
+    def run():
+        ga.rng = np.random.default_rng(0)
+        return ga.crossoverFunction(parent1, parent2)
+    return run
+
+def guided_mutation_function(file_path, local_search):
+    """One generation's worth of guided mutations, about 4% of them run the local search."""
+    ga = _geneticAlgorithm(file_path, local_search=local_search)
+    ga.guidedMutationFunction(ga.population[0], 0, 1)   # builds the neighbor lists outside of the timing
+    population = list(ga.population)
+    def run():
+        ga.rng = np.random.default_rng(0)
+        return [ga.guidedMutationFunction(individual, 0, 1) for individual in population]
+    return run
+
+def select_pairs(file_path):
+    """The tournaments of one generation, drawn in bulk."""
+    ga = _geneticAlgorithm(file_path)
+    def run():
+        ga.rng = np.random.default_rng(0)
+        return ga.selectPairs(len(ga.population) // 2)
+    return run
+
+def mutate_population(file_path):
+    """The swap mutations of one generation, drawn in bulk."""
+    ga = _geneticAlgorithm(file_path)
+    def run():
+        ga.rng = np.random.default_rng(0)
+        return ga.mutatePopulation(ga.population.copy())
+    return run
+
+def generate_graph(num_of_cities):
+    random.seed(0)
+    graph = Graph.__new__(Graph)
+    graph.num_of_cities, graph.lazy = num_of_cities, False
+    graph.city_coordinates = graph.generateCityCoordinates(num_of_cities)
+    return graph.generateGraph
+
+def load_tsp_problem(file_path):
+    problem = tsplib95.load(file_path)
+    def run():
+        graph = Graph.__new__(Graph)
+        graph.lazy = False
+        return graph.loadTSPProblem(problem)
+    return run
+
+def micro_benchmarks():
+    """All micro-benchmarks as a {name: setup} dict, the setup returns the callable to time."""
+    benchmarks = {}
+    for file_path in MICRO_PROBLEMS:
+        name = _problemName(file_path)
+        benchmarks[f'fitnessFunction[{name}]'] = lambda file_path=file_path: fitness_function(file_path)
+        benchmarks[f'populationFitness[{name}]'] = lambda file_path=file_path: population_fitness(file_path)
+        for crossover in CROSSOVER_OPERATORS:
+            benchmarks[f'crossoverFunction[{name}-{crossover}]'] = lambda file_path=file_path, crossover=crossover: crossover_function(file_path, crossover)
+        for local_search in ('2opt', 'or2opt', 'lk'):
+            benchmarks[f'guidedMutationFunction[{name}-{local_search}]'] = lambda file_path=file_path, local_search=local_search: guided_mutation_function(file_path, local_search)
+        benchmarks[f'selectPairs[{name}]'] = lambda file_path=file_path: select_pairs(file_path)
+        benchmarks[f'mutatePopulation[{name}]'] = lambda file_path=file_path: mutate_population(file_path)
+        benchmarks[f'loadTSPProblem[{name}]'] = lambda file_path=file_path: load_tsp_problem(file_path)
+    for num_of_cities in (100, 1000):
+        benchmarks[f'generateGraph[{num_of_cities}]'] = lambda num_of_cities=num_of_cities: generate_graph(num_of_cities)
+    return benchmarks
@@ -0,0 +1,147 @@
+"""Performance regression suite.
+
+Runs the micro and end-to-end benchmarks, appends the timings to a JSON lines history file and compares every
+benchmark with its last recorded run on the same machine. Exits with status 1 when one got slower than the tolerance.
+
+    python -m benchmarks.run_benchmarks --suite micro
+    python -m benchmarks.run_benchmarks --suite end_to_end --filter ulysses graph_100
+"""
+from benchmarks.micro import micro_benchmarks
+from benchmarks.end_to_end import end_to_end_benchmarks
+from datetime import datetime
+import subprocess
+import statistics
+import platform
+import argparse
+import timeit
+import time
+import json
+import sys
+import os
+
+SUITES = {'micro': micro_benchmarks, 'end_to_end': end_to_end_benchmarks}
+
+HISTORY_FILE = os.path.join("benchmarks", "results", "history.jsonl")
+
+# A benchmark fails when its best time is this fraction slower than in the previous run
+DEFAULT_TOLERANCE = 0.25
+
+# Timings below this are too noisy to fail a run on
+MIN_COMPARED_SECONDS = 1e-4
+
+def machineId():
+    """Timings are only compared between runs on the same machine and Python version."""
+    return f"{platform.node()}-{platform.machine()}-{platform.python_implementation()}{platform.python_version()}"
+
+def commitId():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timeBenchmark(benchmark, repeat, min_time):
+    """Time a callable like timeit: calls are batched so that one batch takes at least min_time, and the batch is repeated.
+    With min_time 0 every repeat is a single call without a warm-up call, for the long end-to-end benchmarks.
+
+    returns:
+        tuple: The best and the median seconds per call, the calls per batch and the return value of the last call
+    """
+    number = 1
+    if min_time > 0:
+        benchmark()
+        while number < 1 << 20:
+            batch_time = timeit.timeit(benchmark, number=number)
+            if batch_time >= min_time:
+                break
+            number *= 10 if batch_time < min_time / 10 else 2
+
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            result = benchmark()
+        times.append((time.perf_counter() - start_time) / number)
+    return min(times), statistics.median(times), number, result
+
+def loadHistory(file_path):
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, "r") as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+def previousRecords(history, machine):
+    """The last record of every benchmark run on this machine."""
+    previous = {}
+    for record in history:
+        if record['machine'] == machine:
+            previous[(record['suite'], record['name'])] = record
+    return previous
+
+def runSuite(suite, filters=(), repeat=5, min_time=0.2):
+    """Run the benchmarks of a suite whose name contains one of the filters (all of them without filters).
+
+    returns:
+        list: One record per benchmark with its best and median seconds per call and its metrics
+    """
+    records = []
+    for name, setup in SUITES[suite]().items():
+        if filters and not any(text in name for text in filters):
+            continue
+        benchmark = setup()
+        best, median, number, result = timeBenchmark(benchmark, repeat, min_time)
+        records.append({'suite': suite, 'name': name, 'best': best, 'median': median, 'number': number, 'repeat': repeat,
+                        'metrics': result if isinstance(result, dict) else None})
+        print(f"{suite:<10} {name:<45} best {best * 1e3:>10.3f} ms  median {median * 1e3:>10.3f} ms  ({number} x {repeat})", flush=True)
+    return records
+
+def compareRecords(records, previous, tolerance):
+    """Compare every record with the previous run of the same benchmark.
+
+    returns:
+        list: A description of every regression, empty when nothing got slower than the tolerance
+    """
+    regressions = []
+    for record in records:
+        before = previous.get((record['suite'], record['name']))
+        if before is None or max(before['best'], record['best']) < MIN_COMPARED_SECONDS:
+            continue
+        ratio = record['best'] / before['best']
+        if ratio > 1 + tolerance:
+            regressions.append(f"{record['suite']} {record['name']}: {before['best'] * 1e3:.3f} ms -> {record['best'] * 1e3:.3f} ms "
+                               f"({100 * (ratio - 1):.0f}% slower than commit {before.get('commit')})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suites, store the results and fail on slowdowns.")
+    parser.add_argument("--suite", nargs="+", default=list(SUITES), choices=list(SUITES))
+    parser.add_argument("--filter", nargs="+", default=(), help="Only run the benchmarks whose name contains one of these, e.g. 'ga_opt[st70]' or pcb442")
+    parser.add_argument("--repeat", type=int, default=None, help="Timing repeats (default: 5 for micro, 1 for end_to_end)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed batch of calls")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON lines file the results are appended to")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown before a benchmark fails, as a fraction")
+    parser.add_argument("--no-store", action="store_true", help="Compare without appending the results to the history")
+    args = parser.parse_args()
+
+    history = loadHistory(args.history)
+    machine, commit, timestamp = machineId(), commitId(), datetime.now().isoformat(timespec="seconds")
+
+    records = []
+    for suite in args.suite:
+        repeat = args.repeat or (5 if suite == 'micro' else 1)
+        records += runSuite(suite, args.filter, repeat, args.min_time if suite == 'micro' else 0)
+    for record in records:
+        record.update(machine=machine, commit=commit, timestamp=timestamp)
+
+    regressions = compareRecords(records, previousRecords(history, machine), args.tolerance)
+    if not args.no_store and records:
+        os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+        with open(args.history, "a") as history_file:
+            history_file.write("".join(json.dumps(record) + "\n" for record in records))
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(records)} benchmarks, {len(regressions)} regressions")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
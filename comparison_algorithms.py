@@ -1,16 +1,29 @@
 from itertools import permutations
 from utils.decorators import timer
-from helpers.calculate_path_distance import calculate_path_distance
-import networkx as nx
+import numpy as np
+from local_search import polish_tour, neighbor_lists, NUM_OF_NEIGHBORS, EPSILON, DEFAULT_POLISH_METHOD
+from utils.spatial_index import SpatialGrid
+from utils.distance_matrix import tour_length, ROW_BLOCK_SIZE
+
+# Edge weight types where the planar distance between coordinates orders the neighbors like the real weights
+PLANAR_EDGE_WEIGHT_TYPES = (None, 'EUC_2D', 'CEIL_2D', 'ATT')
+
+# From this many cities on, nearest_neighbor_tsp uses the spatial index even when a dense matrix exists
+SPATIAL_NEAREST_NEIGHBOR_THRESHOLD = 5000
+
+# Euler circuits shortcut by christofides_tour, the shortest of the resulting tours is kept
+CHRISTOFIDES_CIRCUITS = 8
 
 @timer
 def naive_tsp(graph):
     cities = list(range(graph.num_of_cities))
     shortest_path = None
     min_path_weight = float('inf')
+    # Plain nested lists are faster than NumPy indexing for these tiny per-permutation sums
+    weights = graph.matrix_graph.tolist()
     
     for permutation in permutations(cities):
-        current_weight = calculate_path_distance(graph, permutation)
+        current_weight = sum(weights[a][b] for a, b in zip(permutation, permutation[1:] + permutation[:1]))
         if current_weight < min_path_weight:
             min_path_weight = current_weight
             shortest_path = permutation
@@ -18,30 +31,502 @@ def naive_tsp(graph):
     shortest_path = list(shortest_path) + [shortest_path[0]]  #start
     return shortest_path, min_path_weight
 
+@timer
+def held_karp_tsp(graph):
+    """Exact TSP with the Held-Karp bitmask dynamic program, O(n^2 * 2^n) time and O(n * 2^n) memory.
+
+    City 0 is fixed as the start, dp[subset, j] is the shortest path that starts in city 0, visits the cities in
+    'subset' (bit j - 1 for city j) and ends in city j. All subsets of the same size are relaxed at once with NumPy.
+    Around 20-22 cities fit in memory on a typical machine.
+    """
+    num_of_cities = graph.num_of_cities
+    matrix_graph = np.asarray(graph.matrix_graph, dtype=np.float64)
+    if num_of_cities <= 3:
+        path = list(range(num_of_cities)) + [0]
+        return path, sum(matrix_graph[a, b] for a, b in zip(path, path[1:])).item() if num_of_cities > 1 else 0
+
+    m = num_of_cities - 1
+    subsets = np.arange(1 << m)
+    subset_sizes = np.zeros(1 << m, dtype=np.int8)
+    for bit in range(m):
+        subset_sizes += (subsets >> bit) & 1
+
+    distances = matrix_graph[1:, 1:]
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int8)
+    dp[1 << np.arange(m), np.arange(m)] = matrix_graph[0, 1:]
+
+    for size in range(2, m + 1):
+        same_size = subsets[subset_sizes == size]
+        for j in range(m):
+            ending_in_j = same_size[(same_size >> j) & 1 == 1]
+            # dp[previous, k] is inf for every k outside 'previous', so only valid predecessors can win
+            candidates = dp[ending_in_j ^ (1 << j)] + distances[:, j]
+            best = np.argmin(candidates, axis=1)
+            dp[ending_in_j, j] = candidates[np.arange(len(ending_in_j)), best]
+            parent[ending_in_j, j] = best
+
+    full = (1 << m) - 1
+    totals = dp[full] + matrix_graph[1:, 0]
+    last = int(np.argmin(totals))
+    min_path_weight = totals[last].item()
+
+    path, subset = [], full
+    while last >= 0:
+        path.append(last + 1)
+        subset, last = subset ^ (1 << last), int(parent[subset, last])
+    path = [0] + path[::-1] + [0]
+
+    if np.issubdtype(np.asarray(graph.matrix_graph).dtype, np.integer):
+        min_path_weight = int(round(min_path_weight))
+    return path, min_path_weight
+
+def minimum_spanning_tree(matrix_graph, cities):
+    """Minimum spanning tree over 'cities' with Prim's algorithm on the dense sub matrix.
+
+    returns:
+        tuple: The weight of the tree and the degree of each city in the tree (in the order of 'cities')
+    """
+    degrees = np.zeros(len(cities), dtype=np.int64)
+    if len(cities) <= 1:
+        return 0, degrees
+    sub_matrix = matrix_graph[np.ix_(cities, cities)]
+    in_tree = np.zeros(len(cities), dtype=bool)
+    in_tree[0] = True
+    connection = sub_matrix[0].copy()
+    connected_to = np.zeros(len(cities), dtype=np.intp)
+    total_weight = 0
+    for _ in range(len(cities) - 1):
+        candidates = np.where(in_tree, np.inf, connection)
+        city = int(np.argmin(candidates))
+        total_weight += candidates[city]
+        degrees[city] += 1
+        degrees[connected_to[city]] += 1
+        in_tree[city] = True
+        closer = sub_matrix[city] < connection
+        connection[closer] = sub_matrix[city][closer]
+        connected_to[closer] = city
+    return total_weight, degrees
+
+def held_karp_penalties(matrix_graph, upper_bound, iterations=200):
+    """Held-Karp 1-tree relaxation: find city penalties pi with subgradient optimization so that the 1-tree
+    (MST over cities 1..n-1 plus the two cheapest edges of city 0) under the weights d(i, j) + pi_i + pi_j
+    is as close to a tour as possible. Any pi gives a valid lower bound, better pi give tighter ones.
+    """
+    num_of_cities = len(matrix_graph)
+    penalties = np.zeros(num_of_cities)
+    best_penalties, best_bound = penalties.copy(), -np.inf
+    step_scale = 2.0
+    others = np.arange(1, num_of_cities)
+
+    for _ in range(iterations):
+        modified = matrix_graph + penalties[:, None] + penalties[None, :]
+        tree_weight, tree_degrees = minimum_spanning_tree(modified, others)
+        closest = others[np.argsort(modified[0, others], kind='stable')[:2]]
+        degrees = np.zeros(num_of_cities, dtype=np.int64)
+        degrees[others] = tree_degrees
+        degrees[closest] += 1
+        degrees[0] = 2
+
+        bound = tree_weight + modified[0, closest].sum() - 2 * penalties.sum()
+        if bound > best_bound:
+            best_bound, best_penalties = bound, penalties.copy()
+        else:
+            step_scale /= 2 ** 0.25
+
+        subgradient = degrees - 2
+        norm = (subgradient ** 2).sum()
+        if norm == 0 or step_scale < 1e-6:
+            break
+        penalties = penalties + step_scale * (upper_bound - bound) / norm * subgradient
+
+    return best_penalties
+
+@timer
+def branch_and_bound_tsp(graph):
+    """Exact TSP with depth-first branch and bound, for validating heuristics beyond the reach of Held-Karp's memory.
+
+    A partial path from city 0 to 'current' is pruned when its cost plus a 1-tree lower bound for the rest,
+    the MST of the unvisited cities plus the cheapest edges from 'current' into them and from them back to 0,
+    cannot beat the incumbent. The bound uses the penalized weights of the Held-Karp 1-tree relaxation.
+    The incumbent starts as the nearest neighbor tour polished with Lin-Kernighan.
+    """
+    num_of_cities = graph.num_of_cities
+    matrix_graph = np.asarray(graph.matrix_graph, dtype=np.float64)
+    if num_of_cities <= 3:
+        return held_karp_tsp(graph)
+
+    initial_path, _ = nearest_neighbor_tsp(graph)
+    initial_path, initial_cost = polish_tour(initial_path, graph, 'lk')
+    start = initial_path.index(0)
+    best = {'cost': float(initial_cost), 'path': initial_path[start:-1] + initial_path[:start] + [0]}
+
+    penalties = held_karp_penalties(matrix_graph, best['cost'])
+    modified = matrix_graph + penalties[:, None] + penalties[None, :]
+    # Integer weights make every tour cost an integer, so bounds can be rounded up
+    integral = np.issubdtype(np.asarray(graph.matrix_graph).dtype, np.integer)
+    tolerance = 1e-6
+
+    visited = np.zeros(num_of_cities, dtype=bool)
+    visited[0] = True
+    path = [0]
+
+    def search(cost):
+        current = path[-1]
+        if len(path) == num_of_cities:
+            total_weight = cost + matrix_graph[current, 0]
+            if total_weight < best['cost']:
+                best['cost'], best['path'] = total_weight, path + [0]
+            return
+
+        remaining = np.flatnonzero(~visited)
+        tree_weight, _ = minimum_spanning_tree(modified, remaining)
+        lower_bound = (cost + tree_weight + modified[current, remaining].min() + modified[remaining, 0].min()
+                       - penalties[current] - penalties[0] - 2 * penalties[remaining].sum())
+        if integral:
+            lower_bound = np.ceil(lower_bound - tolerance)
+        if lower_bound >= best['cost'] - tolerance:
+            return
+
+        for city in remaining[np.argsort(matrix_graph[current, remaining], kind='stable')].tolist():
+            new_cost = cost + matrix_graph[current, city]
+            if new_cost >= best['cost']:
+                continue
+            visited[city] = True
+            path.append(city)
+            search(new_cost)
+            path.pop()
+            visited[city] = False
+
+    search(0.0)
+
+    min_path_weight = best['cost']
+    if integral:
+        min_path_weight = int(round(min_path_weight))
+    return best['path'], min_path_weight
+
 @timer
 def nearest_neighbor_tsp(graph):
     num_of_cities = graph.num_of_cities
-    unvisited = set(range(num_of_cities))
+    # Large or matrix-free planar instances use the spatial index instead of scanning matrix rows
+    if graph.edge_weight_type in PLANAR_EDGE_WEIGHT_TYPES and (num_of_cities >= SPATIAL_NEAREST_NEIGHBOR_THRESHOLD or not isinstance(graph.matrix_graph, np.ndarray)):
+        return spatial_nearest_neighbor_tsp(graph.city_coordinates[:num_of_cities], graph.edge_weight_type)
+
+    visited = np.zeros(num_of_cities, dtype=bool)
     current_city = 0  
     path = [current_city]
     total_weight = 0
 
-    while len(unvisited) > 1:
-        unvisited.remove(current_city)
-        next_city = min(unvisited, key=lambda city: graph.matrix_graph[current_city][city])
-        total_weight += graph.matrix_graph[current_city][next_city]
+    for _ in range(num_of_cities - 1):
+        visited[current_city] = True
+        row = np.where(visited, np.inf, graph.matrix_graph[current_city])
+        next_city = int(np.argmin(row))
+        total_weight += graph.matrix_graph[current_city, next_city].item()
         path.append(next_city)
         current_city = next_city
 
-    total_weight += graph.matrix_graph[current_city][path[0]]
+    total_weight += graph.matrix_graph[current_city, path[0]].item()
     path.append(path[0])
     
     return path, total_weight
 
+def spatial_nearest_neighbor_tsp(city_coordinates, edge_weight_type=None, start=0):
+    """Nearest neighbor tour built with a grid spatial index, so no n x n matrix is needed.
+
+    Neighbors are ranked by planar distance on the coordinates (exact for EUC_2D, CEIL_2D and ATT up to rounding ties)
+    and the tour is costed with the problem's own edge weights.
+    """
+    grid = SpatialGrid(city_coordinates)
+    path = [start]
+    grid.remove(start)
+    current_city = start
+
+    for _ in range(grid.num_of_cities - 1):
+        next_city = grid.nearest(grid.xs[current_city], grid.ys[current_city])
+        grid.remove(next_city)
+        path.append(next_city)
+        current_city = next_city
+
+    total_weight = tour_length(city_coordinates, path, edge_weight_type)
+    path.append(path[0])
+    return path, total_weight
+
+def greedy_edge_tour(matrix_graph, neighbors, noise=0.0, rng=None):
+    """Greedy edge matching on the candidate edges: edges are taken from shortest to longest, skipping those that
+    would give a city a third edge or close a cycle, then the resulting fragments are joined nearest endpoint first.
+
+    args:
+        matrix_graph: A (n, n) distance matrix (dense or lazy)
+        neighbors: A (n, k) array of candidate neighbors, e.g. from neighbor_lists
+        noise: Edge weights are scaled by a random factor in [1, 1 + noise) before sorting, for different tours
+        rng: The np.random.Generator drawing the noise
+    returns:
+        list: The tour as a permutation of cities (open)
+    """
+    num_of_cities = len(neighbors)
+    if num_of_cities < 3:
+        return list(range(num_of_cities))
+    k = neighbors.shape[1]
+    first = np.repeat(np.arange(num_of_cities), k)
+    second = np.asarray(neighbors).ravel()
+    edges = np.unique(np.minimum(first, second) * num_of_cities + np.maximum(first, second))
+    first, second = edges // num_of_cities, edges % num_of_cities
+    weights = np.asarray(matrix_graph[first, second], dtype=np.float64)
+    if noise:
+        weights = weights * (1 + noise * rng.random(len(weights)))
+
+    degree = [0] * num_of_cities
+    adjacent = [[] for _ in range(num_of_cities)]
+    fragment = list(range(num_of_cities))
+
+    def root(city):
+        while fragment[city] != city:
+            fragment[city] = fragment[fragment[city]]
+            city = fragment[city]
+        return city
+
+    order = np.argsort(weights, kind='stable')
+    for a, b in zip(first[order].tolist(), second[order].tolist()):
+        if degree[a] < 2 and degree[b] < 2:
+            root_a, root_b = root(a), root(b)
+            if root_a != root_b:
+                fragment[root_a] = root_b
+                degree[a] += 1
+                degree[b] += 1
+                adjacent[a].append(b)
+                adjacent[b].append(a)
+
+    # Walk every fragment (a path, or a single city) from one of its endpoints
+    paths, walked = [], [False] * num_of_cities
+    for start in range(num_of_cities):
+        if degree[start] < 2 and not walked[start]:
+            path, previous, city = [start], -1, start
+            walked[start] = True
+            while True:
+                following = [next_city for next_city in adjacent[city] if next_city != previous]
+                if not following:
+                    break
+                previous, city = city, following[0]
+                walked[city] = True
+                path.append(city)
+            paths.append(path)
+
+    # Join the fragments: from the tail of the tour, continue with the fragment whose endpoint is nearest
+    endpoint_of = np.full(num_of_cities, -1, dtype=np.intp)
+    for index, path in enumerate(paths):
+        endpoint_of[path[0]] = endpoint_of[path[-1]] = index
+    tour = paths[0]
+    endpoint_of[tour[0]] = endpoint_of[tour[-1]] = -1
+    for _ in range(len(paths) - 1):
+        row = np.where(endpoint_of >= 0, np.asarray(matrix_graph[tour[-1]], dtype=np.float64), np.inf)
+        endpoint = int(np.argmin(row))
+        path = paths[endpoint_of[endpoint]]
+        endpoint_of[path[0]] = endpoint_of[path[-1]] = -1
+        tour.extend(path if path[0] == endpoint else path[::-1])
+    return tour
+
+def spanning_tree_parents(matrix_graph):
+    """Minimum spanning tree of all cities with Prim's algorithm, one vectorized distance row per added city.
+
+    returns:
+        np.ndarray: The parent of every city in the tree rooted at city 0 (-1 for the root)
+    """
+    num_of_cities = len(matrix_graph)
+    parents = np.full(num_of_cities, -1, dtype=np.intp)
+    if num_of_cities <= 1:
+        return parents
+    in_tree = np.zeros(num_of_cities, dtype=bool)
+    in_tree[0] = True
+    connection = np.array(matrix_graph[0], dtype=np.float64)
+    connection[0] = np.inf
+    parents[1:] = 0
+    for _ in range(num_of_cities - 1):
+        city = int(np.argmin(connection))
+        in_tree[city] = True
+        connection[city] = np.inf
+        row = np.asarray(matrix_graph[city], dtype=np.float64)
+        closer = ~in_tree & (row < connection)
+        connection[closer] = row[closer]
+        parents[closer] = city
+    return parents
+
+def cached_spanning_tree(graph):
+    """The spanning tree parents of a Graph, computed once and kept on the graph until its cities change."""
+    if getattr(graph, 'spanning_tree', None) is None:
+        graph.spanning_tree = spanning_tree_parents(graph.matrix_graph)
+    return graph.spanning_tree
+
+def tree_children(parents):
+    children = [[] for _ in range(len(parents))]
+    for city, parent in enumerate(parents.tolist()):
+        if parent >= 0:
+            children[parent].append(city)
+    return children
+
+def double_tree_tour(parents):
+    """Preorder walk of the spanning tree, the shortcut Euler tour of the doubled tree (at most twice the optimum)."""
+    children = tree_children(parents)
+    tour, stack = [], [0]
+    while stack:
+        city = stack.pop()
+        tour.append(city)
+        stack.extend(reversed(children[city]))
+    return tour
+
+def odd_vertex_matching(matrix_graph, odd, k=NUM_OF_NEIGHBORS):
+    """Approximate minimum weight perfect matching of the odd degree vertices.
+
+    Candidate pairs are each vertex's k nearest other odd vertices, matched greedily from the shortest. Vertices left
+    without a free candidate are matched nearest first, then pairs (a, b), (c, d) are swapped to (a, c), (b, d) or
+    (a, d), (b, c) while that shortens the matching.
+
+    returns:
+        list: The matched (a, b) pairs of cities
+    """
+    odd = np.asarray(odd, dtype=np.intp)
+    num_of_odd = len(odd)
+    k = min(k, num_of_odd - 1)
+    candidates = np.empty((num_of_odd, k), dtype=np.intp)
+    candidate_weights = np.empty((num_of_odd, k))
+    for start in range(0, num_of_odd, ROW_BLOCK_SIZE):
+        block = np.arange(start, min(start + ROW_BLOCK_SIZE, num_of_odd))
+        distances = np.array(matrix_graph[odd[block][:, None], odd[None, :]], dtype=np.float64)
+        distances[np.arange(len(block)), block] = np.inf
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        candidates[block] = nearest
+        candidate_weights[block] = np.take_along_axis(distances, nearest, axis=1)
+
+    mate = [-1] * num_of_odd
+    order = np.argsort(candidate_weights, axis=None, kind='stable')
+    for a, b in zip((order // k).tolist(), candidates.ravel()[order].tolist()):
+        if mate[a] < 0 and mate[b] < 0:
+            mate[a], mate[b] = b, a
+    unmatched = [a for a in range(num_of_odd) if mate[a] < 0]
+    while unmatched:
+        a = unmatched.pop()
+        rest = np.array(unmatched)
+        b = int(rest[np.argmin(np.asarray(matrix_graph[odd[a]], dtype=np.float64)[odd[rest]])])
+        unmatched.remove(b)
+        mate[a], mate[b] = b, a
+
+    def weight(a, b):
+        return float(matrix_graph[odd[a], odd[b]])
+
+    improved = True
+    while improved:
+        improved = False
+        for a in range(num_of_odd):
+            for c in candidates[a].tolist():
+                b, d = mate[a], mate[c]
+                if c == b:
+                    continue
+                current = weight(a, b) + weight(c, d)
+                if candidate_weights[a][list(candidates[a]).index(c)] + weight(b, d) < current - EPSILON:
+                    mate[a], mate[c], mate[b], mate[d] = c, a, d, b
+                    improved = True
+                elif weight(a, d) + weight(b, c) < current - EPSILON:
+                    mate[a], mate[d], mate[b], mate[c] = d, a, c, b
+                    improved = True
+    return [(int(odd[a]), int(odd[mate[a]])) for a in range(num_of_odd) if a < mate[a]]
+
+def euler_shortcut_tour(adjacent, num_of_edges, start):
+    """Walk an Euler circuit of a connected even degree multigraph with Hierholzer's algorithm, in the order of the
+    adjacency lists, and shortcut it to a tour by skipping cities that were already visited."""
+    num_of_cities = len(adjacent)
+    used = [False] * num_of_edges
+    next_edge = [0] * num_of_cities
+    stack, circuit = [start], []
+    while stack:
+        city = stack[-1]
+        edges_of_city = adjacent[city]
+        while next_edge[city] < len(edges_of_city) and used[edges_of_city[next_edge[city]][1]]:
+            next_edge[city] += 1
+        if next_edge[city] == len(edges_of_city):
+            circuit.append(stack.pop())
+        else:
+            following, index = edges_of_city[next_edge[city]]
+            used[index] = True
+            stack.append(following)
+
+    visited = [False] * num_of_cities
+    tour = []
+    for city in circuit:
+        if not visited[city]:
+            visited[city] = True
+            tour.append(city)
+    return tour
+
+def christofides_circuits(matrix_graph, parents, circuits, rng=None):
+    """Christofides: spanning tree plus a matching of its odd degree vertices, walked as an Euler circuit and
+    shortcut to a tour. The shortcuts depend on the order the circuit takes the edges in, the first circuit takes
+    the longest edges first and the others take them in random orders from random starts.
+
+    returns:
+        list: One tour (open, as an array) per circuit
+    """
+    num_of_cities = len(parents)
+    if num_of_cities <= 3:
+        return [np.arange(num_of_cities)] * circuits
+    rng = np.random.default_rng(0) if rng is None else rng
+    edges = [(city, parent) for city, parent in enumerate(parents.tolist()) if parent >= 0]
+    degrees = np.bincount(np.array(edges).ravel(), minlength=num_of_cities)
+    edges += odd_vertex_matching(matrix_graph, np.flatnonzero(degrees % 2))
+
+    first, second = np.array(edges).T
+    weights = np.asarray(matrix_graph[first, second], dtype=np.float64).tolist()
+    adjacent = [[] for _ in range(num_of_cities)]
+    for index, (a, b) in enumerate(edges):
+        adjacent[a].append((b, index))
+        adjacent[b].append((a, index))
+    for edges_of_city in adjacent:
+        edges_of_city.sort(key=lambda edge: -weights[edge[1]])
+
+    tours = [np.array(euler_shortcut_tour(adjacent, len(edges), 0))]
+    for _ in range(circuits - 1):
+        for edges_of_city in adjacent:
+            rng.shuffle(edges_of_city)
+        tours.append(np.array(euler_shortcut_tour(adjacent, len(edges), int(rng.integers(num_of_cities)))))
+    return tours
+
+def christofides_tour(matrix_graph, parents, rng=None, circuits=CHRISTOFIDES_CIRCUITS):
+    """The shortest of a few Christofides circuits. With the approximate matching the 1.5 bound is not guaranteed,
+    the tours are as good as with an exact matching in practice."""
+    tours = christofides_circuits(matrix_graph, parents, circuits, rng)
+    weights = [np.asarray(matrix_graph[tour, np.roll(tour, -1)]).sum() for tour in tours]
+    return tours[int(np.argmin(weights))].tolist()
+
+def _closedTour(graph, tour):
+    tour = np.asarray(tour, dtype=np.intp)
+    total_weight = graph.matrix_graph[tour, np.roll(tour, -1)].sum().item() if len(tour) > 1 else 0
+    return tour.tolist() + tour[:1].tolist(), total_weight
+
+@timer
+def greedy_tsp(graph):
+    """Greedy edge matching on the candidate neighbor lists."""
+    return _closedTour(graph, greedy_edge_tour(graph.matrix_graph, neighbor_lists(graph.matrix_graph)))
+
+@timer
+def double_tree_tsp(graph):
+    """MST double-tree tour on the cached spanning tree."""
+    return _closedTour(graph, double_tree_tour(cached_spanning_tree(graph)))
+
+@timer
+def christofides_tsp(graph):
+    """Christofides tour on the cached spanning tree, without building a NetworkX graph."""
+    return _closedTour(graph, christofides_tour(graph.matrix_graph, cached_spanning_tree(graph)))
+
 @timer
 def nx_tsp_solver(number_of_nodes,graph):
+    # NetworkX takes a while to import, only pay for it when the NetworkX solver is used
+    import networkx as nx
     G = nx.complete_graph(number_of_nodes)
+    weights = np.asarray(graph).tolist()
     for i in range(number_of_nodes):
         for j in range(i+1,number_of_nodes):
-            G[i][j]['weight'] = graph[i][j]
-    return G
\ No newline at end of file
+            G[i][j]['weight'] = weights[i][j]
+    return G
+
+@timer
+def local_search_polish(graph, path, method=DEFAULT_POLISH_METHOD):
+    """Polish the path of another algorithm (e.g. nearest neighbor or NetworkX) with a local search from local_search.py"""
+    return polish_tour(path, graph, method)
@@ -0,0 +1,134 @@
+import numpy as np
+
+def order_crossover(parent1, parent2, start, end):
+    """Order crossover (OX): copy parent1[start:end] and fill the remaining positions, from left to right,
+    with the cities of parent2 in the order they appear in parent2.
+
+    A boolean 'already placed' mask replaces the list membership test, so the child is built in O(n).
+
+    args:
+        parent1: A permutation of cities (np.ndarray), donates the segment
+        parent2: A permutation of cities (np.ndarray), donates the order of the remaining cities
+        start, end: The segment boundaries, start inclusive and end exclusive
+    returns:
+        np.ndarray: The offspring (permutation of cities)
+    """
+    child = np.empty_like(parent1)
+    placed = np.zeros(len(parent1), dtype=bool)
+    holes = np.ones(len(parent1), dtype=bool)
+
+    child[start:end] = parent1[start:end]
+    placed[parent1[start:end]] = True
+    holes[start:end] = False
+    child[holes] = parent2[~placed[parent2]]
+    return child
+
+def partially_mapped_crossover(parent1, parent2, start, end):
+    """Partially mapped crossover (PMX): copy parent1[start:end] and take every other position from parent2,
+    following the segment mapping whenever the city from parent2 is already in the segment.
+
+    A position lookup table for parent1 makes every mapping step O(1), the mapping chains are disjoint
+    so the child is built in O(n).
+
+    args:
+        parent1: A permutation of cities (np.ndarray), donates the segment
+        parent2: A permutation of cities (np.ndarray), donates the remaining positions
+        start, end: The segment boundaries, start inclusive and end exclusive
+    returns:
+        np.ndarray: The offspring (permutation of cities)
+    """
+    child = parent2.copy()
+    child[start:end] = parent1[start:end]
+
+    position1 = np.empty_like(parent1)
+    position1[parent1] = np.arange(len(parent1))
+    in_segment = np.zeros(len(parent1), dtype=bool)
+    in_segment[parent1[start:end]] = True
+
+    outside = np.ones(len(parent1), dtype=bool)
+    outside[start:end] = False
+    for i in np.flatnonzero(outside & in_segment[parent2]):
+        gene = parent2[i]
+        while in_segment[gene]:
+            gene = parent2[position1[gene]]
+        child[i] = gene
+    return child
+
+def edge_recombination_crossover(parent1, parent2, start=None, end=None):
+    """Edge recombination crossover (ERX): build the child from the union of both parents' edges,
+    always moving to the neighbor with the fewest remaining edges, so most of the parents' edges survive.
+
+    The tour starts at parent1[0]; when the current city has no unused neighbors left, the walk continues
+    at the next unplaced city of parent1. The cut points are accepted for a common operator signature but unused.
+
+    args:
+        parent1: A permutation of cities (np.ndarray)
+        parent2: A permutation of cities (np.ndarray)
+    returns:
+        np.ndarray: The offspring (permutation of cities)
+    """
+    num_of_cities = len(parent1)
+    neighbors = [set() for _ in range(num_of_cities)]
+    for parent in (parent1.tolist(), parent2.tolist()):
+        for previous, city, following in zip(parent[-1:] + parent[:-1], parent, parent[1:] + parent[:1]):
+            neighbors[city].add(previous)
+            neighbors[city].add(following)
+
+    order = parent1.tolist()
+    placed = [False] * num_of_cities
+    child = []
+    fallback = 0
+    current = order[0]
+
+    while True:
+        child.append(current)
+        placed[current] = True
+        for neighbor in neighbors[current]:
+            neighbors[neighbor].discard(current)
+        if len(child) == num_of_cities:
+            break
+
+        if neighbors[current]:
+            current = min(neighbors[current], key=lambda city: (len(neighbors[city]), city))
+        else:
+            while placed[order[fallback]]:
+                fallback += 1
+            current = order[fallback]
+
+    return np.array(child, dtype=parent1.dtype)
+
+def batch_order_crossover(parents1, parents2, starts, ends):
+    """Order crossover (OX) for a whole batch of parent pairs at once.
+
+    Each row gives the same child as order_crossover(parents1[i], parents2[i], starts[i], ends[i]).
+
+    args:
+        parents1: A (batch, num_of_cities) array of permutations, donates the segments
+        parents2: A (batch, num_of_cities) array of permutations, donates the order of the remaining cities
+        starts, ends: (batch,) arrays of segment boundaries, start inclusive and end exclusive
+    returns:
+        np.ndarray: A (batch, num_of_cities) array of offspring
+    """
+    batch, num_of_cities = parents1.shape
+    positions = np.arange(num_of_cities)
+    in_segment = (positions >= starts[:, None]) & (positions < ends[:, None])
+
+    placed = np.zeros((batch, num_of_cities), dtype=bool)
+    rows = np.broadcast_to(np.arange(batch)[:, None], (batch, num_of_cities))
+    placed[rows[in_segment], parents1[in_segment]] = True
+    keep = ~np.take_along_axis(placed, parents2, axis=1)
+
+    # Every row has as many holes as kept cities, so the row-major boolean assignment lines them up per row
+    children = np.where(in_segment, parents1, 0).astype(parents1.dtype)
+    children[~in_segment] = parents2[keep]
+    return children
+
+CROSSOVER_OPERATORS = {
+    'ox'    : order_crossover,
+    'pmx'   : partially_mapped_crossover,
+    'erx'   : edge_recombination_crossover,
+}
+
+BATCH_CROSSOVER_OPERATORS = {
+    'ox'    : batch_order_crossover,
+}
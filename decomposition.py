@@ -0,0 +1,262 @@
+"""Divide-and-conquer solver for instances too large for a distance matrix or a single GA population.
+
+The cities are partitioned into clusters of about cluster_size cities, every cluster is solved on its own in a
+process pool (with a small dense matrix of its own), the cluster tours are joined in the order of a tour through
+the cluster centroids, and the local search then repairs the tour around the joins, starting only from the cities
+near a cluster border. Nothing larger than a cluster's matrix is ever built, so 100k cities fit in a few hundred MB.
+
+    python decomposition.py Files/some_large_problem.tsp --cluster-size 1000 --partition kmeans --method nn
+    python decomposition.py --random 100000
+"""
+from concurrent.futures import ProcessPoolExecutor
+from comparison_algorithms import nearest_neighbor_tsp, christofides_tour, spanning_tree_parents
+from genetic_algorithm import GeneticAlgorithm, spawn_seeds
+from genetic_algorithm_main_loop import anytimeMainLoop
+from local_search import LOCAL_SEARCH_OPERATORS, NUM_OF_NEIGHBORS, weight_table, polish_tour
+from seeding import hilbert_index, HILBERT_ORDER
+from utils.distance_matrix import build_distance_matrix, paired_edge_weights, tour_length, ROW_BLOCK_SIZE
+from utils.lazy_distance import LazyDistanceMatrix
+from utils.spatial_index import candidate_lists
+from utils.gen_graph import Graph
+from utils.decorators import timer
+import numpy as np
+import argparse
+import time
+
+# Cities per cluster, small enough for a dense matrix and a fast cluster solve
+CLUSTER_SIZE = 1000
+
+# Lloyd iterations of the k-means partition
+KMEANS_ITERATIONS = 10
+
+# GA settings of the 'ga' cluster solver
+CLUSTER_POPULATION_SIZE = 100
+CLUSTER_GENERATIONS = 50
+
+def sfc_partition(city_coordinates, cluster_size):
+    """Cut the Hilbert curve order of the cities into consecutive runs of cluster_size cities."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64)
+    lower = coordinates.min(axis=0)
+    scaled = (coordinates - lower) / np.maximum(coordinates.max(axis=0) - lower, 1e-9).max() * ((1 << HILBERT_ORDER) - 1)
+    order = np.argsort(hilbert_index(scaled[:, 0], scaled[:, 1]), kind='stable')
+    return np.array_split(order, max(1, -(-len(order) // cluster_size)))
+
+def grid_partition(city_coordinates, cluster_size):
+    """An equal-count grid: vertical strips with the same number of cities, each cut into cells with the same number
+    of cities, so dense regions get smaller cells."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64)
+    num_of_clusters = max(1, -(-len(coordinates) // cluster_size))
+    num_of_strips = max(1, int(round(np.sqrt(num_of_clusters))))
+    cells_per_strip = -(-num_of_clusters // num_of_strips)
+    clusters = []
+    for strip in np.array_split(np.argsort(coordinates[:, 0], kind='stable'), num_of_strips):
+        strip = strip[np.argsort(coordinates[strip, 1], kind='stable')]
+        clusters.extend(cell for cell in np.array_split(strip, cells_per_strip) if len(cell))
+    return clusters
+
+def kmeans_partition(city_coordinates, cluster_size, iterations=KMEANS_ITERATIONS):
+    """k-means clusters (Lloyd's algorithm started from the centroids of the sfc partition). Clusters that end up
+    larger than twice cluster_size are cut again along the Hilbert curve."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64)
+    centroids = np.array([coordinates[cluster].mean(axis=0) for cluster in sfc_partition(coordinates, cluster_size)])
+    for _ in range(iterations):
+        labels = nearest_centroids(coordinates, centroids)
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.stack([np.bincount(labels, coordinates[:, axis], minlength=len(centroids)) for axis in range(2)], axis=1)
+        # Empty clusters keep their centroid
+        centroids = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+    labels = nearest_centroids(coordinates, centroids)
+
+    order = np.argsort(labels, kind='stable')
+    clusters = []
+    for cluster in np.split(order, np.flatnonzero(np.diff(labels[order])) + 1):
+        if len(cluster) > 2 * cluster_size:
+            clusters.extend(cluster[part] for part in sfc_partition(coordinates[cluster], cluster_size))
+        elif len(cluster):
+            clusters.append(cluster)
+    return clusters
+
+def nearest_centroids(coordinates, centroids):
+    """Index of the nearest centroid of every city, computed in blocks of rows."""
+    labels = np.empty(len(coordinates), dtype=np.intp)
+    for start in range(0, len(coordinates), ROW_BLOCK_SIZE):
+        block = coordinates[start:start + ROW_BLOCK_SIZE]
+        labels[start:start + ROW_BLOCK_SIZE] = np.argmin(((block[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2), axis=1)
+    return labels
+
+PARTITION_METHODS = {
+    'sfc'       : sfc_partition,
+    'grid'      : grid_partition,
+    'kmeans'    : kmeans_partition,
+}
+
+def _nearestNeighborCluster(graph, seed):
+    path, _ = nearest_neighbor_tsp(graph)
+    return polish_tour(path, graph, 'or2opt')[0][:-1]
+
+def _christofidesCluster(graph, seed):
+    path = christofides_tour(graph.matrix_graph, spanning_tree_parents(graph.matrix_graph), np.random.default_rng(seed))
+    return polish_tour(path, graph, 'or2opt')[0]
+
+def _geneticAlgorithmCluster(graph, seed):
+    """The GA with the guided mutation, a tenth of its population seeded with nearest neighbor tours."""
+    ga = GeneticAlgorithm(pop_size=CLUSTER_POPULATION_SIZE, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph, crossover_rate=0.7,
+                          mutation_rate=0.05, seeding={'nn': 0.1}, city_coordinates=graph.city_coordinates, seed=seed)
+    path, _, _ = anytimeMainLoop(ga, CLUSTER_POPULATION_SIZE, max_generations=CLUSTER_GENERATIONS, opt=True)
+    return path[:-1]
+
+CLUSTER_SOLVERS = {
+    'nn'            : _nearestNeighborCluster,
+    'christofides'  : _christofidesCluster,
+    'ga'            : _geneticAlgorithmCluster,
+}
+
+def _solveCluster(cluster_coordinates, edge_weight_type, method, seed):
+    """Solve one cluster in a worker process.
+
+    returns:
+        list: The cluster tour (open) as indices into cluster_coordinates
+    """
+    if len(cluster_coordinates) < 4:
+        return list(range(len(cluster_coordinates)))
+    graph = Graph.fromMatrix(cluster_coordinates, build_distance_matrix(cluster_coordinates, edge_weight_type), edge_weight_type)
+    return list(map(int, CLUSTER_SOLVERS[method](graph, seed)))
+
+def cluster_order(centroids, edge_weight_type=None):
+    """The order to visit the clusters in: a nearest neighbor tour through the centroids, improved with Or-2opt."""
+    if len(centroids) < 4:
+        return list(range(len(centroids)))
+    graph = Graph.fromMatrix(centroids, build_distance_matrix(centroids, edge_weight_type), edge_weight_type)
+    return _nearestNeighborCluster(graph, None)
+
+def stitch_tours(city_coordinates, cluster_tours, edge_weight_type=None):
+    """Join cluster tours, given in visiting order, into one tour.
+
+    Every cluster tour is opened at the edge that is cheapest to give up, given the city the tour arrives from (the
+    exit of the previous cluster) and where it goes next (the centroid of the next cluster), in either direction.
+
+    args:
+        city_coordinates: The (n, 2) coordinates of all cities
+        cluster_tours: One array of city indices (a closed cycle without the repeated start city) per cluster
+    returns:
+        tuple: The tour (open) and the pairs of cities joined across clusters
+    """
+    coordinates = np.asarray(city_coordinates, dtype=np.float64)
+    centroids = [coordinates[tour].mean(axis=0) for tour in cluster_tours]
+    num_of_clusters = len(cluster_tours)
+    # The first cluster does not know the exit of the last one yet, its centroid stands in for it
+    previous_exit = centroids[-1]
+    paths, joins, last_city = [], [], None
+
+    for index, tour in enumerate(cluster_tours):
+        tour = np.asarray(tour, dtype=np.intp)
+        if len(tour) == 1:
+            path = tour
+        else:
+            following = np.roll(tour, -1)
+            next_centroid = centroids[(index + 1) % num_of_clusters]
+            removed = paired_edge_weights(coordinates[tour], coordinates[following], edge_weight_type)
+            entry_weights = paired_edge_weights(previous_exit, coordinates[tour], edge_weight_type)
+            exit_weights = paired_edge_weights(coordinates[tour], next_centroid, edge_weight_type)
+            # Cutting edge (tour[k], tour[k + 1]): enter at tour[k + 1] and leave from tour[k], or the reverse
+            forward = np.roll(entry_weights, -1) + exit_weights - removed
+            backward = entry_weights + np.roll(exit_weights, -1) - removed
+            k = int(np.argmin(np.minimum(forward, backward)))
+            if forward[k] <= backward[k]:
+                path = np.roll(tour, -(k + 1))
+            else:
+                path = np.roll(tour[::-1], k + 1)
+        if last_city is not None:
+            joins.append((last_city, int(path[0])))
+        paths.append(path)
+        last_city = int(path[-1])
+        previous_exit = coordinates[last_city]
+
+    if num_of_clusters > 1:
+        joins.append((last_city, int(paths[0][0])))
+    return np.concatenate(paths), joins
+
+def boundary_cities(cluster_labels, neighbors, joins=()):
+    """The cities with a candidate neighbor in another cluster, and the cities at the joins."""
+    crossing = (cluster_labels[neighbors] != cluster_labels[:, None]).any(axis=1)
+    joined = np.array(joins, dtype=np.intp).reshape(-1)
+    return np.union1d(np.flatnonzero(crossing), joined).tolist()
+
+@timer
+def decomposition_tsp(graph, cluster_size=CLUSTER_SIZE, partition='sfc', method='nn', boundary_method='or2opt', max_workers=None, seed=None):
+    """Solve a large instance by partitioning it into clusters, solving them in parallel and repairing the joins.
+
+    args:
+        graph: The Graph, its matrix is not used (a LazyDistanceMatrix is enough)
+        cluster_size: The number of cities per cluster
+        partition: The partition in PARTITION_METHODS, 'sfc', 'grid' or 'kmeans'
+        method: The cluster solver in CLUSTER_SOLVERS, 'nn', 'christofides' or 'ga'
+        boundary_method: The local search in LOCAL_SEARCH_OPERATORS run from the cities near the cluster borders,
+                         None to skip it
+        max_workers: The number of processes solving clusters
+        seed: Seed of the cluster solvers, every cluster gets its own stream (see spawn_seeds)
+    returns:
+        tuple: The tour (closed) and its cost
+    """
+    if partition not in PARTITION_METHODS:
+        raise ValueError(f"Unknown partition: {partition}, expected one of {list(PARTITION_METHODS)}")
+    if method not in CLUSTER_SOLVERS:
+        raise ValueError(f"Unknown cluster solver: {method}, expected one of {list(CLUSTER_SOLVERS)}")
+    if boundary_method is not None and boundary_method not in LOCAL_SEARCH_OPERATORS:
+        raise ValueError(f"Unknown local search operator: {boundary_method}, expected one of {list(LOCAL_SEARCH_OPERATORS)}")
+    if cluster_size < 1:
+        raise ValueError(f"The cluster size must be at least 1, got {cluster_size}")
+
+    coordinates = np.asarray(graph.city_coordinates, dtype=np.float64)[:graph.num_of_cities]
+    edge_weight_type = graph.edge_weight_type
+    clusters = PARTITION_METHODS[partition](coordinates, cluster_size)
+    centroids = np.array([coordinates[cluster].mean(axis=0) for cluster in clusters])
+    order = cluster_order(centroids, edge_weight_type)
+    clusters = [clusters[index] for index in order]
+
+    seeds = spawn_seeds(seed, len(clusters))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        cluster_tours = list(executor.map(_solveCluster, [coordinates[cluster] for cluster in clusters], [edge_weight_type] * len(clusters),
+                                          [method] * len(clusters), seeds))
+    cluster_tours = [cluster[tour] for cluster, tour in zip(clusters, cluster_tours)]
+    tour, joins = stitch_tours(coordinates, cluster_tours, edge_weight_type)
+
+    if boundary_method is not None and len(clusters) > 1 and len(tour) > 3:
+        cluster_labels = np.empty(len(coordinates), dtype=np.intp)
+        for label, cluster in enumerate(clusters):
+            cluster_labels[cluster] = label
+        neighbors = candidate_lists(coordinates, NUM_OF_NEIGHBORS)
+        active = boundary_cities(cluster_labels, neighbors, joins)
+        tour = tour.tolist()
+        LOCAL_SEARCH_OPERATORS[boundary_method](tour, weight_table(LazyDistanceMatrix(coordinates, edge_weight_type)), neighbors.tolist(), active)
+
+    tour = list(map(int, tour))
+    cost = tour_length(coordinates, tour, edge_weight_type)
+    return tour + tour[:1], cost
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("problem", nargs="?", help="A .tsp or .json problem file")
+    parser.add_argument("--random", type=int, default=None, help="Solve this many random cities instead of a problem file")
+    parser.add_argument("--cluster-size", type=int, default=CLUSTER_SIZE)
+    parser.add_argument("--partition", default="sfc", choices=list(PARTITION_METHODS))
+    parser.add_argument("--method", default="nn", choices=list(CLUSTER_SOLVERS))
+    parser.add_argument("--boundary", default="or2opt", choices=list(LOCAL_SEARCH_OPERATORS) + ['none'])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if (args.problem is None) == (args.random is None):
+        parser.error("give either a problem file or --random")
+
+    if args.problem:
+        graph = Graph(tsp_problem=args.problem, lazy=True)
+    else:
+        city_coordinates = np.random.default_rng(args.seed).uniform(0, 1000, size=(args.random, 2))
+        graph = Graph.fromMatrix(city_coordinates, LazyDistanceMatrix(city_coordinates))
+    start_time = time.perf_counter()
+    _, cost = decomposition_tsp(graph, args.cluster_size, args.partition, args.method, None if args.boundary == 'none' else args.boundary,
+                                args.workers, args.seed)
+    print(f"{graph.num_of_cities} cities, cost {cost:.0f} in {time.perf_counter() - start_time:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,127 @@
 from utils.gen_graph import Graph
 from helpers.genetic_algorithm_logging import GeneticAlgorithmLogging
+from utils.distance_matrix import tour_edges
+from utils.lazy_distance import LazyDistanceMatrix
+from local_search import neighbor_lists, weight_table, LOCAL_SEARCH_OPERATORS
+from incremental import repair_population, changed_neighborhood, reoptimize_tour
+from seeding import seed_population
+from crossover_operators import CROSSOVER_OPERATORS, BATCH_CROSSOVER_OPERATORS
+import numpy as np
 import random
+import time
+
+# Tournament size of the tournament selection, and how often the second winner is redrawn while it is a copy of the first
+TOURNAMENT_SIZE = 3
+MAX_SELECTION_RETRIES = 5
+
+def spawn_seeds(seed, count):
+    """Independent child seeds of one seed for parallel GeneticAlgorithm instances, e.g. seed=spawn_seeds(0, 8)[worker].
+    Every child seed gives its own reproducible random stream, however many workers run at the same time.
+
+    returns:
+        list: count np.random.SeedSequence objects
+    """
+    return np.random.SeedSequence(seed).spawn(count)
+
+def distinct_indices(rng, count, high, size):
+    """Draw count rows of 'size' different integers in [0, high) in a few bulk draws.
+
+    returns:
+        np.ndarray: A (count, size) integer array
+    """
+    if count == 0:
+        return np.empty((0, size), dtype=np.int64)
+    if size == 2:
+        # The second index is a random non-zero offset from the first, uniform over all ordered pairs
+        first = rng.integers(high, size=count)
+        return np.stack([first, (first + rng.integers(1, high, size=count)) % high], axis=1)
+    rows = rng.integers(high, size=(count, size))
+    # Redraw the (few) rows that contain a repeated index
+    repeated = np.flatnonzero((np.diff(np.sort(rows, axis=1), axis=1) == 0).any(axis=1)) if size > 1 else np.empty(0, dtype=np.intp)
+    while len(repeated):
+        rows[repeated] = rng.integers(high, size=(len(repeated), size))
+        still_repeated = (np.diff(np.sort(rows[repeated], axis=1), axis=1) == 0).any(axis=1)
+        repeated = repeated[still_repeated]
+    return rows
 
 class GeneticAlgorithm:
-    def __init__(self, pop_size, num_of_cities, matrix_graph, crossover_rate, mutation_rate):
+    def __init__(self, pop_size, num_of_cities, matrix_graph, crossover_rate, mutation_rate, crossover='ox', local_search='2opt', population=None,
+                 seeding=None, city_coordinates=None, seed=None):
+        """
+        seeding: A {strategy: fraction} dict of seeding.SEEDING_STRATEGIES used for that fraction of the initial population
+                 ('nn', 'greedy', 'sfc', 'christofides'), the rest are random permutations. Only random permutations when omitted.
+        city_coordinates: The city coordinates, needed by the 'sfc' seeding of a dense matrix
+        seed: Seed of the GA's own random stream (self.rng), an int, a np.random.SeedSequence (see spawn_seeds) or a
+              np.random.Generator. Drawn from the random module when omitted, so random.seed still makes runs reproducible.
+        """
+        if crossover not in CROSSOVER_OPERATORS:
+            raise ValueError(f"Unknown crossover operator: {crossover}, expected one of {list(CROSSOVER_OPERATORS)}")
+        if local_search not in LOCAL_SEARCH_OPERATORS:
+            raise ValueError(f"Unknown local search operator: {local_search}, expected one of {list(LOCAL_SEARCH_OPERATORS)}")
         self.pop_size = pop_size
         self.num_of_cities = num_of_cities
-        self.matrix_graph = matrix_graph
-        self.population = self.initPopulation()
+        # Lazy matrices compute the gathered weights from the coordinates, anything else becomes a dense array
+        self.matrix_graph = matrix_graph if isinstance(matrix_graph, LazyDistanceMatrix) else np.asarray(matrix_graph)
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(random.getrandbits(128) if seed is None else seed)
+        self.hash_weights = self.hashWeights(num_of_cities)
+        self.seeding = seeding or {}
+        self.city_coordinates = city_coordinates
+        # A given population (e.g. migrants or a resumed run) is used as is instead of random permutations
+        self.population = self.initPopulation() if population is None else np.asarray(population, dtype=np.int32)
+        # Number of tours scored so far, for evaluation budgets
+        self.evaluations = 0
+        self.fitness_scores = self.populationFitness(self.population)
+        self.population_hashes = self.populationHashes(self.population)
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
+        self.crossover = crossover
+        self.local_search = local_search
+        # Local search tables, built on the first guided mutation
+        self.neighbors = None
+        self.weights = None
 
     def initPopulation(self):
-        """ Initialize the population with random permutations of cities
+        """ Initialize the population with the seeding strategies and random permutations of cities
         args:
             pop_size: The number of individuals in the population
             num_of_cities: The number of cities in the TSP
         returns:
-            list: A list of random permutations of cities
+            np.ndarray: A (pop_size, num_of_cities) integer array where each row is a permutation of cities, the seeded ones first
+        """
+        return seed_population(self.matrix_graph, self.pop_size, self.seeding, self.rng, self.city_coordinates)
+
+    def hashWeights(self, num_of_cities):
+        """A random uint64 weight per city for populationHashes."""
+        return self.rng.integers(np.iinfo(np.uint64).max, size=num_of_cities, dtype=np.uint64, endpoint=True)
+
+    def populationFitness(self, population):
+        """ Compute the total distance of every path in a population in one gather-and-sum
+        args:
+            population: A (pop_size, num_of_cities) integer array of permutations of cities
+        returns:
+            np.ndarray: The total distance of each path, in population order
         """
-        population = []
-        for _ in range(self.pop_size):
-            individual = list(range(self.num_of_cities))
-            random.shuffle(individual)
-            population.append(individual)
-        return population
+        population = np.asarray(population)
+        self.evaluations += len(population)
+        return self.matrix_graph[population, np.roll(population, -1, axis=1)].sum(axis=1)
 
     def fitnessFunction(self, path):
         """ Compute the total distance of a path in the TSP
         args:
             path: A permutation of cities
-            matrix_graph: A 2D matrix representing the distances between cities
+            matrix_graph: A 2D NumPy array representing the distances between cities
         returns:
             tuple: A tuple containing the total distance and the distances between cities
         """
-        total_distance = 0
-        distances = []
-        
-        for i in range(len(path) - 1):
-            city1 = path[i]
-            city2 = path[i + 1]
-            
-            if not (0 <= city1 < self.num_of_cities and 0 <= city2 < self.num_of_cities):
-                raise IndexError(f"Invalid city index: city1={city1}, city2={city2}")
-            
-            dist = self.matrix_graph[city1][city2]
-            distances.append((city1, city2, dist))
-            total_distance += dist
-        
-        city1 = path[-1]
-        city2 = path[0]
-        
-        if not (0 <= city1 < self.num_of_cities and 0 <= city2 < self.num_of_cities):
-            raise IndexError(f"Invalid city index: city1={city1}, city2={city2}")
-        
-        dist = self.matrix_graph[city1][city2]
-        distances.append((city1, city2, dist))
-        total_distance += dist
+        cities, next_cities = tour_edges(path)
+
+        if len(cities) and (cities.min() < 0 or cities.max() >= self.num_of_cities):
+            invalid = int(np.argmax((cities < 0) | (cities >= self.num_of_cities)))
+            raise IndexError(f"Invalid city index: city1={cities[invalid]}, city2={next_cities[invalid]}")
+
+        edge_weights = self.matrix_graph[cities, next_cities]
+        total_distance = edge_weights.sum().item()
+        distances = list(zip(cities.tolist(), next_cities.tolist(), edge_weights.tolist()))
         
         return total_distance, distances
 
@@ -70,36 +135,66 @@ class GeneticAlgorithm:
         """
         return [f"{str(city + 1)}" for city in path]
 
+    def populationHashes(self, population):
+        """ Compute a hash for every path in a population so identical paths can be found in O(1)
+        args:
+            population: A (pop_size, num_of_cities) integer array of permutations of cities
+        returns:
+            np.ndarray: A uint64 hash per path, in population order
+        """
+        population = np.asarray(population).astype(np.uint64) + np.uint64(1)
+        return (population * self.hash_weights).sum(axis=1)
+
+    def tournamentSelection(self):
+        """Select the indices of two different individuals using tournament selection on the cached fitness scores
+
+        returns:
+            tuple: A tuple containing the population indices of the two selected individuals
+        """
+        first, second = self.selectPairs(1)[0].tolist()
+        return first, second
+
+    def tournamentWinners(self, count):
+        """Run count tournaments of TOURNAMENT_SIZE different individuals at once and return the index of every winner."""
+        tournament_size = min(TOURNAMENT_SIZE, len(self.population))
+        tournaments = distinct_indices(self.rng, count, len(self.population), tournament_size)
+        return tournaments[np.arange(count), np.argmin(self.fitness_scores[tournaments], axis=1)]
+
+    def selectPairs(self, num_of_pairs):
+        """Select the parents of a whole generation with tournament selection, all tournaments drawn in bulk.
+
+        args:
+            num_of_pairs: The number of parent pairs
+        returns:
+            np.ndarray: A (num_of_pairs, 2) array of population indices
+        """
+        pairs = self.tournamentWinners(2 * num_of_pairs).reshape(num_of_pairs, 2)
+
+        # Identical paths share a hash, so redraw the second tournament while its winner is a copy of the first selected individual
+        copies = np.flatnonzero(self.population_hashes[pairs[:, 0]] == self.population_hashes[pairs[:, 1]])
+        for _ in range(MAX_SELECTION_RETRIES):
+            if not len(copies):
+                break
+            pairs[copies, 1] = self.tournamentWinners(len(copies))
+            copies = copies[self.population_hashes[pairs[copies, 0]] == self.population_hashes[pairs[copies, 1]]]
+
+        return pairs
+
     def selectionFunction(self):
         """Select two different individuals from the population using tournament selection
 
         args:
-            population: A list of individuals (permutations of cities)
-            matrix_graph: A 2D matrix representing the distances between cities
+            population: A 2D array of individuals (permutations of cities)
+            fitness_scores: The cached total distance of each individual
         returns:
             tuple: A tuple containing the two selected individuals
         """
-        tournament_size = min(3, len(self.population))
-        selected = []
-        for _ in range(2):
-            tournament = random.sample(self.population, tournament_size)
-            fitness_scores = [self.fitnessFunction(individual)[0] for individual in tournament]
-            best_individual = tournament[fitness_scores.index(min(fitness_scores))]
-            
-            max_retries, retries = 5, 0
-            while best_individual in selected and retries < max_retries:
-                tournament = random.sample(self.population, tournament_size)
-                fitness_scores = [self.fitnessFunction(individual)[0] for individual in tournament]
-                best_individual = tournament[fitness_scores.index(min(fitness_scores))]
-                retries += 1
-
-            selected.append(best_individual)
-
-        return tuple(selected)
+        return tuple(self.population[index] for index in self.tournamentSelection())
 
     def crossoverFunction(self, parent1, parent2):
         """Performs crossover (recombination) between two parents to produce two offspring.
         This might give worse solution, but the diversity it makes can be benefical in the long run. 
+        The operator is chosen with the 'crossover' argument of the constructor ('ox', 'pmx' or 'erx').
 
         args:
             parent1: A permutation of cities (first parent)
@@ -107,29 +202,61 @@ class GeneticAlgorithm:
         returns:
             tuple: A tuple containing two offspring (permutations of cities)
         """
-        if random.random() > self.crossover_rate:
+        if self.rng.random() > self.crossover_rate:
             return parent1, parent2
         
-        offspring1 = [-1] * len(parent1)
-        offspring2 = [-1] * len(parent2)
-        start, end = sorted(random.sample(range(len(parent1)), 2))
-        offspring1[start:end] = parent1[start:end]
-        offspring2[start:end] = parent2[start:end]
-
-        for i in range(len(parent1)):
-            if offspring1[i] == -1:
-                for gene in parent2:
-                    if gene not in offspring1:
-                        offspring1[i] = gene
-                        break
-
-            if offspring2[i] == -1:
-                for gene in parent1:
-                    if gene not in offspring2:
-                        offspring2[i] = gene
-                        break
-
-        return offspring1, offspring2
+        parent1, parent2 = np.asarray(parent1), np.asarray(parent2)
+        start, end = np.sort(distinct_indices(self.rng, 1, len(parent1), 2)[0]).tolist()
+        operator = CROSSOVER_OPERATORS[self.crossover]
+
+        return operator(parent1, parent2, start, end), operator(parent2, parent1, start, end)
+
+    def crossoverPopulation(self, first_parents, second_parents):
+        """Performs crossover for every selected pair of a generation in one call.
+        Operators with a batched variant build all the offspring at once, the others fall back to one pair at a time.
+
+        args:
+            first_parents: Population indices of the first parent of every pair
+            second_parents: Population indices of the second parent of every pair
+        returns:
+            tuple: A (2 * pairs, num_of_cities) array of offspring, where offspring 2i and 2i+1 come from pair i,
+                   and for each offspring the index of the parent it is an unchanged copy of, or -1 if it is new
+        """
+        first_parents = np.asarray(first_parents, dtype=np.intp)
+        second_parents = np.asarray(second_parents, dtype=np.intp)
+        num_of_pairs = len(first_parents)
+
+        offspring = np.empty((2 * num_of_pairs, self.num_of_cities), dtype=self.population.dtype)
+        offspring[0::2] = self.population[first_parents]
+        offspring[1::2] = self.population[second_parents]
+        parent_indices = np.empty(2 * num_of_pairs, dtype=np.intp)
+        parent_indices[0::2] = first_parents
+        parent_indices[1::2] = second_parents
+
+        # The decisions and cut points of the whole generation are drawn in bulk
+        crossed = self.rng.random(num_of_pairs) <= self.crossover_rate
+        if not crossed.any():
+            return offspring, parent_indices
+
+        cut_points = np.sort(distinct_indices(self.rng, np.count_nonzero(crossed), self.num_of_cities, 2), axis=1)
+        parents1, parents2 = offspring[0::2][crossed], offspring[1::2][crossed]
+
+        if self.crossover in BATCH_CROSSOVER_OPERATORS:
+            operator = BATCH_CROSSOVER_OPERATORS[self.crossover]
+            children1 = operator(parents1, parents2, cut_points[:, 0], cut_points[:, 1])
+            children2 = operator(parents2, parents1, cut_points[:, 0], cut_points[:, 1])
+        else:
+            operator = CROSSOVER_OPERATORS[self.crossover]
+            children1 = np.array([operator(p1, p2, start, end) for p1, p2, (start, end) in zip(parents1, parents2, cut_points)])
+            children2 = np.array([operator(p2, p1, start, end) for p1, p2, (start, end) in zip(parents1, parents2, cut_points)])
+
+        crossed_pairs = np.flatnonzero(crossed)
+        offspring[2 * crossed_pairs] = children1
+        offspring[2 * crossed_pairs + 1] = children2
+        parent_indices[2 * crossed_pairs] = -1
+        parent_indices[2 * crossed_pairs + 1] = -1
+
+        return offspring, parent_indices
     
     def mutationFunction(self, individual):
         """Perform mutation on an individual by swapping two random cities
@@ -138,23 +265,47 @@ class GeneticAlgorithm:
         returns:
             list: A mutated individual (permutation of cities)
         """
-        if random.random() > self.mutation_rate:
+        if self.rng.random() > self.mutation_rate:
             return individual
         
         mutated = individual.copy()
-        city1, city2 = random.sample(range(len(individual)), 2)
+        city1, city2 = distinct_indices(self.rng, 1, len(individual), 2)[0].tolist()
         mutated[city1], mutated[city2] = mutated[city2], mutated[city1]
 
         return mutated
+
+    def mutatePopulation(self, offspring):
+        """Swap mutation of a whole generation's offspring, in place, with the decisions and positions drawn in bulk
+        args:
+            offspring: A (num_of_offspring, num_of_cities) integer array, modified in place
+        returns:
+            tuple: The offspring array and a boolean mask of the offspring that were mutated
+        """
+        mutated = self.rng.random(len(offspring)) <= self.mutation_rate
+        if self.num_of_cities < 2:
+            mutated[:] = False
+        rows = np.flatnonzero(mutated)
+        swaps = distinct_indices(self.rng, len(rows), self.num_of_cities, 2)
+        first, second = offspring[rows, swaps[:, 0]], offspring[rows, swaps[:, 1]]
+        offspring[rows, swaps[:, 0]], offspring[rows, swaps[:, 1]] = second, first
+        return offspring, mutated
     
     def guidedMutationFunction(self, individual, generation, num_generations):
-        """Perform mutation on an individual using the 2-opt algorithm
+        """Perform mutation on an individual using a local search from local_search.py (memetic step).
+        The operator is chosen with the 'local_search' argument of the constructor ('2opt', 'oropt', 'or2opt' or 'lk').
 
         args:
             individual: A permutation of cities
         returns:
-            list: A mutated individual (permutation of cities)
+            np.ndarray: A mutated individual (permutation of cities)
         """
+        if self.rng.random() > self.guidedMutationRate(generation, num_generations):
+            return individual
+
+        return self.localSearch(individual)
+
+    def guidedMutationRate(self, generation, num_generations):
+        """The share of the offspring improved by the local search, which goes down during the run."""
         mutation_rate = 0
         
         # Calculate how much of the function that should be mutated depending on the generation
@@ -166,29 +317,64 @@ class GeneticAlgorithm:
             mutation_rate = 0.02
         elif generation > 0.75 * num_generations:
             mutation_rate = 0.01
-            
-        if random.random() > mutation_rate:
-            return individual
-        
-        def swap(path, i, k):
-            new_path = path[:i] + path[i:k+1][::-1] + path[k+1:]
-            return new_path
-        
-        best_path = individual.copy()
-        best_distance, _ = self.fitnessFunction(best_path)
-        improved = True
-        while improved:
-            improved = False
-            for i in range(1, len(best_path) - 1):
-                for k in range(i + 1, len(best_path)):
-                    new_path = swap(best_path, i, k)
-                    new_distance, _ = self.fitnessFunction(new_path)
-                    if new_distance < best_distance:
-                        best_path = new_path
-                        best_distance = new_distance
-                        improved = True
+        return mutation_rate
+
+    def localSearch(self, individual, deadline=None):
+        """Improve a copy of an individual with the local search operator of the GA, stopping early at the deadline
+        (a time.perf_counter() value) when one is given."""
+        if self.neighbors is None:
+            self.neighbors = neighbor_lists(self.matrix_graph).tolist()
+            self.weights = weight_table(self.matrix_graph)
+
+        best_path = np.asarray(individual).tolist()
+        LOCAL_SEARCH_OPERATORS[self.local_search](best_path, self.weights, self.neighbors, deadline=deadline)
                         
-        return best_path
+        return np.array(best_path, dtype=np.asarray(individual).dtype)
+
+    def guidedMutationPopulation(self, offspring, generation, num_generations, deadline=None):
+        """Guided mutation of a whole generation's offspring, in place, with the decisions drawn in bulk
+        args:
+            offspring: A (num_of_offspring, num_of_cities) integer array, modified in place
+            deadline: Optional time.perf_counter() value, offspring not reached by then are left as they are
+        returns:
+            tuple: The offspring array and a boolean mask of the offspring that went through the local search
+        """
+        mutated = self.rng.random(len(offspring)) <= self.guidedMutationRate(generation, num_generations)
+        for row in np.flatnonzero(mutated).tolist():
+            if deadline is not None and time.perf_counter() >= deadline:
+                mutated[row:] = False
+                break
+            offspring[row] = self.localSearch(offspring[row], deadline)
+        return offspring, mutated
+
+    def warmStart(self, matrix_graph, mapping=None, inserted=()):
+        """ Carry the population over to a graph changed with Graph.addCities/removeCities/moveCities instead of
+            restarting from random permutations. Every path is repaired with cheapest insertion and the best one
+            is improved with the local search around the changed cities.
+        args:
+            matrix_graph: The distance matrix of the changed graph
+            mapping: The index mapping returned by Graph.removeCities, None when no city was removed
+            inserted: The cities returned by Graph.addCities and Graph.moveCities
+        """
+        # Hash weights belong to tour positions, the longer or shorter tours get a new set
+        num_of_cities = len(matrix_graph)
+        self.hash_weights = self.hashWeights(num_of_cities)
+
+        self.matrix_graph = matrix_graph if isinstance(matrix_graph, LazyDistanceMatrix) else np.asarray(matrix_graph)
+        self.num_of_cities = num_of_cities
+        self.neighbors = None
+        self.weights = None
+        population = repair_population(self.population, self.matrix_graph, mapping, inserted).astype(np.int32)
+        fitness_scores = self.populationFitness(population)
+        # The repair keeps the order of the tours, so the best repaired tour's changed cities come from its own old tour
+        best = int(np.argmin(fitness_scores))
+        active = changed_neighborhood(self.population[best], mapping, inserted)
+        population[best], fitness_scores[best] = reoptimize_tour(population[best], self.matrix_graph, active, self.local_search)
+
+        order = np.argsort(fitness_scores, kind='stable')
+        self.population = population[order]
+        self.fitness_scores = fitness_scores[order]
+        self.population_hashes = self.populationHashes(self.population)
 
     def run(self):
         GeneticAlgorithmLogging.logPopulationAndPath()
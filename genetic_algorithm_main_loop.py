@@ -1,46 +1,189 @@
 from genetic_algorithm import GeneticAlgorithm
 from helpers.calculate_path_distance import calculate_path_distance
+from utils.telemetry import TELEMETRY_OFF, TELEMETRY_OPERATORS, OPERATORS, population_diversity
 from utils.decorators import timer
+import numpy as np
+import time
 
-@timer
-def geneticAlgorithmMainLoop(ga: GeneticAlgorithm, num_generations, population_size, graph, opt=None, optimal_solution=None):
-    
-    for generation in range(num_generations):
-        new_offspring = []
-        
-        # Selection and Crossover
-        for _ in range(population_size // 2):
-            selected = ga.selectionFunction()
-            offspring = ga.crossoverFunction(selected[0], selected[1])
-            new_offspring.extend(offspring)
+def evolveGenerations(ga: GeneticAlgorithm, start_generation, end_generation, num_generations, population_size, opt=None, optimal_solution=None, telemetry=None,
+                      profiler=None, renderer=None, checkpointer=None, deadline=None):
+    """Evolve the population of 'ga' for the generations [start_generation, end_generation) of a run of num_generations.
+    The guided mutation rate depends on the position of the generation in the whole run.
+    An optional MetricsRecorder (utils/telemetry.py) receives the metrics of every generation, as far as its level asks for them,
+    and an optional OperatorProfiler (utils/profiler.py) the time and call counts of every operator.
+    An optional TourRenderer (utils/renderer.py) receives the best tour of every generation and draws it in the background,
+    and an optional Checkpointer (utils/checkpoint.py) the GA at the end of every generation, to checkpoint it periodically.
+    An optional deadline (a time.perf_counter() value) cuts the guided mutation short once it has passed.
+
+    returns:
+        int: The number of the generation after the last one that was run (stops early when optimal_solution is reached)
+    """
+    for generation in range(start_generation, end_generation):
+        # One timestamp per phase, turned into operator timings only when the telemetry or the profiler asks for them
+        stamps = [time.perf_counter_ns()]
+
+        # Selection and Crossover, the tournaments, crossover decisions and cut points of the generation are drawn in bulk
+        selected = ga.selectPairs(population_size // 2)
+        stamps.append(time.perf_counter_ns())
+        # Offspring returned untouched by crossover keep a reference to their parent's cached score
+        new_offspring, parent_indices = ga.crossoverPopulation(selected[:, 0], selected[:, 1])
+        if profiler is not None:
+            # Both children of a recombined pair are new, the others are copies of their parents
+            num_crossed = np.count_nonzero(parent_indices < 0) // 2
+        stamps.append(time.perf_counter_ns())
         
         # Mutation
         if not opt:
-            mutated_offspring = [ga.mutationFunction(individual) for individual in new_offspring]
+            mutated_offspring, mutated = ga.mutatePopulation(new_offspring)
         else:
-            mutated_offspring = [ga.guidedMutationFunction(individual, generation, num_generations) for individual in new_offspring]
+            mutated_offspring, mutated = ga.guidedMutationPopulation(new_offspring, generation, num_generations, deadline)
+        parent_indices[mutated] = -1
+        if profiler is not None:
+            num_mutated = np.count_nonzero(mutated)
+        stamps.append(time.perf_counter_ns())
+
+        # Only the offspring changed by crossover or mutation are scored, everything else reuses the cached scores
+        changed = parent_indices < 0
+        offspring_scores = ga.fitness_scores[parent_indices]
+        offspring_hashes = ga.population_hashes[parent_indices]
+        offspring_scores[changed] = ga.populationFitness(mutated_offspring[changed])
+        offspring_hashes[changed] = ga.populationHashes(mutated_offspring[changed])
+        stamps.append(time.perf_counter_ns())
 
         # Form New Population
-        new_population = ga.population + mutated_offspring  # Combine old and new population
-        fitness_scores = [ga.fitnessFunction(individual)[0] for individual in new_population]
+        new_population = np.concatenate((ga.population, mutated_offspring))  # Combine old and new population
+        fitness_scores = np.concatenate((ga.fitness_scores, offspring_scores))
+        population_hashes = np.concatenate((ga.population_hashes, offspring_hashes))
         
         # Select the Best Individuals
-        sorted_population = [individual for _, individual in sorted(zip(fitness_scores, new_population))]
-        ga.population = sorted_population[:population_size]
-        
-        # Evaluate new population
-        fitness_scores = [ga.fitnessFunction(individual)[0] for individual in ga.population]
+        survivors = np.argsort(fitness_scores, kind='stable')[:population_size]
+        ga.population = new_population[survivors]
+        ga.fitness_scores = fitness_scores[survivors]
+        ga.population_hashes = population_hashes[survivors]
+        stamps.append(time.perf_counter_ns())
+
+        if profiler is not None:
+            calls = (len(selected) * 2, num_crossed, len(new_offspring), np.count_nonzero(changed), len(fitness_scores))
+            profiler.recordGeneration(generation, np.diff(stamps).tolist(), calls, num_mutated)
+        if telemetry is not None and telemetry.level > TELEMETRY_OFF:
+            timings = dict(zip(OPERATORS, (np.diff(stamps) / 1e9).tolist())) if telemetry.level >= TELEMETRY_OPERATORS else None
+            telemetry.recordGeneration(generation, ga.fitness_scores[0], ga.fitness_scores.mean(), population_diversity(ga.population_hashes),
+                                       np.count_nonzero(changed), timings)
+        if renderer is not None:
+            renderer.recordGeneration(generation, ga.population[0], ga.fitness_scores[0])
+        if checkpointer is not None:
+            checkpointer.recordGeneration(generation, ga)
 
-        # Stopping criterion
+        # Stopping criterion, the population is already sorted so the best score is the first one
         if optimal_solution:
-            if sorted(fitness_scores)[0] <= optimal_solution:
+            if ga.fitness_scores[0] <= optimal_solution:
                 print(f"Optimal solution found in generation {generation}")
-                break
+                return generation + 1
+
+    return end_generation
+
+@timer
+def geneticAlgorithmMainLoop(ga: GeneticAlgorithm, num_generations, population_size, graph, opt=None, optimal_solution=None, telemetry=None, profiler=None,
+                             renderer=None, checkpointer=None, start_generation=0):
+    """Run the GA for num_generations, or for the rest of them from start_generation when a run is resumed from a
+    checkpoint (see utils/checkpoint.py).
+
+    returns:
+        tuple: The best path (closed) and its cost
+    """
+    evolveGenerations(ga, start_generation, num_generations, num_generations, population_size, opt, optimal_solution, telemetry, profiler, renderer,
+                      checkpointer)
+    if telemetry is not None:
+        telemetry.flush()
 
-    GA_final_path = ga.population[0]
+    GA_final_path = ga.population[0].tolist()
     
     if GA_final_path[0] != GA_final_path[-1]:
         GA_final_path.append(GA_final_path[0])
 
     GA_final_cost = calculate_path_distance(graph, GA_final_path)
-    return GA_final_path, GA_final_cost
\ No newline at end of file
+    return GA_final_path, GA_final_cost
+
+def anytimeGenerations(ga: GeneticAlgorithm, population_size, time_budget=None, evaluation_budget=None, max_generations=None, stagnation_generations=None,
+                       min_diversity=None, opt=None, optimal_solution=None, telemetry=None, profiler=None,
+                       renderer=None):
+    """Anytime GA run: evolve one generation at a time until a budget is spent or the search has converged,
+    yielding the incumbent every time it improves (and once right away, for the initial population).
+
+    args:
+        time_budget: Wall-clock seconds. The guided mutation stops at the end of the budget, and a generation is only
+                     started when it is expected to finish in time (it takes about as long as the previous one)
+        evaluation_budget: Number of tours scored (ga.evaluations), including the initial population
+        max_generations: Number of generations
+        stagnation_generations: Stop after this many generations without a better best tour
+        min_diversity: Stop when the share of distinct tours in the population falls below this
+        optimal_solution: Stop once the best tour is this short
+    yields:
+        tuple: The best path (closed, start city repeated at the end), its cost, the generation and the elapsed seconds
+    returns:
+        str: Why the run stopped, 'time', 'evaluations', 'generations', 'stagnation', 'diversity' or 'optimal'
+             (the value of the StopIteration, see anytimeMainLoop)
+    """
+    if time_budget is None and evaluation_budget is None and max_generations is None and stagnation_generations is None:
+        raise ValueError("anytimeGenerations needs a time_budget, evaluation_budget, max_generations or stagnation_generations to stop")
+
+    start_time = time.perf_counter()
+    # The survivor selection keeps the population sorted, a population passed in from elsewhere may not be
+    order = np.argsort(ga.fitness_scores, kind='stable')
+    ga.population, ga.fitness_scores, ga.population_hashes = ga.population[order], ga.fitness_scores[order], ga.population_hashes[order]
+
+    best_cost = ga.fitness_scores[0].item()
+    yield _closedPath(ga.population[0]), best_cost, 0, time.perf_counter() - start_time
+
+    # The guided mutation of the generation running at the end of the time budget stops there
+    deadline = None if time_budget is None else start_time + time_budget
+    generation, last_improvement, generation_time = 0, 0, 0
+    while True:
+        elapsed = time.perf_counter() - start_time
+        if optimal_solution and best_cost <= optimal_solution:
+            return 'optimal'
+        # The next generation is expected to take as long as the last one, it is not started when it would end past the budget
+        if time_budget is not None and elapsed + generation_time >= time_budget:
+            return 'time'
+        if evaluation_budget is not None and ga.evaluations >= evaluation_budget:
+            return 'evaluations'
+        if max_generations is not None and generation >= max_generations:
+            return 'generations'
+        if stagnation_generations is not None and generation - last_improvement >= stagnation_generations:
+            return 'stagnation'
+        if min_diversity is not None and population_diversity(ga.population_hashes) < min_diversity:
+            return 'diversity'
+
+        # The guided mutation rate follows the progress through the budget, so estimate the length of the whole run
+        # (without a budget, e.g. only a stagnation rule, the run stays in the first quarter of the schedule)
+        progress = max(elapsed / time_budget if time_budget else 0, ga.evaluations / evaluation_budget if evaluation_budget else 0,
+                       generation / max_generations if max_generations else 0)
+        num_generations = max_generations or (int(generation / progress) if progress > 0 else 4 * generation) + 1
+        generation = evolveGenerations(ga, generation, generation + 1, num_generations, population_size, opt, None, telemetry, profiler, renderer,
+                                       deadline=deadline)
+        generation_time = time.perf_counter() - start_time - elapsed
+
+        if ga.fitness_scores[0] < best_cost:
+            best_cost, last_improvement = ga.fitness_scores[0].item(), generation
+            yield _closedPath(ga.population[0]), best_cost, generation, time.perf_counter() - start_time
+
+def _closedPath(individual):
+    path = individual.tolist()
+    return path + path[:1]
+
+@timer
+def anytimeMainLoop(ga: GeneticAlgorithm, population_size, callback=None, **budgets):
+    """Run anytimeGenerations to the end, calling callback(path, cost, generation, elapsed) on every new incumbent.
+    See anytimeGenerations for the budgets and stopping rules.
+
+    returns:
+        tuple: The best path (closed), its cost and why the run stopped
+    """
+    incumbents = anytimeGenerations(ga, population_size, **budgets)
+    while True:
+        try:
+            path, cost, generation, elapsed = next(incumbents)
+        except StopIteration as stop:
+            return path, cost, stop.value
+        if callback is not None:
+            callback(path, cost, generation, elapsed)
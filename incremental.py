@@ -0,0 +1,127 @@
+"""Warm-start re-optimization after cities are added, removed or moved with Graph.addCities/removeCities/moveCities.
+
+Instead of solving the changed graph from scratch, the existing tours are repaired: removed cities are dropped, the
+others renumbered, and the added and moved cities are put back with cheapest insertion. The local search then only
+starts from the changed cities and the cities next to them, so the work depends on the size of the change.
+"""
+from local_search import LOCAL_SEARCH_OPERATORS, NUM_OF_NEIGHBORS
+from utils.lazy_distance import LazyDistanceMatrix
+import numpy as np
+
+class NearestNeighbors:
+    """Candidate neighbor lists computed on demand from the distance rows, for the few cities a local search around
+    a change visits. Indexable like the (n, k) array of neighbor_lists."""
+
+    def __init__(self, matrix_graph, k=NUM_OF_NEIGHBORS):
+        self.matrix_graph = matrix_graph
+        self.k = min(k, len(matrix_graph) - 1)
+        self.lists = {}
+
+    def __getitem__(self, city):
+        neighbors = self.lists.get(city)
+        if neighbors is None:
+            distances = np.array(self.matrix_graph[city], dtype=np.float64)
+            distances[city] = np.inf
+            nearest = np.argpartition(distances, self.k - 1)[:self.k] if self.k > 0 else np.empty(0, dtype=np.intp)
+            neighbors = nearest[np.argsort(distances[nearest], kind='stable')].tolist()
+            self.lists[city] = neighbors
+        return neighbors
+
+def repair_population(population, matrix_graph, mapping=None, inserted=()):
+    """Repair tours after a graph change, for all tours at once.
+
+    args:
+        population: A (pop_size, old_num_of_cities) integer array of tours
+        matrix_graph: The distance matrix of the changed graph
+        mapping: The new index of every old city (-1 for removed cities) as returned by Graph.removeCities
+        inserted: Cities (new indices) to insert with cheapest insertion, the added ones and the moved ones,
+                  moved cities are taken out of the tours first
+    returns:
+        np.ndarray: A (pop_size, num_of_cities) integer array of tours of the changed graph
+    """
+    population = np.atleast_2d(np.asarray(population, dtype=np.intp))
+    pop_size = len(population)
+    if mapping is not None:
+        population = np.asarray(mapping)[population]
+        population = population[population >= 0].reshape(pop_size, -1)
+    inserted = np.asarray(inserted, dtype=np.intp).reshape(-1)
+    if len(inserted):
+        population = population[~np.isin(population, inserted)].reshape(pop_size, -1)
+
+    rows = np.arange(pop_size)
+    for city in inserted.tolist():
+        size = population.shape[1]
+        if size < 2:
+            population = np.concatenate([population, np.full((pop_size, 1), city)], axis=1)
+            continue
+        following = np.roll(population, -1, axis=1)
+        insertion_costs = matrix_graph[population, city] + matrix_graph[city, following] - matrix_graph[population, following]
+        # Insert after the cheapest position, shifting the rest of the tour right by one
+        positions = np.argmin(insertion_costs, axis=1) + 1
+        columns = np.arange(size + 1)
+        source = np.clip(np.where(columns < positions[:, None], columns, columns - 1), 0, size - 1)
+        population = np.take_along_axis(population, source, axis=1)
+        population[rows, positions] = city
+    return population
+
+def changed_neighborhood(tour, mapping=None, inserted=()):
+    """The cities the local search starts from after a change: the inserted cities and the cities next to the
+    removed and moved ones in the old tour (new indices).
+    """
+    tour = np.asarray(tour, dtype=np.intp)
+    inserted = np.asarray(inserted, dtype=np.intp).reshape(-1)
+    renumbered = tour if mapping is None else np.asarray(mapping)[tour]
+    changed = renumbered < 0
+    if len(inserted):
+        changed |= np.isin(renumbered, inserted)
+    positions = np.flatnonzero(changed)
+    touched = np.concatenate([renumbered[(positions - 1) % len(tour)], renumbered[(positions + 1) % len(tour)], inserted])
+    return np.unique(touched[touched >= 0]).tolist()
+
+def reoptimize_tour(tour, matrix_graph, active, method='or2opt', neighbors=None):
+    """Run one of the local search operators only from the given cities.
+
+    args:
+        tour: A permutation of cities (open)
+        matrix_graph: The distance matrix
+        active: The cities to start from, e.g. changed_neighborhood
+        method: The name of the operator in LOCAL_SEARCH_OPERATORS
+        neighbors: Candidate neighbor lists, computed on demand for the visited cities when omitted
+    returns:
+        tuple: The improved tour and its total distance
+    """
+    if method not in LOCAL_SEARCH_OPERATORS:
+        raise ValueError(f"Unknown local search operator: {method}, expected one of {list(LOCAL_SEARCH_OPERATORS)}")
+    tour = list(map(int, tour))
+    # The operators read weights[a][b], rows of a dense matrix are indexed directly instead of building the nested lists
+    weights = matrix_graph.weightTable() if isinstance(matrix_graph, LazyDistanceMatrix) else np.asarray(matrix_graph)
+    if neighbors is None:
+        neighbors = NearestNeighbors(matrix_graph)
+    if len(tour) > 3:
+        LOCAL_SEARCH_OPERATORS[method](tour, weights, neighbors, list(active))
+    tour_array = np.asarray(tour)
+    cost = matrix_graph[tour_array, np.roll(tour_array, -1)].sum().item()
+    return tour, cost
+
+def reoptimize(graph, tour, mapping=None, inserted=(), method='or2opt'):
+    """Repair a tour of a graph that was changed and improve it around the changes.
+
+    args:
+        graph: The changed Graph
+        tour: A tour of the graph before the change, optionally closed
+        mapping: The index mapping returned by Graph.removeCities, None when no city was removed
+        inserted: The cities returned by Graph.addCities and Graph.moveCities
+        method: The local search run around the changed cities
+    returns:
+        tuple: The repaired tour (closed if the input was closed) and its total distance
+    """
+    tour = list(tour)
+    closed = len(tour) > 1 and tour[0] == tour[-1]
+    if closed:
+        tour.pop()
+    active = changed_neighborhood(tour, mapping, inserted)
+    repaired = repair_population([tour], graph.matrix_graph, mapping, inserted)[0]
+    tour, cost = reoptimize_tour(repaired, graph.matrix_graph, active, method)
+    if closed:
+        tour.append(tour[0])
+    return tour, cost
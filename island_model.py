@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import evolveGenerations
+from helpers.calculate_path_distance import calculate_path_distance
+from local_search import neighbor_lists, weight_table
+from utils.shared_matrix import share_matrix, attach_matrix
+from utils.lazy_distance import LazyDistanceMatrix
+from utils.decorators import timer
+import numpy as np
+import random
+
+MIGRATION_TOPOLOGIES = ('ring', 'random')
+
+# Worker process state, set once per worker by _initIslandWorker
+_shared_memory = None
+_matrix_graph = None
+_local_search_tables = None
+
+def _initIslandWorker(matrix_descriptor):
+    global _shared_memory, _matrix_graph
+    # A lazy matrix is only coordinates, it is sent to the workers as is
+    if isinstance(matrix_descriptor, LazyDistanceMatrix):
+        _matrix_graph = matrix_descriptor
+        return
+    _shared_memory, _matrix_graph = attach_matrix(matrix_descriptor)
+
+def _evolveIsland(population, ga_params, start_generation, end_generation, num_generations, population_size, opt, optimal_solution, seed):
+    """Run one epoch (the generations between two migrations) of a single island in a worker process."""
+    global _local_search_tables
+    ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=len(_matrix_graph), matrix_graph=_matrix_graph, population=population, seed=seed,
+                          **ga_params)
+
+    # The local search tables only depend on the matrix, so they are built once per worker
+    if opt:
+        if _local_search_tables is None:
+            _local_search_tables = (neighbor_lists(_matrix_graph).tolist(), weight_table(_matrix_graph))
+        ga.neighbors, ga.weights = _local_search_tables
+
+    last_generation = evolveGenerations(ga, start_generation, end_generation, num_generations, population_size, opt, optimal_solution)
+    order = np.argsort(ga.fitness_scores, kind='stable')
+    return ga.population[order], ga.fitness_scores[order], last_generation
+
+def migrate(populations, fitness_scores, migration_size, topology, rng=None):
+    """Copy the best migration_size tours of every island over the worst tours of another island.
+    Populations must be sorted from best to worst, they are modified in place and re-sorted.
+
+    args:
+        populations: One (population_size, num_of_cities) array per island
+        fitness_scores: One array of cached fitness scores per island
+        migration_size: The number of elite tours each island sends
+        topology: 'ring' sends to the next island, 'random' to a random other island
+        rng: The np.random.Generator the 'random' destinations are drawn from (a fresh unseeded one by default)
+    """
+    num_of_islands = len(populations)
+    if num_of_islands < 2 or migration_size <= 0:
+        return
+
+    if topology == 'ring':
+        destinations = [(island + 1) % num_of_islands for island in range(num_of_islands)]
+    else:
+        # An offset of 1 to num_of_islands - 1 picks every other island with the same probability
+        rng = np.random.default_rng() if rng is None else rng
+        offsets = rng.integers(1, num_of_islands, size=num_of_islands)
+        destinations = ((np.arange(num_of_islands) + offsets) % num_of_islands).tolist()
+
+    migrants = [(populations[island][:migration_size].copy(), fitness_scores[island][:migration_size].copy()) for island in range(num_of_islands)]
+    for island, destination in enumerate(destinations):
+        tours, scores = migrants[island]
+        count = min(len(tours), len(populations[destination]))
+        populations[destination][-count:] = tours[:count]
+        fitness_scores[destination][-count:] = scores[:count]
+
+    for island in range(num_of_islands):
+        order = np.argsort(fitness_scores[island], kind='stable')
+        populations[island][:] = populations[island][order]
+        fitness_scores[island][:] = fitness_scores[island][order]
+
+@timer
+def islandModelMainLoop(graph, num_of_islands, num_generations, population_size, crossover_rate, mutation_rate, migration_interval=10, migration_size=2,
+                        topology='ring', opt=None, optimal_solution=None, max_workers=None, seed=None, crossover='ox', local_search='2opt'):
+    """Run num_of_islands GeneticAlgorithm populations in a process pool and exchange elite tours every migration_interval generations.
+    The distance matrix is placed in shared memory once and mapped by every worker.
+
+    args:
+        graph: The Graph object containing the distance matrix
+        num_of_islands: The number of populations evolved in parallel
+        population_size: The population size of each island
+        topology: 'ring' or 'random' migration
+        seed: Base seed, every island and epoch gets its own derived seed so runs are reproducible
+    returns:
+        tuple: The best path (closed), its cost and a list with statistics for every island
+    """
+    if topology not in MIGRATION_TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {topology}, expected one of {list(MIGRATION_TOPOLOGIES)}")
+
+    seed = random.getrandbits(32) if seed is None else seed
+    ga_params = dict(crossover_rate=crossover_rate, mutation_rate=mutation_rate, crossover=crossover, local_search=local_search)
+    populations = [None] * num_of_islands
+    fitness_scores = [None] * num_of_islands
+    island_stats = [{'island': island, 'best_cost': None, 'mean_cost': None, 'generations': 0, 'best_cost_per_epoch': []} for island in range(num_of_islands)]
+
+    if isinstance(graph.matrix_graph, LazyDistanceMatrix):
+        shm, matrix_descriptor = None, graph.matrix_graph
+    else:
+        shm, matrix_descriptor = share_matrix(graph.matrix_graph)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers or num_of_islands, initializer=_initIslandWorker, initargs=(matrix_descriptor,)) as executor:
+            generation, epoch = 0, 0
+            while generation < num_generations:
+                end_generation = min(generation + migration_interval, num_generations)
+                futures = [executor.submit(_evolveIsland, populations[island], ga_params, generation, end_generation, num_generations, population_size,
+                                           opt, optimal_solution, np.random.SeedSequence(seed, spawn_key=(island, epoch)))
+                           for island in range(num_of_islands)]
+
+                found_optimal = False
+                for island, future in enumerate(futures):
+                    populations[island], fitness_scores[island], last_generation = future.result()
+                    stats = island_stats[island]
+                    stats['generations'] = last_generation
+                    stats['best_cost_per_epoch'].append(fitness_scores[island][0].item())
+                    found_optimal = found_optimal or last_generation < end_generation
+
+                if found_optimal:
+                    break
+                # The migration stream of an epoch is spawned next to the islands' (spawn keys (island, epoch)), so seeded runs repeat
+                migration_rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(num_of_islands, epoch)))
+                migrate(populations, fitness_scores, migration_size, topology, migration_rng)
+                generation, epoch = end_generation, epoch + 1
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    for island in range(num_of_islands):
+        island_stats[island]['best_cost'] = fitness_scores[island][0].item()
+        island_stats[island]['mean_cost'] = fitness_scores[island].mean().item()
+
+    best_island = min(range(num_of_islands), key=lambda island: fitness_scores[island][0])
+    best_path = populations[best_island][0].tolist()
+    best_path.append(best_path[0])
+    return best_path, calculate_path_distance(graph, best_path), island_stats
@@ -0,0 +1,423 @@
+from collections import deque
+from utils.lazy_distance import LazyDistanceMatrix
+from utils.spatial_index import candidate_lists
+import numpy as np
+import time
+
+# Default number of nearest neighbors considered as candidates for every city
+NUM_OF_NEIGHBORS = 10
+
+# Longest segment moved by Or-opt
+MAX_SEGMENT_LENGTH = 3
+
+# Maximum number of chained 2-opt moves tried by one Lin-Kernighan step
+LK_MAX_DEPTH = 10
+
+# Number of alternatives tried for the first move of a Lin-Kernighan chain
+LK_BREADTH = 5
+
+# Moves have to improve the tour by more than this to be applied, guards against float round-off loops
+EPSILON = 1e-9
+
+# The operators compare the clock with their deadline once every this many processed cities
+DEADLINE_CHECK_INTERVAL = 64
+
+# Operator used to polish single tours when no method is given
+DEFAULT_POLISH_METHOD = 'or2opt'
+
+def neighbor_lists(matrix_graph, k=NUM_OF_NEIGHBORS):
+    """Compute the k nearest neighbors of every city from the distance matrix.
+
+    args:
+        matrix_graph: A (n, n) distance matrix
+        k: The number of neighbors per city
+    returns:
+        np.ndarray: A (n, k) array of city indices, each row sorted from nearest to farthest
+    """
+    # Matrix-free distances come from coordinates, the spatial index avoids building the matrix
+    if isinstance(matrix_graph, LazyDistanceMatrix):
+        return candidate_lists(matrix_graph.city_coordinates, k)
+
+    matrix_graph = np.asarray(matrix_graph)
+    num_of_cities = len(matrix_graph)
+    k = min(k, num_of_cities - 1)
+    if k <= 0:
+        return np.empty((num_of_cities, 0), dtype=np.intp)
+
+    distances = matrix_graph.astype(np.float64, copy=True)
+    np.fill_diagonal(distances, np.inf)
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(nearest, order, axis=1)
+
+def weight_table(matrix_graph):
+    """The weights[a][b] lookup table used by the operators: nested lists for a dense matrix, on-demand weights for a lazy one."""
+    if isinstance(matrix_graph, LazyDistanceMatrix):
+        return matrix_graph.weightTable()
+    return np.asarray(matrix_graph).tolist()
+
+def reverse_segment(tour, position, i, j):
+    """Reverse the cyclic segment tour[i..j] (inclusive) in place and keep the position table in sync.
+    The complementary segment is reversed instead when it is shorter, which gives the same cycle.
+    """
+    num_of_cities = len(tour)
+    length = (j - i) % num_of_cities + 1
+    if 2 * length > num_of_cities:
+        i, j = (j + 1) % num_of_cities, (i - 1) % num_of_cities
+        length = num_of_cities - length
+
+    for _ in range(length // 2):
+        city_i, city_j = tour[i], tour[j]
+        tour[i], tour[j] = city_j, city_i
+        position[city_j], position[city_i] = i, j
+        i = (i + 1) % num_of_cities
+        j = (j - 1) % num_of_cities
+
+def past_deadline(steps, deadline):
+    """Whether a local search that has processed 'steps' cities is past its deadline (a time.perf_counter() value),
+    looking at the clock only every DEADLINE_CHECK_INTERVAL steps."""
+    return deadline is not None and steps % DEADLINE_CHECK_INTERVAL == 0 and time.perf_counter() >= deadline
+
+def two_opt_tour(tour, weights, neighbors, active=None, deadline=None):
+    """Improve a tour with 2-opt moves until no improving move is left among the candidate neighbors.
+
+    Every move is evaluated with the O(1) four edge delta, candidates are limited to the neighbor lists,
+    cities whose neighborhood did not change are skipped with don't-look bits and segments are reversed in place.
+
+    args:
+        tour: A list of cities (open, without the start city repeated), modified in place
+        weights: Distances indexable as weights[a][b], for example matrix_graph.tolist()
+        neighbors: Nearest neighbor lists, one sorted list of cities per city
+        active: Optional cities to start from, every city is processed when omitted
+        deadline: Optional time.perf_counter() value, the search stops early once it has passed (the tour stays valid)
+    returns:
+        float: The change in tour length (zero or negative)
+    """
+    num_of_cities = len(tour)
+    if num_of_cities < 4:
+        return 0
+
+    position = [0] * num_of_cities
+    for i, city in enumerate(tour):
+        position[city] = i
+
+    queue = deque(tour if active is None else active)
+    queued = [False] * num_of_cities
+    for city in queue:
+        queued[city] = True
+    total_delta = 0
+
+    steps = 0
+    while queue and not past_deadline(steps, deadline):
+        steps += 1
+        a = queue.popleft()
+        queued[a] = False
+
+        for forward in (True, False):
+            i = position[a]
+            b = tour[(i + 1) % num_of_cities] if forward else tour[i - 1]
+            d_ab = weights[a][b]
+            move = None
+
+            for c in neighbors[a]:
+                d_ac = weights[a][c]
+                if d_ac >= d_ab:
+                    break
+                j = position[c]
+                d = tour[(j + 1) % num_of_cities] if forward else tour[j - 1]
+                if c == b or d == a:
+                    continue
+                delta = d_ac + weights[b][d] - d_ab - weights[c][d]
+                if delta < -EPSILON:
+                    move = (c, d, delta)
+                    break
+
+            if move is None:
+                continue
+
+            c, d, delta = move
+            if forward:
+                reverse_segment(tour, position, (position[a] + 1) % num_of_cities, position[c])
+            else:
+                reverse_segment(tour, position, position[a], position[d])
+            total_delta += delta
+
+            for city in (a, b, c, d):
+                if not queued[city]:
+                    queued[city] = True
+                    queue.append(city)
+            break
+
+    return total_delta
+
+def move_segment(tour, position, i, length, after, reverse):
+    """Move the cyclic segment of the given length starting at position i so it follows the city 'after',
+    optionally reversed. The cities between the segment and its new place are shifted in place, on whichever
+    side of the cycle is shorter, and the position table is kept in sync.
+    """
+    num_of_cities = len(tour)
+    segment = [tour[(i + t) % num_of_cities] for t in range(length)]
+    if reverse:
+        segment.reverse()
+    after_position = position[after]
+    forward_count = (after_position - (i + length)) % num_of_cities + 1
+    backward_count = num_of_cities - length - forward_count
+
+    if forward_count <= backward_count:
+        # Shift the cities from the segment's successor up to 'after' left by the segment length
+        for t in range(forward_count):
+            city = tour[(i + length + t) % num_of_cities]
+            tour[(i + t) % num_of_cities] = city
+            position[city] = (i + t) % num_of_cities
+        start = (i + forward_count) % num_of_cities
+    else:
+        # Shift the cities from 'after's successor up to the segment's predecessor right by the segment length
+        for t in range(backward_count):
+            source = (i - 1 - t) % num_of_cities
+            city = tour[source]
+            tour[(source + length) % num_of_cities] = city
+            position[city] = (source + length) % num_of_cities
+        start = (i - backward_count) % num_of_cities
+
+    for t, city in enumerate(segment):
+        tour[(start + t) % num_of_cities] = city
+        position[city] = (start + t) % num_of_cities
+
+def or_opt_tour(tour, weights, neighbors, active=None, max_segment_length=MAX_SEGMENT_LENGTH, deadline=None):
+    """Improve a tour with Or-opt moves: segments of up to max_segment_length cities are moved, as they are or
+    reversed, next to one of the candidate neighbors of their end cities.
+
+    args:
+        tour: A list of cities (open, without the start city repeated), modified in place
+        weights: Distances indexable as weights[a][b], for example matrix_graph.tolist()
+        neighbors: Nearest neighbor lists, one sorted list of cities per city
+        active: Optional cities to start from, every city is processed when omitted
+        max_segment_length: The longest segment that is moved
+        deadline: Optional time.perf_counter() value, the search stops early once it has passed (the tour stays valid)
+    returns:
+        float: The change in tour length (zero or negative)
+    """
+    num_of_cities = len(tour)
+    if num_of_cities < 5:
+        return 0
+
+    position = [0] * num_of_cities
+    for i, city in enumerate(tour):
+        position[city] = i
+
+    queue = deque(tour if active is None else active)
+    queued = [False] * num_of_cities
+    for city in queue:
+        queued[city] = True
+    total_delta = 0
+
+    steps = 0
+    while queue and not past_deadline(steps, deadline):
+        steps += 1
+        a = queue.popleft()
+        queued[a] = False
+        move = None
+
+        for length in range(1, min(max_segment_length, num_of_cities - 3) + 1):
+            i = position[a]
+            first, last = a, tour[(i + length - 1) % num_of_cities]
+            previous, following = tour[i - 1], tour[(i + length) % num_of_cities]
+            removed_gain = weights[previous][first] + weights[last][following] - weights[previous][following]
+            if removed_gain <= EPSILON:
+                continue
+
+            # Each end of the segment is placed next to one of its neighbors, on either side of that neighbor
+            for end, other_end in ((first, last), (last, first)):
+                for c in neighbors[end]:
+                    if weights[end][c] >= removed_gain:
+                        break
+                    if (position[c] - i) % num_of_cities < length:
+                        continue
+                    j = position[c]
+                    for x, y, x_end, y_end in ((c, tour[(j + 1) % num_of_cities], end, other_end),
+                                               (tour[j - 1], c, other_end, end)):
+                        if (position[x] - i) % num_of_cities < length or (position[y] - i) % num_of_cities < length:
+                            continue
+                        delta = weights[x][x_end] + weights[y_end][y] - weights[x][y] - removed_gain
+                        if delta < -EPSILON:
+                            move = (length, x, x_end != first, delta, (previous, following, x, y))
+                            break
+                    if move:
+                        break
+                if move:
+                    break
+            if move:
+                break
+
+        if move is None:
+            continue
+
+        length, after, reverse, delta, endpoints = move
+        move_segment(tour, position, position[a], length, after, reverse)
+        total_delta += delta
+
+        for city in (a,) + endpoints:
+            if not queued[city]:
+                queued[city] = True
+                queue.append(city)
+
+    return total_delta
+
+def or_two_opt_tour(tour, weights, neighbors, active=None, deadline=None):
+    """Alternate 2-opt and Or-opt until neither of them improves the tour (the Or-2opt neighborhood).
+    Arguments and return value are the same as for two_opt_tour. Started from active cities, every round starts
+    from them again, so a search around a few changed cities does not turn into a pass over the whole tour.
+    """
+    total_delta = 0
+    while True:
+        delta = two_opt_tour(tour, weights, neighbors, active, deadline) + or_opt_tour(tour, weights, neighbors, active, deadline=deadline)
+        total_delta += delta
+        if delta >= -EPSILON or (deadline is not None and time.perf_counter() >= deadline):
+            return total_delta
+
+def lin_kernighan_candidates(tour, position, weights, neighbors, t2, open_gain, used, forward):
+    """List the (t3, t4) choices for the next 2-opt move of a Lin-Kernighan chain that still satisfy the gain
+    criterion, best first (largest d(t3, t4) - d(t2, t3)).
+    """
+    num_of_cities = len(tour)
+    candidates = []
+    for t3 in neighbors[t2]:
+        if open_gain - weights[t2][t3] <= EPSILON:
+            break
+        if t3 in used:
+            continue
+        t4 = tour[position[t3] - 1] if forward else tour[(position[t3] + 1) % num_of_cities]
+        if t4 == t2:
+            continue
+        candidates.append((weights[t3][t4] - weights[t2][t3], t3, t4))
+    candidates.sort(reverse=True)
+    return candidates
+
+def lin_kernighan_step(tour, position, weights, neighbors, t1, forward, max_depth, breadth=LK_BREADTH):
+    """Try one Lin-Kernighan style variable-depth move starting with the edge between t1 and its successor
+    (or predecessor when forward is False), built as a chain of up to max_depth 2-opt moves.
+
+    The 'breadth' best first moves are tried in turn, deeper levels follow the best candidate only.
+    Each chain is applied in place and then rolled back to the prefix with the best total gain.
+
+    returns:
+        tuple: The gain of the kept moves (zero if nothing was kept) and the cities whose edges changed
+    """
+    num_of_cities = len(tour)
+    first_t2 = tour[(position[t1] + 1) % num_of_cities] if forward else tour[position[t1] - 1]
+    first_forward = forward
+    first_moves = lin_kernighan_candidates(tour, position, weights, neighbors, first_t2, weights[t1][first_t2], {t1, first_t2}, forward)
+
+    for _, first_t3, first_t4 in first_moves[:breadth]:
+        t2, forward = first_t2, first_forward
+        moves = []
+        used = {t1, t2}
+        touched = [t1, t2]
+        gain, best_gain, best_length = 0, 0, 0
+        t3, t4 = first_t3, first_t4
+
+        for _ in range(max_depth):
+            segment = (position[t2], position[t4]) if forward else (position[t4], position[t2])
+            reverse_segment(tour, position, *segment)
+            moves.append(segment)
+            gain += weights[t1][t2] + weights[t3][t4] - weights[t2][t3] - weights[t4][t1]
+            used.add(t3)
+            touched += [t3, t4]
+            if gain > best_gain + EPSILON:
+                best_gain, best_length = gain, len(moves)
+
+            # The new open edge is (t1, t4), reverse_segment may have flipped the orientation around t1
+            forward = tour[(position[t1] + 1) % num_of_cities] == t4
+            t2 = t4
+            candidates = lin_kernighan_candidates(tour, position, weights, neighbors, t2, gain + weights[t1][t2], used, forward)
+            if not candidates:
+                break
+            _, t3, t4 = candidates[0]
+
+        for segment in reversed(moves[best_length:]):
+            reverse_segment(tour, position, *segment)
+
+        if best_length:
+            return best_gain, touched
+
+    return 0, []
+
+def lin_kernighan_tour(tour, weights, neighbors, active=None, max_depth=LK_MAX_DEPTH, deadline=None):
+    """Improve a tour with Lin-Kernighan style variable-depth moves (chains of 2-opt moves with the LK gain
+    criterion), using neighbor lists and don't-look bits.
+    Arguments and return value are the same as for two_opt_tour.
+    """
+    num_of_cities = len(tour)
+    if num_of_cities < 5:
+        return two_opt_tour(tour, weights, neighbors, active, deadline)
+
+    position = [0] * num_of_cities
+    for i, city in enumerate(tour):
+        position[city] = i
+
+    queue = deque(tour if active is None else active)
+    queued = [False] * num_of_cities
+    for city in queue:
+        queued[city] = True
+    total_delta = 0
+
+    steps = 0
+    while queue and not past_deadline(steps, deadline):
+        steps += 1
+        t1 = queue.popleft()
+        queued[t1] = False
+
+        for forward in (True, False):
+            gain, touched = lin_kernighan_step(tour, position, weights, neighbors, t1, forward, max_depth)
+            if gain > EPSILON:
+                total_delta -= gain
+                for city in touched:
+                    if not queued[city]:
+                        queued[city] = True
+                        queue.append(city)
+                break
+
+    return total_delta
+
+LOCAL_SEARCH_OPERATORS = {
+    '2opt'      : two_opt_tour,
+    'oropt'     : or_opt_tour,
+    'or2opt'    : or_two_opt_tour,
+    'lk'        : lin_kernighan_tour,
+}
+
+def polish_tour(tour, graph, method=DEFAULT_POLISH_METHOD, neighbors=None, weights=None, deadline=None):
+    """Run one of the local search operators on a single tour.
+
+    args:
+        tour: A permutation of cities, optionally closed (start city repeated at the end)
+        graph: The Graph object containing the distance matrix
+        method: The name of the operator in LOCAL_SEARCH_OPERATORS
+        neighbors: Optional precomputed neighbor lists (array or nested lists), computed from the matrix when omitted
+        weights: Optional precomputed weight_table of the matrix, built when omitted
+        deadline: Optional time.perf_counter() value the local search stops at
+    returns:
+        tuple: The improved tour (closed if the input was closed) and its total distance
+    """
+    if method not in LOCAL_SEARCH_OPERATORS:
+        raise ValueError(f"Unknown local search operator: {method}, expected one of {list(LOCAL_SEARCH_OPERATORS)}")
+
+    tour = list(tour)
+    closed = len(tour) > 1 and tour[0] == tour[-1]
+    if closed:
+        tour.pop()
+
+    if neighbors is None:
+        neighbors = neighbor_lists(graph.matrix_graph)
+    if weights is None:
+        weights = weight_table(graph.matrix_graph)
+    LOCAL_SEARCH_OPERATORS[method](tour, weights, np.asarray(neighbors).tolist(), deadline=deadline)
+
+    cost = sum(weights[a][b] for a, b in zip(tour, tour[1:] + tour[:1]))
+    if closed:
+        tour.append(tour[0])
+    return tour, cost
+
+def two_opt(tour, graph, neighbors=None):
+    """2-opt local search on a single tour, see polish_tour."""
+    return polish_tour(tour, graph, '2opt', neighbors)
@@ -1,11 +1,8 @@
-from helpers.calculate_path_distance import calculate_path_distance
 from genetic_algorithm_main_loop import geneticAlgorithmMainLoop
-from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm import GeneticAlgorithm, spawn_seeds
 from utils.path_plotter import plot_path
 from utils.gen_graph import Graph
 import comparison_algorithms
-import networkx as nx
-import tsplib95
 import logging
 
 def main():
@@ -34,50 +31,65 @@ def main():
         crossover_rate = 0.7
         mutation_rate = 0.05
         test_runs = 5
+        # Set to an int to make the GA runs reproducible, every GA gets its own random stream spawned from it
+        seed = None
 
         for tsp_problem in tsp_problem_list:
             j = 0
             if tsp_lib:
-                problem = tsplib95.load(tsp_problem)
-                num_of_cities = problem.dimension
+                # The problem file is parsed once into the binary problem cache, later runs map it directly
+                problem = tsp_problem
+                num_of_cities = None
                 optimal_solution = optimal_solutions[tsp_problem_list.index(tsp_problem)]
             else:
                 num_of_cities = num_of_cities
-            population_size = num_of_cities*30
+            ga_seeds = spawn_seeds(seed, 2 * test_runs)
             while j < test_runs:
                 # Initialize the Graph
-                graph = Graph(num_of_cities=num_of_cities, tsp_problem=problem, testing=True)
+                graph = Graph(num_of_cities=num_of_cities, tsp_problem=problem, testing=True, setup_logging=True, log_matrix=True, plot=True)
                 matrix_graph = graph.matrix_graph
+                num_of_cities = graph.num_of_cities
+                population_size = num_of_cities*30
 
-                # Naive brute-force TSP
-                if(num_of_cities <= 15):
-                    naive_solution_path, naive_cost = comparison_algorithms.naive_tsp(graph)
-                    print(f"Naive TSP: Shortest path: {naive_solution_path} with cost: {naive_cost}")
-                    logging.info(f"Naive TSP:\n  Shortest path: {naive_solution_path}\n  Distance: {naive_cost}")
+                # Exact TSP, Held-Karp dynamic programming up to 20 cities and branch and bound a bit further
+                if(num_of_cities <= 20):
+                    exact_solution_path, exact_cost = comparison_algorithms.held_karp_tsp(graph)
+                    print(f"Held-Karp TSP: Shortest path: {exact_solution_path} with cost: {exact_cost}")
+                    logging.info(f"Held-Karp TSP:\n  Shortest path: {exact_solution_path}\n  Distance: {exact_cost}")
+                elif(num_of_cities <= 30):
+                    exact_solution_path, exact_cost = comparison_algorithms.branch_and_bound_tsp(graph)
+                    print(f"Branch and Bound TSP: Shortest path: {exact_solution_path} with cost: {exact_cost}")
+                    logging.info(f"Branch and Bound TSP:\n  Shortest path: {exact_solution_path}\n  Distance: {exact_cost}")
                 else: 
-                    print(f"Naive TSP: Did not go through the calculations because num_of_cities is too high.")
+                    print(f"Exact TSP: Did not go through the calculations because num_of_cities is too high.")
 
                 # Nearest Neighbor TSP 
                 nn_solution_path, nn_cost = comparison_algorithms.nearest_neighbor_tsp(graph)
                 print(f"Nearest Neighboor TSP: Shortest path: {nn_solution_path} with cost: {nn_cost}")
                 logging.info(f"Nearest Neighbor TSP:\n  Shortest path: {nn_solution_path}\n  Distance: {nn_cost}")
+                nn_polished_path, nn_polished_cost = comparison_algorithms.local_search_polish(graph, nn_solution_path, 'lk')
+                print(f"Nearest Neighboor TSP + LK: Shortest path: {nn_polished_path} with cost: {nn_polished_cost}")
+                logging.info(f"Nearest Neighbor TSP + LK:\n  Shortest path: {nn_polished_path}\n  Distance: {nn_polished_cost}")
 
-                #NX Solver
-                nx_graph = comparison_algorithms.nx_tsp_solver(num_of_cities, matrix_graph)
-                tsp_nx_solution = nx.approximation.traveling_salesman_problem(nx_graph, cycle=True)
-                tsp_nx_path_cost = calculate_path_distance(graph,tsp_nx_solution)
-                print(f"TSP NX Shortest Path:{tsp_nx_solution} with cost: {tsp_nx_path_cost}")
-                logging.info(f"TSP NX:\n  Shortest path: {tsp_nx_solution}\n  Distance: {tsp_nx_path_cost}")
+                # Christofides, the algorithm NetworkX uses, computed on the distance matrix without a NetworkX graph
+                christofides_path, christofides_cost = comparison_algorithms.christofides_tsp(graph)
+                print(f"Christofides TSP: Shortest path: {christofides_path} with cost: {christofides_cost}")
+                logging.info(f"Christofides TSP:\n  Shortest path: {christofides_path}\n  Distance: {christofides_cost}")
+                christofides_polished_path, christofides_polished_cost = comparison_algorithms.local_search_polish(graph, christofides_path, 'lk')
+                print(f"Christofides TSP + LK: Shortest path: {christofides_polished_path} with cost: {christofides_polished_cost}")
+                logging.info(f"Christofides TSP + LK:\n  Shortest path: {christofides_polished_path}\n  Distance: {christofides_polished_cost}")
                 
                 # Genetic Algorithms
                 # This setup will allow us to instantiate different 'ga'/genetic algorithms like the one above with different parameters, and send each one into the main loop.
                 # Not optimized
-                ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=num_of_cities, matrix_graph=matrix_graph, crossover_rate=crossover_rate, mutation_rate=mutation_rate) 
+                ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=num_of_cities, matrix_graph=matrix_graph, crossover_rate=crossover_rate, mutation_rate=mutation_rate,
+                                      seed=ga_seeds[2 * j])
                 ga_final_path, ga_final_cost = geneticAlgorithmMainLoop(ga, num_generations, population_size, graph, opt=False, optimal_solution=optimal_solution)
                 print(f"Genetic Algorithm: Shortest path: {ga_final_path} with cost: {ga_final_cost}")
                 logging.info(f"Best solution (Test: {num_of_cities} cities):\n  Shortest path: {ga.population[0]}\n  Distance: {ga_final_cost:.2f}")
                 # Optimized
-                ga_opt = GeneticAlgorithm(pop_size=population_size, num_of_cities=num_of_cities, matrix_graph=matrix_graph, crossover_rate=crossover_rate, mutation_rate=mutation_rate)
+                ga_opt = GeneticAlgorithm(pop_size=population_size, num_of_cities=num_of_cities, matrix_graph=matrix_graph, crossover_rate=crossover_rate, mutation_rate=mutation_rate,
+                                          seed=ga_seeds[2 * j + 1])
                 ga_opt_final_path, ga_opt_final_cost = geneticAlgorithmMainLoop(ga_opt, num_generations, population_size, graph, opt=True, optimal_solution=optimal_solution)
                 print(f"Genetic Algorithm Optimized: Shortest path: {ga_opt_final_path} with cost: {ga_opt_final_cost}")
                 logging.info(f"Best solution (Test: {num_of_cities} cities) Optimized:\n  Shortest path: {ga_opt.population[0]}\n  Distance: {ga_opt_final_cost:.2f}\n")
@@ -95,22 +107,20 @@ def main():
         showPlottedPath = True 
         
         # Initialize the Graph
-        graph = Graph(num_of_cities=num_of_cities, tsp_problem=None, testing=False)
+        graph = Graph(num_of_cities=num_of_cities, tsp_problem=None, testing=False, setup_logging=True, log_matrix=True, plot=True)
         matrix_graph = graph.matrix_graph
 
-        #TSP Problem
-        nx_graph = comparison_algorithms.nx_tsp_solver(num_of_cities, matrix_graph)
-        tsp_nx_solution = nx.approximation.traveling_salesman_problem(nx_graph, cycle=True)
-        tsp_nx_path_cost = calculate_path_distance(graph,tsp_nx_solution)
-        print(f"TSP NX Shortest Path:{tsp_nx_solution} with cost: {tsp_nx_path_cost}")
+        # Christofides TSP
+        christofides_path, christofides_cost = comparison_algorithms.christofides_tsp(graph)
+        print(f"Christofides TSP: Shortest path: {christofides_path} with cost: {christofides_cost}")
 
-        # Naive brute-force TSP
-        if(num_of_cities <= 10):
-            naive_solution_path, naive_cost = comparison_algorithms.naive_tsp(graph)
-            print(f"Naive TSP: Shortest path: {naive_solution_path} with cost: {naive_cost}")
-            plot_path(graph, naive_solution_path, "Naive brute-force TSP Path", showPlottedPath)
+        # Exact TSP with Held-Karp dynamic programming
+        if(num_of_cities <= 20):
+            exact_solution_path, exact_cost = comparison_algorithms.held_karp_tsp(graph)
+            print(f"Held-Karp TSP: Shortest path: {exact_solution_path} with cost: {exact_cost}")
+            plot_path(graph, exact_solution_path, "Held-Karp exact TSP Path", showPlottedPath)
         else: 
-            print(f"Naive TSP: Did not go through the calculations because num_of_cities is too high.")
+            print(f"Held-Karp TSP: Did not go through the calculations because num_of_cities is too high.")
 
         # Nearest Neighbor TSP 
         nn_solution_path, nn_cost = comparison_algorithms.nearest_neighbor_tsp(graph)
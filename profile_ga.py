@@ -0,0 +1,76 @@
+"""Profile one GA run on a problem file.
+
+Prints the per-operator breakdown of the main loop and, with --cprofile, also runs it under cProfile.
+The run stays in a single process, so it can be sampled as is with py-spy:
+    py-spy record -o ga.svg -- python profile_ga.py Files/pcb442.tsp --opt
+"""
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import evolveGenerations
+from crossover_operators import CROSSOVER_OPERATORS
+from local_search import LOCAL_SEARCH_OPERATORS
+from seeding import parse_seeding
+from utils.profiler import OperatorProfiler
+from utils.renderer import TourRenderer
+from utils.gen_graph import Graph
+import argparse
+import cProfile
+import pstats
+import random
+
+def runProfiledGA(problem_path, num_generations=100, population_size=None, opt=False, crossover='ox', local_search='2opt',
+                  crossover_rate=0.7, mutation_rate=0.05, seed=0, seeding=None, render_directory=None):
+    """Run the GA on a .tsp/.json problem with an OperatorProfiler attached, and a TourRenderer writing the best tours
+    of the run to render_directory when it is given.
+
+    returns:
+        tuple: The GeneticAlgorithm after the run and the OperatorProfiler
+    """
+    random.seed(seed)
+    graph = Graph(tsp_problem=problem_path)
+    population_size = population_size or graph.num_of_cities * 30
+    ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph, crossover_rate=crossover_rate,
+                          mutation_rate=mutation_rate, crossover=crossover, local_search=local_search, seeding=seeding, city_coordinates=graph.city_coordinates)
+    profiler = OperatorProfiler()
+    renderer = TourRenderer(graph.city_coordinates, render_directory) if render_directory else None
+    try:
+        evolveGenerations(ga, 0, num_generations, num_generations, population_size, opt=opt, profiler=profiler, renderer=renderer)
+    finally:
+        if renderer is not None:
+            renderer.close()
+    return ga, profiler
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the operators of the GA main loop on a TSPLIB .tsp or Files/graph_*.json problem.")
+    parser.add_argument("problem")
+    parser.add_argument("--generations", type=int, default=100)
+    parser.add_argument("--population-size", type=int, default=None, help="GA population size (default: 30 * num_of_cities)")
+    parser.add_argument("--opt", action="store_true", help="Use the guided (local search) mutation")
+    parser.add_argument("--crossover", default="ox", choices=list(CROSSOVER_OPERATORS))
+    parser.add_argument("--local-search", default="2opt", choices=list(LOCAL_SEARCH_OPERATORS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seeding", nargs="+", default=(), help="Seeded fractions of the initial population, e.g. nn=0.1 greedy=0.05 sfc=0.05")
+    parser.add_argument("--render", default=None, help="Write an image strip and an animation of the best tours to this directory")
+    parser.add_argument("--breakdown", default=None, help="Write the per-generation breakdown to this CSV file")
+    parser.add_argument("--cprofile", default=None, help="Also run under cProfile and dump the stats to this file")
+    parser.add_argument("--top", type=int, default=25, help="Number of cProfile entries to print")
+    args = parser.parse_args()
+
+    run_arguments = dict(num_generations=args.generations, population_size=args.population_size, opt=args.opt, crossover=args.crossover,
+                         local_search=args.local_search, seed=args.seed, seeding=parse_seeding(args.seeding),
+                         render_directory=args.render)
+    if args.cprofile:
+        profile = cProfile.Profile()
+        ga, profiler = profile.runcall(runProfiledGA, args.problem, **run_arguments)
+        profile.dump_stats(args.cprofile)
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(args.top)
+    else:
+        ga, profiler = runProfiledGA(args.problem, **run_arguments)
+
+    print(profiler.summary())
+    print(f"Best cost: {ga.fitness_scores[0]}")
+    if args.breakdown:
+        profiler.writeBreakdown(args.breakdown)
+        print(f"Wrote the per-generation breakdown to {args.breakdown}")
+
+if __name__ == "__main__":
+    main()
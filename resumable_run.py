@@ -0,0 +1,71 @@
+"""Run the GA on a problem file with periodic checkpoints, and resume it from the last checkpoint.
+
+    python resumable_run.py Files/pcb442.tsp --generations 5000 --opt --checkpoint runs/pcb442.npz
+
+Running the same command again after the process was stopped continues from the checkpoint (the run parameters
+stored in it win over the command line), with the same result as a run that was never stopped.
+"""
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import geneticAlgorithmMainLoop
+from crossover_operators import CROSSOVER_OPERATORS
+from local_search import LOCAL_SEARCH_OPERATORS
+from seeding import parse_seeding
+from utils.checkpoint import Checkpointer, CHECKPOINT_INTERVAL, read_checkpoint, restore_genetic_algorithm
+from utils.gen_graph import Graph
+import argparse
+import random
+import os
+
+def runResumableGA(problem_path, checkpoint_path, num_generations=1000, population_size=None, opt=False, crossover='ox', local_search='2opt',
+                   crossover_rate=0.7, mutation_rate=0.05, seed=0, seeding=None, interval=CHECKPOINT_INTERVAL):
+    """Run the GA on a .tsp/.json problem, checkpointing every 'interval' generations to checkpoint_path, or resume
+    the run from checkpoint_path when it exists.
+
+    returns:
+        tuple: The best path (closed), its cost and the generation the run started from
+    """
+    graph = Graph(tsp_problem=problem_path)
+    if os.path.exists(checkpoint_path):
+        ga, start_generation, run_parameters = restore_genetic_algorithm(read_checkpoint(checkpoint_path), graph.matrix_graph, graph.city_coordinates)
+        num_generations, opt = run_parameters['num_generations'], run_parameters['opt']
+    else:
+        random.seed(seed)
+        population_size = population_size or graph.num_of_cities * 30
+        ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph, crossover_rate=crossover_rate,
+                              mutation_rate=mutation_rate, crossover=crossover, local_search=local_search, seeding=seeding,
+                              city_coordinates=graph.city_coordinates)
+        start_generation = 0
+
+    checkpointer = Checkpointer(checkpoint_path, interval, {'num_generations': num_generations, 'opt': opt})
+    try:
+        path, cost = geneticAlgorithmMainLoop(ga, num_generations, ga.pop_size, graph, opt, checkpointer=checkpointer, start_generation=start_generation)
+    except BaseException:
+        # The population is only consistent at the end of a generation, after an interruption the last periodic checkpoint stays
+        checkpointer.close()
+        raise
+    # A finished run resumes straight to its result
+    checkpointer.close(ga, num_generations - 1)
+    return path, cost, start_generation
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("problem")
+    parser.add_argument("--checkpoint", required=True, help="Checkpoint file, resumed from when it exists")
+    parser.add_argument("--every", type=int, default=CHECKPOINT_INTERVAL, help="Generations between checkpoints")
+    parser.add_argument("--generations", type=int, default=1000)
+    parser.add_argument("--population-size", type=int, default=None, help="GA population size (default: 30 * num_of_cities)")
+    parser.add_argument("--opt", action="store_true", help="Use the guided (local search) mutation")
+    parser.add_argument("--crossover", default="ox", choices=list(CROSSOVER_OPERATORS))
+    parser.add_argument("--local-search", default="2opt", choices=list(LOCAL_SEARCH_OPERATORS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seeding", nargs="+", default=(), help="Seeded fractions of the initial population, e.g. nn=0.1 greedy=0.05 sfc=0.05")
+    args = parser.parse_args()
+
+    path, cost, start_generation = runResumableGA(args.problem, args.checkpoint, args.generations, args.population_size, args.opt, args.crossover,
+                                                  args.local_search, seed=args.seed, seeding=parse_seeding(args.seeding), interval=args.every)
+    if start_generation:
+        print(f"Resumed from generation {start_generation}")
+    print(f"Best cost: {cost}")
+
+if __name__ == "__main__":
+    main()
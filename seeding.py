@@ -0,0 +1,165 @@
+"""Seeding strategies for the initial GA population.
+
+Random permutations start 5-10x above the optimum, so part of the population can instead be built from
+constructive heuristics. Every strategy returns a (num_of_tours, num_of_cities) array of different tours:
+
+    'nn'            randomized nearest neighbor, from random start cities, sometimes taking the second nearest city
+    'greedy'        greedy edge matching with randomly perturbed edge weights
+    'sfc'           Hilbert space-filling curve order, with the plane rotated by a random angle
+    'christofides'  Christofides, shortcut from different Euler circuits
+
+A seeding is a {strategy: fraction of the population} dict, the remaining fraction stays random permutations
+to keep the diversity.
+"""
+from comparison_algorithms import greedy_edge_tour, spanning_tree_parents, christofides_circuits
+from local_search import neighbor_lists
+from utils.lazy_distance import LazyDistanceMatrix
+import numpy as np
+
+# Probability that the randomized nearest neighbor takes the second nearest unvisited candidate instead of the nearest
+NN_SECOND_CHOICE_PROBABILITY = 0.1
+
+# Candidate neighbors per city used by the nearest neighbor and greedy edge seeds
+SEEDING_NEIGHBORS = 8
+
+# Relative noise on the edge weights of the greedy edge seeds after the first one
+GREEDY_NOISE = 0.1
+
+# Resolution of the Hilbert curve, the plane is divided into 2^HILBERT_ORDER x 2^HILBERT_ORDER cells
+HILBERT_ORDER = 16
+
+def random_tours(num_of_tours, num_of_cities, rng):
+    """Random permutations, shuffled row by row in one vectorized call."""
+    return rng.permuted(np.tile(np.arange(num_of_cities, dtype=np.int32), (num_of_tours, 1)), axis=1)
+
+def nearest_neighbor_tours(matrix_graph, num_of_tours, rng, neighbors, city_coordinates=None):
+    """Randomized nearest neighbor tours, all built together one step at a time. The first tour starts from city 0
+    and always takes the nearest city, like comparison_algorithms.nearest_neighbor_tsp.
+    """
+    num_of_cities = len(neighbors)
+    tours = np.empty((num_of_tours, num_of_cities), dtype=np.int32)
+    rows = np.arange(num_of_tours)
+    visited = np.zeros((num_of_tours, num_of_cities), dtype=bool)
+    current = rng.integers(num_of_cities, size=num_of_tours)
+    current[0] = 0
+    second_choice = rng.random((num_of_cities, num_of_tours)) < NN_SECOND_CHOICE_PROBABILITY
+    second_choice[:, 0] = False
+
+    for step in range(num_of_cities):
+        tours[:, step] = current
+        visited[rows, current] = True
+        if step == num_of_cities - 1:
+            break
+        candidates = neighbors[current]
+        unvisited = ~visited[rows[:, None], candidates]
+        # Index of the first, and of the second, unvisited candidate (k when there is none)
+        first = np.where(unvisited.any(axis=1), unvisited.argmax(axis=1), candidates.shape[1])
+        later = unvisited & (np.arange(candidates.shape[1]) > first[:, None])
+        second = np.where(later.any(axis=1), later.argmax(axis=1), first)
+        choice = np.where(second_choice[step], second, first)
+
+        found = choice < candidates.shape[1]
+        next_city = np.empty(num_of_tours, dtype=np.intp)
+        next_city[found] = candidates[found, choice[found]]
+        # Every candidate is visited, fall back to the full distance row
+        for tour in np.flatnonzero(~found).tolist():
+            row = np.where(visited[tour], np.inf, np.asarray(matrix_graph[int(current[tour])], dtype=np.float64))
+            next_city[tour] = np.argmin(row)
+        current = next_city
+    return tours
+
+def greedy_tours(matrix_graph, num_of_tours, rng, neighbors, city_coordinates=None):
+    """Greedy edge matching tours, the first on the real weights and the others on perturbed weights."""
+    return np.array([greedy_edge_tour(matrix_graph, neighbors, GREEDY_NOISE if index else 0.0, rng) for index in range(num_of_tours)], dtype=np.int32)
+
+def hilbert_index(x, y, order=HILBERT_ORDER):
+    """Position of integer grid points along the Hilbert curve, vectorized over arrays of points."""
+    x, y = x.astype(np.int64), y.astype(np.int64)
+    side = 1 << order
+    index = np.zeros(len(x), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        index += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotate the quadrant so the curve continues in the right orientation
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return index
+
+def space_filling_curve_tours(matrix_graph, num_of_tours, rng, neighbors=None, city_coordinates=None):
+    """Cities in Hilbert curve order. Every tour after the first rotates the plane by a random angle first, which
+    moves the seams of the curve and gives different tours."""
+    if city_coordinates is None:
+        raise ValueError("The 'sfc' seeding needs the city coordinates")
+    coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    scale = (1 << HILBERT_ORDER) - 1
+
+    tours = np.empty((num_of_tours, len(coordinates)), dtype=np.int32)
+    for index in range(num_of_tours):
+        points = coordinates
+        if index:
+            angle = rng.uniform(0, 2 * np.pi)
+            points = points @ np.array([[np.cos(angle), np.sin(angle)], [-np.sin(angle), np.cos(angle)]])
+        lower = points.min(axis=0)
+        points = (points - lower) / np.maximum(points.max(axis=0) - lower, 1e-9).max()
+        tours[index] = np.argsort(hilbert_index(points[:, 0] * scale, points[:, 1] * scale), kind='stable')
+    return tours
+
+def christofides_tours(matrix_graph, num_of_tours, rng, neighbors=None, city_coordinates=None):
+    """Christofides tours, shortcut from different Euler circuits of the same spanning tree and matching."""
+    return np.array(christofides_circuits(matrix_graph, spanning_tree_parents(matrix_graph), num_of_tours, rng), dtype=np.int32)
+
+SEEDING_STRATEGIES = {
+    'nn'            : nearest_neighbor_tours,
+    'greedy'        : greedy_tours,
+    'sfc'           : space_filling_curve_tours,
+    'christofides'  : christofides_tours,
+}
+
+def seed_population(matrix_graph, pop_size, seeding, rng, city_coordinates=None):
+    """Build a population from seeding strategies and random permutations.
+
+    args:
+        matrix_graph: The (n, n) distance matrix (dense or lazy)
+        pop_size: The number of individuals in the population
+        seeding: A {strategy: fraction} dict of SEEDING_STRATEGIES names, the rest of the population is random
+        rng: The np.random.Generator used by the strategies
+        city_coordinates: The coordinates, needed by the 'sfc' strategy
+    returns:
+        np.ndarray: A (pop_size, num_of_cities) integer array of tours, the seeded ones first
+    """
+    unknown = set(seeding) - set(SEEDING_STRATEGIES)
+    if unknown:
+        raise ValueError(f"Unknown seeding strategies: {sorted(unknown)}, expected some of {list(SEEDING_STRATEGIES)}")
+    if any(fraction < 0 for fraction in seeding.values()) or sum(seeding.values()) > 1:
+        raise ValueError(f"Seeding fractions must be non-negative and add up to at most 1, got {seeding}")
+
+    num_of_cities = len(matrix_graph)
+    if city_coordinates is None and isinstance(matrix_graph, LazyDistanceMatrix):
+        city_coordinates = matrix_graph.city_coordinates
+    counts = {strategy: int(round(fraction * pop_size)) for strategy, fraction in seeding.items()}
+    neighbors = neighbor_lists(matrix_graph, SEEDING_NEIGHBORS) if num_of_cities > 1 and any(counts.values()) else None
+
+    tours = []
+    for strategy, count in counts.items():
+        count = min(count, pop_size - sum(len(block) for block in tours))
+        if count > 0:
+            tours.append(np.asarray(SEEDING_STRATEGIES[strategy](matrix_graph, count, rng, neighbors, city_coordinates), dtype=np.int32))
+    num_of_random = pop_size - sum(len(block) for block in tours)
+    tours.append(random_tours(num_of_random, num_of_cities, rng))
+    return np.concatenate(tours)
+
+def parse_seeding(items):
+    """Parse command line seeding arguments like ['nn=0.2', 'greedy=0.05'] into a {strategy: fraction} dict."""
+    seeding = {}
+    for item in items:
+        strategy, _, fraction = item.partition('=')
+        try:
+            seeding[strategy] = float(fraction)
+        except ValueError:
+            raise ValueError(f"Seeding arguments look like strategy=fraction, got {item!r}")
+    return seeding
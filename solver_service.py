@@ -0,0 +1,320 @@
+"""Local TSP solver service.
+
+A small HTTP/1.1 server on asyncio streams, over TCP or a Unix socket (curl --unix-socket works), that keeps the loaded
+graphs warm in an LRU cache keyed by instance hash and runs the CPU-bound improvement on a process pool.
+
+    POST /solve   {"city_coordinates": [[x, y], ...], "edge_weight_type": "EUC_2D", "deadline": 0.5, "method": "ga"}
+                  or {"problem": "st70.tsp", ...} for a problem file in the server's Files/ directory
+    GET  /health
+
+The nearest neighbor tour is computed right away on a thread (the event loop only does the I/O), then improved on the
+pool ('ga' runs the anytime GA seeded with the polished tour, a local search name only polishes it) until the deadline,
+which counts from the arrival of the request. With "stream": true the response is a chunked
+stream of JSON lines, the nearest neighbor answer first and the improved tour when it is ready. Identical concurrent
+requests share one solve.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import anytimeGenerations
+from local_search import polish_tour, neighbor_lists, weight_table, LOCAL_SEARCH_OPERATORS
+from utils.distance_matrix import build_distance_matrix, SUPPORTED_EDGE_WEIGHT_TYPES
+from utils.lazy_distance import LazyDistanceMatrix
+from utils.problem_cache import source_hash
+from utils.gen_graph import Graph
+import comparison_algorithms
+import numpy as np
+import argparse
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import json
+import time
+import os
+
+# Number of graphs kept loaded, in the service and in every worker process
+GRAPH_CACHE_SIZE = 32
+
+# From this many cities on, graphs use the matrix-free distances
+LAZY_MATRIX_THRESHOLD = 5000
+
+DEFAULT_DEADLINE = 1.0
+
+# Part of the deadline reserved for sending the answer back
+DEADLINE_MARGIN = 0.05
+
+# Fraction of the time left that the worker gets, the rest absorbs the GA finishing its last generation
+WORKER_BUDGET_FRACTION = 0.8
+
+METHODS = ('ga',) + tuple(LOCAL_SEARCH_OPERATORS)
+
+MAX_REQUEST_SIZE = 64 << 20
+
+# The only directory "problem" requests may name files in
+PROBLEM_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Files')
+
+# Population of the GA improvement, capped so a generation fits in short deadlines: at most MAX_POPULATION_SIZE tours
+# with at most MAX_POPULATION_CITIES cities in all of them together, but at least MIN_POPULATION_SIZE tours
+MAX_POPULATION_SIZE = 1000
+MAX_POPULATION_CITIES = 200_000
+MIN_POPULATION_SIZE = 10
+
+# Worker process state, the graphs a worker has already built
+_worker_graphs = OrderedDict()
+
+def instanceHash(city_coordinates, edge_weight_type):
+    """Hash of a problem instance, the key of the graph caches."""
+    digest = hashlib.sha256(np.ascontiguousarray(city_coordinates, dtype=np.float64).tobytes())
+    digest.update(str(edge_weight_type).encode())
+    return digest.hexdigest()
+
+def buildGraph(instance):
+    """Build the Graph of an instance, either ('coordinates', hash, city_coordinates, edge_weight_type) or ('problem', hash, file_path)."""
+    if instance[0] == 'problem':
+        return Graph(tsp_problem=instance[2], lazy=False)
+    _, _, city_coordinates, edge_weight_type = instance
+    if len(city_coordinates) >= LAZY_MATRIX_THRESHOLD:
+        matrix_graph = LazyDistanceMatrix(city_coordinates, edge_weight_type)
+    else:
+        matrix_graph = build_distance_matrix(city_coordinates, edge_weight_type)
+    return Graph.fromMatrix(city_coordinates, matrix_graph, edge_weight_type)
+
+def problemPath(name):
+    """Resolve the problem file a request names, which must be a relative path inside PROBLEM_DIRECTORY."""
+    if not isinstance(name, str) or os.path.isabs(name) or '..' in name.replace('\\', '/').split('/'):
+        raise ValueError(f"Problem files are named relative to the Files/ directory, got {name!r}")
+    file_path = os.path.realpath(os.path.join(PROBLEM_DIRECTORY, name))
+    if os.path.commonpath([file_path, os.path.realpath(PROBLEM_DIRECTORY)]) != os.path.realpath(PROBLEM_DIRECTORY) or not os.path.isfile(file_path):
+        raise ValueError(f"No problem file {name!r} in the Files/ directory")
+    return file_path
+
+def cachedGraph(cache, instance, cache_size=GRAPH_CACHE_SIZE):
+    """Look up an instance in an LRU cache of graphs, building and inserting it on a miss."""
+    key = instance[1]
+    graph = cache.get(key)
+    if graph is not None:
+        cache.move_to_end(key)
+        return graph
+    graph = buildGraph(instance)
+    cache[key] = graph
+    if len(cache) > cache_size:
+        cache.popitem(last=False)
+    return graph
+
+def _improveTour(instance, method, tour, time_budget, seed):
+    """Improve a closed tour in a worker process until the time budget is spent.
+
+    returns:
+        tuple: The improved closed tour and its cost
+    """
+    start_time = time.perf_counter()
+    graph = cachedGraph(_worker_graphs, instance)
+    # The local search tables are built once per cached graph and shared by the polish and the GA of every request
+    if getattr(graph, 'neighbors', None) is None:
+        graph.neighbors = neighbor_lists(graph.matrix_graph).tolist()
+        graph.weights = weight_table(graph.matrix_graph)
+    polish_method = 'or2opt' if method == 'ga' else method
+    tour, cost = polish_tour(tour, graph, polish_method, graph.neighbors, graph.weights, start_time + time_budget)
+    if method != 'ga' or time.perf_counter() - start_time >= time_budget or graph.num_of_cities < 4:
+        return tour, cost
+
+    # Seed the GA with the polished tour, the rest of the population is random
+    population_size = max(MIN_POPULATION_SIZE, min(graph.num_of_cities * 30, MAX_POPULATION_SIZE, MAX_POPULATION_CITIES // graph.num_of_cities))
+    setup_start = time.perf_counter()
+    ga = GeneticAlgorithm(pop_size=population_size, num_of_cities=graph.num_of_cities, matrix_graph=graph.matrix_graph, crossover_rate=0.7, mutation_rate=0.05,
+                          seed=seed)
+    ga.population[0] = tour[:-1]
+    ga.fitness_scores = ga.populationFitness(ga.population)
+    ga.population_hashes = ga.populationHashes(ga.population)
+    ga.neighbors, ga.weights = graph.neighbors, graph.weights
+    # A generation scores and recombines about as many tours as the setup, skip the GA when not even one fits
+    remaining = time_budget - (time.perf_counter() - start_time)
+    if remaining < time.perf_counter() - setup_start:
+        return tour, cost
+    for path, ga_cost, _, _ in anytimeGenerations(ga, population_size, time_budget=remaining, opt=True):
+        if ga_cost < cost:
+            tour, cost = path, ga_cost
+    return tour, cost
+
+class SolverService:
+    def __init__(self, max_workers=None, graph_cache_size=GRAPH_CACHE_SIZE):
+        self.max_workers = max_workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.graph_cache_size = graph_cache_size
+        self.graphs = OrderedDict()
+        # The graph cache is used from the threads that build graphs and nearest neighbor tours
+        self.graph_lock = threading.Lock()
+        # Solves in progress, identical requests arriving meanwhile await the same task
+        self.inflight = {}
+        self.coalesced = 0
+
+    def parseInstance(self, request):
+        """The instance tuple of a request (see buildGraph). Hashes the coordinates or the problem file, so it runs off the event loop."""
+        if 'problem' in request:
+            file_path = problemPath(request['problem'])
+            return ('problem', f"problem:{source_hash(file_path)}", file_path)
+        city_coordinates = np.asarray(request['city_coordinates'], dtype=np.float64).reshape(-1, 2)
+        edge_weight_type = request.get('edge_weight_type')
+        if edge_weight_type is not None and edge_weight_type not in SUPPORTED_EDGE_WEIGHT_TYPES:
+            raise ValueError(f"Unsupported edge weight type: {edge_weight_type}")
+        return ('coordinates', instanceHash(city_coordinates, edge_weight_type), city_coordinates, edge_weight_type)
+
+    async def solve(self, request, on_incumbent=None):
+        """Solve one request, calling on_incumbent(result) with the nearest neighbor answer before the improvement.
+
+        returns:
+            dict: The best tour found before the deadline ('path', closed), its 'cost', the 'method' that found it and timings
+        """
+        start_time = time.perf_counter()
+        deadline = float(request.get('deadline', DEFAULT_DEADLINE))
+        method = request.get('method', 'ga')
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}, expected one of {list(METHODS)}")
+        instance = await asyncio.get_running_loop().run_in_executor(None, self.parseInstance, request)
+        key = (instance[1], method, deadline)
+
+        if key not in self.inflight:
+            nearest_neighbor = asyncio.get_running_loop().create_future()
+            task = asyncio.ensure_future(self.solveInstance(instance, method, deadline, start_time, nearest_neighbor))
+            self.inflight[key] = (nearest_neighbor, task)
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        nearest_neighbor, task = self.inflight[key]
+
+        if on_incumbent is not None:
+            await on_incumbent(dict(await asyncio.shield(nearest_neighbor), elapsed=time.perf_counter() - start_time))
+        result = await asyncio.shield(task)
+        return dict(result, elapsed=time.perf_counter() - start_time)
+
+    async def solveInstance(self, instance, method, deadline, start_time, nearest_neighbor):
+        """Answer with the nearest neighbor tour, improved on the process pool if that finishes before the deadline.
+        The graph build and the nearest neighbor tour run on a thread, their time counts against the deadline."""
+        loop = asyncio.get_running_loop()
+        try:
+            graph, path, cost = await loop.run_in_executor(None, self.nearestNeighbor, instance)
+        except Exception as error:
+            nearest_neighbor.set_exception(error)
+            raise
+        result = {'path': list(map(int, path)), 'cost': float(cost), 'method': 'nn', 'num_of_cities': graph.num_of_cities, 'instance': instance[1][:16]}
+        nearest_neighbor.set_result(dict(result))
+
+        remaining = deadline - (time.perf_counter() - start_time) - DEADLINE_MARGIN
+        if remaining <= 0 or graph.num_of_cities < 4:
+            return result
+        seed = random.getrandbits(32)
+        improvement = loop.run_in_executor(self.executor, _improveTour, instance, method, result['path'], remaining * WORKER_BUDGET_FRACTION, seed)
+        try:
+            path, cost = await asyncio.wait_for(improvement, timeout=remaining + DEADLINE_MARGIN)
+        except asyncio.TimeoutError:
+            logging.info("Improvement of %s missed its deadline, answering with the nearest neighbor tour", instance[1][:16])
+            return result
+        if cost < result['cost']:
+            result.update(path=list(map(int, path)), cost=float(cost), method=method)
+        return result
+
+    def nearestNeighbor(self, instance):
+        """Look up or build the graph of an instance and its nearest neighbor tour."""
+        with self.graph_lock:
+            graph = cachedGraph(self.graphs, instance, self.graph_cache_size)
+        path, cost = comparison_algorithms.nearest_neighbor_tsp(graph)
+        return graph, path, cost
+
+    async def handleConnection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            verb, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length > MAX_REQUEST_SIZE:
+                await self.respond(writer, 413, {'error': 'request too large'})
+                return
+            body = await reader.readexactly(length) if length else b''
+
+            if verb == 'GET' and target == '/health':
+                await self.respond(writer, 200, {'status': 'ok', 'cached_graphs': len(self.graphs), 'inflight': len(self.inflight), 'coalesced': self.coalesced})
+            elif verb == 'POST' and target == '/solve':
+                request = json.loads(body or b'{}')
+                if request.get('stream'):
+                    await self.streamSolve(writer, request)
+                else:
+                    await self.respond(writer, 200, await self.solve(request))
+            else:
+                await self.respond(writer, 404, {'error': f'no route {verb} {target}'})
+        except (ValueError, KeyError) as error:
+            await self.respond(writer, 400, {'error': repr(error)})
+        except Exception as error:
+            logging.exception("Solver request failed")
+            await self.respond(writer, 500, {'error': repr(error)})
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def streamSolve(self, writer, request):
+        """Answer with a chunked stream of JSON lines: the nearest neighbor tour first, then the final tour."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+        async def sendChunk(payload):
+            line = json.dumps(payload).encode() + b"\n"
+            writer.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            await writer.drain()
+
+        await sendChunk(await self.solve(request, on_incumbent=sendChunk))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080, unix_path=None):
+        await asyncio.get_running_loop().run_in_executor(None, self.warmUp)
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handleConnection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handleConnection, host, port)
+        logging.info("Solver service listening on %s", unix_path or f"{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def warmUp(self):
+        """Start the worker processes now, so the first requests do not pay for their startup and imports."""
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(self.max_workers)]:
+            future.result()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the TSP solver service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--graph-cache-size", type=int, default=GRAPH_CACHE_SIZE)
+    args = parser.parse_args()
+
+    service = SolverService(max_workers=args.workers, graph_cache_size=args.graph_cache_size)
+    print(f"Solver service listening on {args.unix or f'{args.host}:{args.port}'}")
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_main_loop import evolveGenerations
+from utils.checkpoint import Checkpointer, snapshot, write_checkpoint, read_checkpoint, restore_genetic_algorithm
+from utils.distance_matrix import build_distance_matrix
+import numpy as np
+import pytest
+
+NUM_OF_CITIES = 30
+POPULATION_SIZE = 40
+NUM_GENERATIONS = 12
+
+@pytest.fixture(scope='module')
+def matrix_graph():
+    return build_distance_matrix(np.random.default_rng(0).uniform(0, 1000, size=(NUM_OF_CITIES, 2)), 'EUC_2D')
+
+def new_genetic_algorithm(matrix_graph, crossover):
+    return GeneticAlgorithm(pop_size=POPULATION_SIZE, num_of_cities=NUM_OF_CITIES, matrix_graph=matrix_graph, crossover_rate=0.7, mutation_rate=0.2,
+                            crossover=crossover, seed=7)
+
+def assert_same_state(ga, expected):
+    np.testing.assert_array_equal(ga.population, expected.population)
+    np.testing.assert_array_equal(ga.fitness_scores, expected.fitness_scores)
+    np.testing.assert_array_equal(ga.population_hashes, expected.population_hashes)
+    assert ga.evaluations == expected.evaluations
+    assert ga.rng.bit_generator.state == expected.rng.bit_generator.state
+
+@pytest.mark.parametrize('opt', [False, True])
+@pytest.mark.parametrize('crossover', ['ox', 'pmx', 'erx'])
+@pytest.mark.parametrize('stop', [1, 5, NUM_GENERATIONS - 1])
+def test_resume_equals_an_uninterrupted_run(matrix_graph, tmp_path, crossover, opt, stop):
+    uninterrupted = new_genetic_algorithm(matrix_graph, crossover)
+    evolveGenerations(uninterrupted, 0, NUM_GENERATIONS, NUM_GENERATIONS, POPULATION_SIZE, opt)
+
+    interrupted = new_genetic_algorithm(matrix_graph, crossover)
+    evolveGenerations(interrupted, 0, stop, NUM_GENERATIONS, POPULATION_SIZE, opt)
+    checkpoint_path = str(tmp_path / 'run.npz')
+    write_checkpoint(checkpoint_path, snapshot(interrupted, stop - 1, {'num_generations': NUM_GENERATIONS, 'opt': opt}))
+    del interrupted
+
+    resumed, start_generation, run_parameters = restore_genetic_algorithm(read_checkpoint(checkpoint_path), matrix_graph)
+    assert start_generation == stop
+    assert run_parameters == {'num_generations': NUM_GENERATIONS, 'opt': opt}
+    evolveGenerations(resumed, start_generation, NUM_GENERATIONS, NUM_GENERATIONS, POPULATION_SIZE, opt)
+    assert_same_state(resumed, uninterrupted)
+
+def test_checkpointer_resume_equals_an_uninterrupted_run(matrix_graph, tmp_path):
+    uninterrupted = new_genetic_algorithm(matrix_graph, 'ox')
+    evolveGenerations(uninterrupted, 0, NUM_GENERATIONS, NUM_GENERATIONS, POPULATION_SIZE)
+
+    checkpoint_path = str(tmp_path / 'run.npz')
+    interrupted = new_genetic_algorithm(matrix_graph, 'ox')
+    checkpointer = Checkpointer(checkpoint_path, interval=4)
+    evolveGenerations(interrupted, 0, 7, NUM_GENERATIONS, POPULATION_SIZE, checkpointer=checkpointer)
+    checkpointer.close()
+
+    # The last checkpoint was taken after generation 0 or 4 (a checkpoint is skipped while the previous one is still
+    # being written), the resumed run redoes the generations after it
+    resumed, start_generation, _ = restore_genetic_algorithm(read_checkpoint(checkpoint_path), matrix_graph)
+    assert start_generation == checkpointer.last_generation + 1
+    evolveGenerations(resumed, start_generation, NUM_GENERATIONS, NUM_GENERATIONS, POPULATION_SIZE)
+    assert_same_state(resumed, uninterrupted)
+
+def test_population_is_stored_compactly(matrix_graph, tmp_path):
+    ga = new_genetic_algorithm(matrix_graph, 'ox')
+    checkpoint_path = str(tmp_path / 'run.npz')
+    write_checkpoint(checkpoint_path, snapshot(ga, 0))
+    with np.load(checkpoint_path) as data:
+        assert data['population'].dtype == np.uint16
+    np.testing.assert_array_equal(read_checkpoint(checkpoint_path)['population'], ga.population)
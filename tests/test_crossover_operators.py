@@ -0,0 +1,52 @@
+from crossover_operators import CROSSOVER_OPERATORS, BATCH_CROSSOVER_OPERATORS, order_crossover, batch_order_crossover
+import numpy as np
+import pytest
+
+def random_parents(rng, batch, num_of_cities):
+    parents1 = np.array([rng.permutation(num_of_cities) for _ in range(batch)], dtype=np.int32)
+    parents2 = np.array([rng.permutation(num_of_cities) for _ in range(batch)], dtype=np.int32)
+    cut_points = np.sort(np.array([rng.choice(num_of_cities + 1, size=2, replace=False) for _ in range(batch)]), axis=1)
+    return parents1, parents2, cut_points[:, 0], cut_points[:, 1]
+
+@pytest.mark.parametrize('num_of_cities', [2, 5, 17, 100])
+def test_batch_order_crossover_matches_order_crossover(num_of_cities):
+    parents1, parents2, starts, ends = random_parents(np.random.default_rng(num_of_cities), 50, num_of_cities)
+    children = batch_order_crossover(parents1, parents2, starts, ends)
+    expected = np.array([order_crossover(p1, p2, start, end) for p1, p2, start, end in zip(parents1, parents2, starts, ends)])
+    np.testing.assert_array_equal(children, expected)
+    assert children.dtype == parents1.dtype
+
+def test_order_crossover_keeps_the_segment_and_the_order_of_the_rest():
+    parent1 = np.array([0, 1, 2, 3, 4, 5, 6, 7])
+    parent2 = np.array([7, 6, 5, 4, 3, 2, 1, 0])
+    child = order_crossover(parent1, parent2, 2, 5)
+    np.testing.assert_array_equal(child, [7, 6, 2, 3, 4, 5, 1, 0])
+
+@pytest.mark.parametrize('name', list(CROSSOVER_OPERATORS))
+@pytest.mark.parametrize('num_of_cities', [2, 3, 10, 101])
+def test_crossover_returns_permutations(name, num_of_cities):
+    operator = CROSSOVER_OPERATORS[name]
+    parents1, parents2, starts, ends = random_parents(np.random.default_rng(num_of_cities), 30, num_of_cities)
+    for p1, p2, start, end in zip(parents1, parents2, starts, ends):
+        child = operator(p1, p2, start, end)
+        assert child.dtype == p1.dtype
+        assert sorted(child.tolist()) == list(range(num_of_cities))
+        if name != 'erx':
+            # OX and PMX copy the segment of the first parent
+            np.testing.assert_array_equal(child[start:end], p1[start:end])
+
+@pytest.mark.parametrize('name', list(BATCH_CROSSOVER_OPERATORS))
+def test_batch_crossover_returns_permutations(name):
+    parents1, parents2, starts, ends = random_parents(np.random.default_rng(1), 64, 40)
+    children = BATCH_CROSSOVER_OPERATORS[name](parents1, parents2, starts, ends)
+    assert children.shape == parents1.shape
+    np.testing.assert_array_equal(np.sort(children, axis=1), np.broadcast_to(np.arange(40), children.shape))
+
+def undirected_edges(tour):
+    return {frozenset(edge) for edge in zip(tour.tolist(), np.roll(tour, -1).tolist())}
+
+@pytest.mark.parametrize('name', list(CROSSOVER_OPERATORS))
+def test_crossover_of_identical_parents_is_the_parent_tour(name):
+    parent = np.random.default_rng(2).permutation(25).astype(np.int32)
+    # ERX may walk the cycle in the other direction, the tour is the same
+    assert undirected_edges(CROSSOVER_OPERATORS[name](parent, parent.copy(), 5, 12)) == undirected_edges(parent)
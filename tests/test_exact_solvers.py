@@ -0,0 +1,52 @@
+from comparison_algorithms import held_karp_tsp, branch_and_bound_tsp, naive_tsp
+from utils.distance_matrix import build_distance_matrix
+from utils.gen_graph import Graph
+from itertools import permutations
+import numpy as np
+import pytest
+
+EXACT_SOLVERS = {
+    'held_karp': held_karp_tsp,
+    'branch_and_bound': branch_and_bound_tsp,
+}
+
+def brute_force_cost(matrix_graph):
+    num_of_cities = len(matrix_graph)
+    if num_of_cities < 2:
+        return 0
+    # City 0 is fixed as the start, every tour is still tried in both directions
+    return min(matrix_graph[[0, *rest], [*rest, 0]].sum() for rest in permutations(range(1, num_of_cities))).item()
+
+def path_cost(matrix_graph, path):
+    return sum(matrix_graph[a, b] for a, b in zip(path, path[1:]))
+
+def instance(name, num_of_cities, seed):
+    rng = np.random.default_rng(seed)
+    if name == 'random':
+        coordinates = rng.uniform(0, 100, size=(num_of_cities, 2))
+        return Graph.fromMatrix(coordinates, build_distance_matrix(coordinates))
+    if name == 'rounded':
+        coordinates = rng.integers(0, 20, size=(num_of_cities, 2)).astype(np.float64)
+        return Graph.fromMatrix(coordinates, build_distance_matrix(coordinates, 'EUC_2D'), 'EUC_2D')
+    # Collinear cities, with many tours of the same length
+    coordinates = np.stack([rng.permutation(num_of_cities).astype(np.float64), np.zeros(num_of_cities)], axis=1)
+    return Graph.fromMatrix(coordinates, build_distance_matrix(coordinates))
+
+@pytest.mark.parametrize('solver', list(EXACT_SOLVERS))
+@pytest.mark.parametrize('name', ['random', 'rounded', 'collinear'])
+@pytest.mark.parametrize('num_of_cities', [2, 3, 4, 5, 6, 7, 8])
+def test_exact_solver_matches_brute_force(solver, name, num_of_cities):
+    for seed in range(3):
+        graph = instance(name, num_of_cities, seed)
+        matrix_graph = np.asarray(graph.matrix_graph, dtype=np.float64)
+        path, cost = EXACT_SOLVERS[solver](graph)
+        assert path[0] == path[-1]
+        assert sorted(path[:-1]) == list(range(num_of_cities))
+        assert cost == pytest.approx(path_cost(matrix_graph, path))
+        assert cost == pytest.approx(brute_force_cost(matrix_graph))
+
+@pytest.mark.parametrize('num_of_cities', [4, 6])
+def test_naive_tsp_matches_brute_force(num_of_cities):
+    graph = instance('random', num_of_cities, 0)
+    _, cost = naive_tsp(graph)
+    assert cost == pytest.approx(brute_force_cost(np.asarray(graph.matrix_graph)))
@@ -0,0 +1,77 @@
+from local_search import LOCAL_SEARCH_OPERATORS, neighbor_lists, weight_table, polish_tour
+from utils.distance_matrix import build_distance_matrix
+from utils.lazy_distance import LazyDistanceMatrix
+import numpy as np
+import time
+import pytest
+
+def tour_cost(matrix_graph, tour):
+    tour = np.asarray(tour)
+    return matrix_graph[tour, np.roll(tour, -1)].sum().item()
+
+def random_instance(seed, num_of_cities, edge_weight_type=None):
+    coordinates = np.random.default_rng(seed).uniform(0, 1000, size=(num_of_cities, 2))
+    return coordinates, build_distance_matrix(coordinates, edge_weight_type)
+
+@pytest.mark.parametrize('name', list(LOCAL_SEARCH_OPERATORS))
+@pytest.mark.parametrize('edge_weight_type', [None, 'EUC_2D'])
+@pytest.mark.parametrize('num_of_cities', [4, 5, 12, 200])
+def test_local_search_delta_is_the_change_in_cost(name, edge_weight_type, num_of_cities):
+    _, matrix_graph = random_instance(num_of_cities, num_of_cities, edge_weight_type)
+    weights, neighbors = weight_table(matrix_graph), neighbor_lists(matrix_graph).tolist()
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        tour = rng.permutation(num_of_cities).tolist()
+        cost_before = tour_cost(matrix_graph, tour)
+        delta = LOCAL_SEARCH_OPERATORS[name](tour, weights, neighbors)
+        assert sorted(tour) == list(range(num_of_cities))
+        assert delta <= 0
+        assert tour_cost(matrix_graph, tour) - cost_before == pytest.approx(delta, abs=1e-6)
+
+@pytest.mark.parametrize('name', list(LOCAL_SEARCH_OPERATORS))
+def test_local_search_from_active_cities(name):
+    _, matrix_graph = random_instance(1, 150)
+    weights, neighbors = weight_table(matrix_graph), neighbor_lists(matrix_graph).tolist()
+    tour = np.random.default_rng(1).permutation(150).tolist()
+    cost_before = tour_cost(matrix_graph, tour)
+    delta = LOCAL_SEARCH_OPERATORS[name](tour, weights, neighbors, tour[:10])
+    assert sorted(tour) == list(range(150))
+    assert tour_cost(matrix_graph, tour) - cost_before == pytest.approx(delta, abs=1e-6)
+
+@pytest.mark.parametrize('name', list(LOCAL_SEARCH_OPERATORS))
+def test_local_search_stops_at_the_deadline_with_a_valid_tour(name):
+    _, matrix_graph = random_instance(2, 300)
+    weights, neighbors = weight_table(matrix_graph), neighbor_lists(matrix_graph).tolist()
+    tour = np.random.default_rng(2).permutation(300).tolist()
+    cost_before = tour_cost(matrix_graph, tour)
+    delta = LOCAL_SEARCH_OPERATORS[name](tour, weights, neighbors, deadline=time.perf_counter())
+    assert sorted(tour) == list(range(300))
+    assert tour_cost(matrix_graph, tour) - cost_before == pytest.approx(delta, abs=1e-6)
+
+@pytest.mark.parametrize('name', list(LOCAL_SEARCH_OPERATORS))
+def test_local_search_on_a_lazy_matrix(name):
+    coordinates, matrix_graph = random_instance(3, 120, 'EUC_2D')
+    lazy_matrix = LazyDistanceMatrix(coordinates, 'EUC_2D')
+    tour = np.random.default_rng(3).permutation(120).tolist()
+    cost_before = tour_cost(matrix_graph, tour)
+    delta = LOCAL_SEARCH_OPERATORS[name](tour, weight_table(lazy_matrix), neighbor_lists(lazy_matrix).tolist())
+    assert sorted(tour) == list(range(120))
+    assert tour_cost(matrix_graph, tour) - cost_before == pytest.approx(delta, abs=1e-6)
+
+class MatrixGraph:
+    def __init__(self, matrix_graph):
+        self.matrix_graph = matrix_graph
+
+@pytest.mark.parametrize('closed', [False, True])
+def test_polish_tour_keeps_closed_tours_closed_and_reports_their_cost(closed):
+    _, matrix_graph = random_instance(4, 60)
+    tour = np.random.default_rng(4).permutation(60).tolist()
+    if closed:
+        tour.append(tour[0])
+    # Neighbor lists may be given as an array or as nested lists
+    polished, cost = polish_tour(tour, MatrixGraph(matrix_graph), neighbors=neighbor_lists(matrix_graph).tolist())
+    assert (polished[0] == polished[-1]) == closed
+    open_tour = polished[:-1] if closed else polished
+    assert sorted(open_tour) == list(range(60))
+    assert cost == pytest.approx(tour_cost(matrix_graph, open_tour))
+    assert cost <= tour_cost(matrix_graph, tour[:60])
@@ -0,0 +1,46 @@
+from utils.spatial_index import SpatialGrid, candidate_lists
+import numpy as np
+import pytest
+
+def brute_force_distances(coordinates, k):
+    distances = np.sqrt(((coordinates[:, None, :] - coordinates[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    return np.sort(distances, axis=1)[:, :k]
+
+COORDINATES = {
+    'collinear': np.stack([np.arange(300, dtype=np.float64), np.zeros(300)], axis=1),
+    'vertical': np.stack([np.zeros(300), np.arange(300, dtype=np.float64)], axis=1),
+    'integer_grid': np.array([(x, y) for x in range(5) for y in range(4)], dtype=np.float64)[:19],
+    'random': np.random.default_rng(0).uniform(0, 1000, size=(500, 2)),
+}
+
+@pytest.mark.parametrize('name', list(COORDINATES))
+def test_candidate_lists_match_brute_force(name):
+    coordinates = COORDINATES[name]
+    k = 5
+    neighbors = candidate_lists(coordinates, k)
+    assert neighbors.shape == (len(coordinates), k)
+    assert neighbors.min() >= 0 and neighbors.max() < len(coordinates)
+    assert not (neighbors == np.arange(len(coordinates))[:, None]).any()
+    # Ties may be ordered either way, so the distances are compared instead of the indices
+    distances = np.sqrt(((coordinates[neighbors] - coordinates[:, None, :]) ** 2).sum(axis=2))
+    np.testing.assert_allclose(distances, brute_force_distances(coordinates, k))
+
+@pytest.mark.parametrize('name', list(COORDINATES))
+def test_every_city_is_inside_the_grid(name):
+    grid = SpatialGrid(COORDINATES[name])
+    assert (grid.city_cells >= 0).all()
+    assert (grid.city_cells[:, 0] < grid.columns).all() and (grid.city_cells[:, 1] < grid.rows).all()
+    assert grid.cell_start[-1] == grid.num_of_cities
+
+@pytest.mark.parametrize('name', list(COORDINATES))
+def test_nearest_visits_every_city(name):
+    grid = SpatialGrid(COORDINATES[name])
+    visited = []
+    for _ in range(grid.num_of_cities):
+        city = grid.nearest(0.0, 0.0)
+        assert city is not None
+        grid.remove(city)
+        visited.append(city)
+    assert sorted(visited) == list(range(grid.num_of_cities))
+    assert grid.nearest(0.0, 0.0) is None
@@ -0,0 +1,166 @@
+"""Checkpoints of GA runs, to resume a run after the process was stopped.
+
+A checkpoint is a .npz file with the population packed as uint16 (uint32 above 65536 cities), the cached fitness
+scores and hashes, the hash weights, the generation, the evaluation counter, the state of the GA's random stream
+(GeneticAlgorithm.rng) and the operator and run parameters. Resuming from it continues the run exactly like the
+uninterrupted one, as long as the same matrix is used.
+
+Pass a Checkpointer to evolveGenerations to write one every few generations. The arrays are copied at the end of
+the generation, the file is written on a background thread, into a temporary file that replaces the checkpoint
+in one step, so a killed process always leaves the previous complete checkpoint behind.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import json
+import os
+
+CHECKPOINT_VERSION = 2
+
+# Write a checkpoint every this many generations by default
+CHECKPOINT_INTERVAL = 50
+
+def population_dtype(num_of_cities):
+    """The smallest unsigned integer type that holds every city index."""
+    return np.uint16 if num_of_cities <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+def generator_from_state(state):
+    """A np.random.Generator with the bit generator and state of bit_generator.state."""
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+def snapshot(ga, generation, run_parameters=None):
+    """Copy everything a resumed run needs out of a GeneticAlgorithm at the end of a generation.
+
+    args:
+        ga: The GeneticAlgorithm
+        generation: The generation that was just completed
+        run_parameters: Arguments of the main loop, e.g. num_generations and opt, stored as JSON
+    returns:
+        dict: The arrays and the JSON metadata of the checkpoint
+    """
+    metadata = {
+        'version': CHECKPOINT_VERSION,
+        'generation': generation,
+        'evaluations': ga.evaluations,
+        'rng_state': ga.rng.bit_generator.state,
+        'parameters': {
+            'pop_size': ga.pop_size,
+            'num_of_cities': ga.num_of_cities,
+            'crossover_rate': ga.crossover_rate,
+            'mutation_rate': ga.mutation_rate,
+            'crossover': ga.crossover,
+            'local_search': ga.local_search,
+            'seeding': ga.seeding,
+        },
+        'run_parameters': run_parameters or {},
+    }
+    return {
+        'population': ga.population.astype(population_dtype(ga.num_of_cities)),
+        'fitness_scores': ga.fitness_scores.copy(),
+        'population_hashes': ga.population_hashes.copy(),
+        'hash_weights': ga.hash_weights.copy(),
+        'metadata': np.array(json.dumps(metadata)),
+    }
+
+def write_checkpoint(file_path, arrays):
+    """Write the arrays of a snapshot to file_path atomically: into a temporary file first, which then replaces it."""
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    temporary_path = f"{file_path}.tmp"
+    with open(temporary_path, 'wb') as file:
+        np.savez(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, file_path)
+
+def read_checkpoint(file_path):
+    """Read a checkpoint written by write_checkpoint.
+
+    returns:
+        dict: The arrays, with the population as int32 again, and the metadata under 'metadata'
+    """
+    with np.load(file_path, allow_pickle=False) as data:
+        checkpoint = {name: data[name] for name in data.files}
+    checkpoint['metadata'] = json.loads(checkpoint['metadata'].item())
+    if checkpoint['metadata']['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {checkpoint['metadata']['version']} in {file_path}, expected {CHECKPOINT_VERSION}")
+    checkpoint['population'] = checkpoint['population'].astype(np.int32)
+    return checkpoint
+
+def restore_genetic_algorithm(checkpoint, matrix_graph, city_coordinates=None):
+    """Rebuild the GeneticAlgorithm of a checkpoint with its random stream, so that the next generation is the same
+    as in the run that wrote it.
+
+    args:
+        checkpoint: A checkpoint from read_checkpoint
+        matrix_graph: The distance matrix of the problem of the run
+        city_coordinates: The city coordinates, if the run was given them
+    returns:
+        tuple: The GeneticAlgorithm, the generation to continue from and the run parameters
+    """
+    from genetic_algorithm import GeneticAlgorithm
+    metadata = checkpoint['metadata']
+    parameters = metadata['parameters']
+    if len(matrix_graph) != parameters['num_of_cities']:
+        raise ValueError(f"The checkpoint is for {parameters['num_of_cities']} cities, the matrix has {len(matrix_graph)}")
+
+    rng = generator_from_state(metadata['rng_state'])
+    ga = GeneticAlgorithm(matrix_graph=matrix_graph, population=checkpoint['population'], city_coordinates=city_coordinates, seed=rng, **parameters)
+    # The constructor scores the population again and draws new hash weights, the checkpoint has the exact ones and the
+    # random stream continues where it was
+    ga.hash_weights = checkpoint['hash_weights']
+    ga.fitness_scores = checkpoint['fitness_scores']
+    ga.population_hashes = checkpoint['population_hashes']
+    ga.evaluations = metadata['evaluations']
+    ga.rng.bit_generator.state = metadata['rng_state']
+    return ga, metadata['generation'] + 1, metadata['run_parameters']
+
+class Checkpointer:
+    """Writes a checkpoint of the GA every 'interval' generations, on a background thread.
+
+    Pass one to evolveGenerations, the loop reports every generation with recordGeneration. When the previous
+    checkpoint is still being written the snapshot waits for the next interval instead of blocking the loop.
+    """
+    def __init__(self, file_path, interval=CHECKPOINT_INTERVAL, run_parameters=None):
+        """
+        file_path: The checkpoint file, replaced by every new checkpoint
+        run_parameters: Arguments of the main loop stored with the checkpoint, e.g. {'num_generations': 1000, 'opt': True}
+        """
+        if interval < 1:
+            raise ValueError(f"The checkpoint interval must be at least 1 generation, got {interval}")
+        self.file_path = file_path
+        self.interval = interval
+        self.run_parameters = run_parameters
+        self.last_generation = None
+        self.written = 0
+        self.skipped = 0
+        self.pending = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def recordGeneration(self, generation, ga):
+        if self.last_generation is not None and generation - self.last_generation < self.interval:
+            return
+        if self.pending is not None and not self.pending.done():
+            self.skipped += 1
+            return
+        self.checkpoint(generation, ga)
+
+    def checkpoint(self, generation, ga):
+        """Snapshot the GA now and write it in the background."""
+        if self.pending is not None:
+            # Surfaces an error of the previous write
+            self.pending.result()
+        arrays = snapshot(ga, generation, self.run_parameters)
+        self.pending = self.executor.submit(write_checkpoint, self.file_path, arrays)
+        self.last_generation = generation
+        self.written += 1
+
+    def close(self, ga=None, generation=None):
+        """Wait for the last write, after writing a final checkpoint of 'ga' at 'generation' when they are given."""
+        try:
+            if ga is not None and generation is not None and generation != self.last_generation:
+                self.checkpoint(generation, ga)
+            if self.pending is not None:
+                self.pending.result()
+        finally:
+            self.executor.shutdown()
@@ -1,17 +1,19 @@
 import time
 import logging
 
+logger = logging.getLogger(__name__)
+
 def timer(func):
     """
     This decorator measures the execution time of our algorithms.
     Usage: '@timer' above the function you want to measure. 
+    The duration is logged at INFO level only, nothing is formatted when INFO is disabled.
     """
     def wrapper(*args, **kwargs):
-        start_time = time.time()
+        start_time = time.perf_counter()
         result = func(*args, **kwargs)
-        end_time = time.time()
-        duration = end_time - start_time
-        logging.info(f"{func.__name__} took {duration:.6f} seconds")
-        print(f"{func.__name__} took {duration:.6f} seconds")
+        duration = time.perf_counter() - start_time
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s took %.6f seconds", func.__name__, duration)
         return result
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,112 @@
+import numpy as np
+
+# Radius used by TSPLIB for GEO problems
+EARTH_RADIUS = 6378.388
+
+# Edge weight types whose distances can be computed straight from the coordinates
+SUPPORTED_EDGE_WEIGHT_TYPES = ('EUC_2D', 'CEIL_2D', 'GEO', 'ATT')
+
+# Number of matrix rows computed per block, keeps the temporaries small on big instances
+ROW_BLOCK_SIZE = 1024
+
+
+def _geo_radians(coordinates):
+    """Convert TSPLIB encoded DDD.MM geo coordinates to (latitude, longitude) in radians."""
+    degrees = np.trunc(coordinates)
+    minutes = coordinates - degrees
+    return np.radians(degrees + minutes * 5.0 / 3.0)
+
+
+def _geo_weights(start, end):
+    q1 = np.cos(start[..., 1] - end[..., 1])
+    q2 = np.cos(start[..., 0] - end[..., 0])
+    q3 = np.cos(start[..., 0] + end[..., 0])
+    distance = EARTH_RADIUS * np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)) + 1.0
+    return distance.astype(np.int32)
+
+
+def _euclidean(start, end):
+    dx = start[..., 0] - end[..., 0]
+    dy = start[..., 1] - end[..., 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def paired_edge_weights(start, end, edge_weight_type=None):
+    """Compute the weights between start[i] and end[i] for every i (the coordinate arrays broadcast like NumPy arrays).
+
+    args:
+        start: (..., 2) array of coordinates
+        end: (..., 2) array of coordinates
+        edge_weight_type: TSPLIB EDGE_WEIGHT_TYPE, or None for plain (unrounded) Euclidean distance
+    returns:
+        np.ndarray: Array of weights, int32 for TSPLIB metrics and float64 otherwise
+    """
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    if edge_weight_type is None:
+        return _euclidean(start, end)
+    if edge_weight_type == 'EUC_2D':
+        return (_euclidean(start, end) + 0.5).astype(np.int32)
+    if edge_weight_type == 'CEIL_2D':
+        return np.ceil(_euclidean(start, end)).astype(np.int32)
+    if edge_weight_type == 'ATT':
+        value = np.sqrt(_euclidean(start, end) ** 2 / 10.0)
+        rounded = (value + 0.5).astype(np.int32)
+        return rounded + (rounded < value)
+    if edge_weight_type == 'GEO':
+        return _geo_weights(_geo_radians(start), _geo_radians(end))
+    raise ValueError(f"Unsupported edge weight type: {edge_weight_type}")
+
+
+def edge_weights(start, end, edge_weight_type=None):
+    """Compute the weights between every start and every end coordinate.
+
+    args:
+        start: (m, 2) array of coordinates
+        end: (k, 2) array of coordinates
+        edge_weight_type: TSPLIB EDGE_WEIGHT_TYPE, or None for plain (unrounded) Euclidean distance
+    returns:
+        np.ndarray: (m, k) array of weights, int32 for TSPLIB metrics and float64 otherwise
+    """
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    return paired_edge_weights(start[:, None, :], end[None, :, :], edge_weight_type)
+
+
+def build_distance_matrix(city_coordinates, edge_weight_type=None):
+    """Build the full distance matrix for a list of city coordinates.
+
+    The matrix is computed in blocks of rows with NumPy broadcasting and follows the
+    TSPLIB rounding rules, so the values match tsplib95's get_weight for the supported types.
+    The diagonal is always 0.
+
+    args:
+        city_coordinates: A sequence of (x, y) coordinates
+        edge_weight_type: TSPLIB EDGE_WEIGHT_TYPE, or None for plain (unrounded) Euclidean distance
+    returns:
+        np.ndarray: A contiguous (n, n) distance matrix
+    """
+    coordinates = np.asarray(city_coordinates, dtype=np.float64)
+    num_of_cities = len(coordinates)
+    dtype = np.float64 if edge_weight_type is None else np.int32
+    matrix_graph = np.empty((num_of_cities, num_of_cities), dtype=dtype)
+
+    for start in range(0, num_of_cities, ROW_BLOCK_SIZE):
+        end = min(start + ROW_BLOCK_SIZE, num_of_cities)
+        matrix_graph[start:end] = edge_weights(coordinates[start:end], coordinates, edge_weight_type)
+
+    np.fill_diagonal(matrix_graph, 0)
+    return matrix_graph
+
+
+def tour_edges(path):
+    """Return the (from, to) city index arrays for every edge of a closed tour."""
+    path = np.asarray(path, dtype=np.intp)
+    return path, np.roll(path, -1)
+
+
+def tour_length(city_coordinates, path, edge_weight_type=None):
+    """Length of a closed tour computed straight from the coordinates, without a distance matrix."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64)
+    cities, next_cities = tour_edges(path)
+    return paired_edge_weights(coordinates[cities], coordinates[next_cities], edge_weight_type).sum().item()
@@ -1,11 +1,12 @@
-import matplotlib.pyplot as plt
 from datetime import datetime
-from tabulate import tabulate
-import tsplib95
+from utils.distance_matrix import build_distance_matrix, edge_weights, SUPPORTED_EDGE_WEIGHT_TYPES
+from utils.lazy_distance import LazyDistanceMatrix
+from utils.problem_cache import CACHE_DIRECTORY, source_hash, cache_path, read_problem_cache, write_problem_cache
+import numpy as np
 import logging
 import random
-import math
 import json
+import os
 
 #FILE PATHS
 graph_size_10   = "Files//graph_10.json"
@@ -14,37 +15,212 @@ graph_size_100  = "Files//graph_100.json"
 graph_size_500  = "Files//graph_500.json"
 graph_size_1000 = "Files//graph_1000.json"
 
+# Environment variable holding the log file of the run, so that processes started by it log to the same file
+LOG_FILE_VARIABLE = "TSP_LOG_FILE"
+
+# Spare rows allocated when cities are added to a full distance matrix, as a fraction of its size
+MATRIX_HEADROOM = 0.125
+
 class Graph:
-    def __init__(self, num_of_cities=None, tsp_problem=None, testing=None):
+    def __init__(self, num_of_cities=None, tsp_problem=None, testing=None, lazy=False, setup_logging=False, log_matrix=False, plot=False):
+        """
+        lazy: Compute distances on demand from the coordinates (LazyDistanceMatrix) instead of building the n x n matrix,
+              for coordinate based problems with many thousands of cities. The distance matrix is not logged then.
+        setup_logging, log_matrix, plot: Opt-in side effects for interactive runs, a plain Graph only builds the
+              coordinates and the distance matrix so solver processes start fast and headless.
+        """
         self.num_of_cities = num_of_cities
+        self.edge_weight_type = None
+        self.lazy = lazy
 
-        if tsp_problem:
+        if isinstance(tsp_problem, str):
+            # A path to a .tsp or .json problem file is opened through the binary problem cache
+            self.city_coordinates, self.matrix_graph = self.loadCachedProblem(tsp_problem)
+            self.num_of_cities = len(self.city_coordinates)
+        elif tsp_problem:
             self.city_coordinates, self.matrix_graph = self.loadTSPProblem(tsp_problem)
         elif not testing:
             self.city_coordinates = self.generateCityCoordinates(num_of_cities)
             self.matrix_graph = self.generateGraph()
         else: 
-            self.city_coordinates = self.generateGraphBySize(num_of_cities)
-            self.matrix_graph = self.generateGraph()
+            self.city_coordinates, self.matrix_graph = self.loadCachedProblem(self.graphFileBySize(num_of_cities))
+            if num_of_cities < len(self.city_coordinates):
+                self.city_coordinates = self.city_coordinates[:num_of_cities]
+                self.matrix_graph = LazyDistanceMatrix(self.city_coordinates) if lazy else self.matrix_graph[:num_of_cities, :num_of_cities]
         
-        self.setupLogging()
-        self.logDistanceMatrix()
-        self.plotCities()
+        if setup_logging:
+            self.setupLogging()
+        if log_matrix and not isinstance(self.matrix_graph, LazyDistanceMatrix):
+            self.logDistanceMatrix()
+        if plot:
+            self.plotCities()
+
+    @classmethod
+    def fromMatrix(cls, city_coordinates, matrix_graph, edge_weight_type=None):
+        """Wrap existing coordinates and a distance matrix in a Graph, without logging or plotting."""
+        graph = cls.__new__(cls)
+        graph.num_of_cities = len(matrix_graph)
+        graph.edge_weight_type = edge_weight_type
+        graph.lazy = isinstance(matrix_graph, LazyDistanceMatrix)
+        graph.city_coordinates = city_coordinates
+        graph.matrix_graph = matrix_graph
+        return graph
     
+    def addCities(self, new_coordinates):
+        """Add cities at the end of the graph, computing only their rows and columns of the distance matrix.
+
+        args:
+            new_coordinates: A sequence of (x, y) coordinates
+        returns:
+            np.ndarray: The indices of the added cities
+        """
+        new_coordinates = np.asarray(new_coordinates, dtype=np.float64).reshape(-1, 2)
+        num_of_cities = self.num_of_cities
+        cities = np.arange(num_of_cities, num_of_cities + len(new_coordinates))
+        self.city_coordinates = np.concatenate([self.editableCoordinates(), new_coordinates])
+        self.num_of_cities += len(new_coordinates)
+        self.updateDistances(cities)
+        return cities
+
+    def removeCities(self, cities):
+        """Remove cities from the graph. The last cities are moved into the freed indices, so only their rows and
+        columns of the distance matrix are copied instead of compacting the whole matrix.
+
+        args:
+            cities: The indices of the cities to remove
+        returns:
+            np.ndarray: The new index of every old city, -1 for the removed ones
+        """
+        cities = np.unique(np.asarray(cities, dtype=np.intp))
+        if len(cities) and (cities[0] < 0 or cities[-1] >= self.num_of_cities):
+            raise ValueError(f"City indices must be in [0, {self.num_of_cities}), got {cities.tolist()}")
+        remaining = self.num_of_cities - len(cities)
+        holes = cities[cities < remaining]
+        movers = np.setdiff1d(np.arange(remaining, self.num_of_cities), cities)
+        mapping = np.arange(self.num_of_cities)
+        mapping[cities] = -1
+        mapping[movers] = holes
+
+        city_coordinates = self.editableCoordinates()
+        city_coordinates[holes] = city_coordinates[movers]
+        self.city_coordinates = city_coordinates[:remaining]
+        if not self.lazy:
+            matrix_graph = self.editableMatrix(remaining)
+            matrix_graph[holes, :self.num_of_cities] = matrix_graph[movers, :self.num_of_cities]
+            matrix_graph[:self.num_of_cities, holes] = matrix_graph[:self.num_of_cities, movers]
+        self.num_of_cities = remaining
+        self.updateDistances(np.empty(0, dtype=np.intp))
+        return mapping
+
+    def moveCities(self, cities, new_coordinates):
+        """Move cities to new coordinates, computing only their rows and columns of the distance matrix.
+
+        returns:
+            np.ndarray: The indices of the moved cities
+        """
+        cities = np.asarray(cities, dtype=np.intp).reshape(-1)
+        city_coordinates = self.editableCoordinates()
+        city_coordinates[cities] = np.asarray(new_coordinates, dtype=np.float64).reshape(-1, 2)
+        self.city_coordinates = city_coordinates
+        self.updateDistances(cities)
+        return cities
+
+    def editableCoordinates(self):
+        """A writable (n, 2) float64 copy of the coordinates, they may be a list or a read-only cache mapping."""
+        if self.edge_weight_type is not None and self.edge_weight_type not in SUPPORTED_EDGE_WEIGHT_TYPES:
+            raise ValueError(f"Cities can only be changed for coordinate based edge weight types, not {self.edge_weight_type}")
+        return np.array(self.city_coordinates[:self.num_of_cities], dtype=np.float64).reshape(-1, 2)
+
+    def editableMatrix(self, num_of_cities):
+        """A writable buffer holding the distance matrix in its top left corner, with room for num_of_cities.
+
+        A writable matrix is edited in place. Otherwise, or when it is too small, the matrix is copied to a new buffer
+        with MATRIX_HEADROOM spare rows, so adding cities one at a time does not copy the whole matrix every time.
+        """
+        buffer = getattr(self, 'matrix_buffer', None)
+        if buffer is None or self.matrix_graph.base is not buffer:
+            matrix_graph = self.matrix_graph
+            buffer = matrix_graph if isinstance(matrix_graph, np.ndarray) and matrix_graph.flags.writeable and matrix_graph.base is None else None
+        if buffer is None or len(buffer) < num_of_cities:
+            old_size = len(self.matrix_graph)
+            size = max(num_of_cities, int(old_size * (1 + MATRIX_HEADROOM)))
+            buffer = np.empty((size, size), dtype=np.asarray(self.matrix_graph).dtype)
+            buffer[:old_size, :old_size] = self.matrix_graph
+        self.matrix_buffer = buffer
+        return buffer
+
+    def updateDistances(self, cities):
+        """Recompute the distance matrix rows and columns of the given cities after the coordinates changed."""
+        # Drop the spanning tree cached by comparison_algorithms.cached_spanning_tree
+        self.spanning_tree = None
+        if self.lazy:
+            self.matrix_graph = LazyDistanceMatrix(self.city_coordinates, self.edge_weight_type)
+            return
+        matrix_graph = self.editableMatrix(self.num_of_cities)
+        if len(cities):
+            weights = edge_weights(self.city_coordinates[cities], self.city_coordinates, self.edge_weight_type)
+            weights[np.arange(len(cities)), cities] = 0
+            matrix_graph[cities, :self.num_of_cities] = weights
+            matrix_graph[:self.num_of_cities, cities] = weights.T
+        self.matrix_graph = matrix_graph[:self.num_of_cities, :self.num_of_cities]
+
     def loadTSPProblem(self, tsp_problem):
-        """Load a TSPLIB95 problem and convert it to city coordinates and distance matrix."""
+        """Load a TSPLIB95 problem and convert it to city coordinates and distance matrix.
+
+        Coordinate based problems (EUC_2D, CEIL_2D, GEO, ATT) are built vectorized from the
+        coordinates, any other edge weight type falls back to tsplib95's get_weight.
+        """
         nodes = list(tsp_problem.get_nodes())
         size = len(nodes)
         city_coordinates = [tsp_problem.node_coords[node] for node in nodes]
-        matrix_graph = [[0] * size for _ in range(size)]
+        self.edge_weight_type = tsp_problem.edge_weight_type
 
+        if self.edge_weight_type in SUPPORTED_EDGE_WEIGHT_TYPES and getattr(self, 'lazy', False):
+            return city_coordinates, LazyDistanceMatrix(city_coordinates, self.edge_weight_type)
+        if self.edge_weight_type in SUPPORTED_EDGE_WEIGHT_TYPES:
+            return city_coordinates, build_distance_matrix(city_coordinates, self.edge_weight_type)
+
+        matrix_graph = np.zeros((size, size), dtype=np.float64)
         for i in range(size):
             for j in range(size):
                 if i != j:
-                    matrix_graph[i][j] = tsp_problem.get_weight(nodes[i], nodes[j])
+                    matrix_graph[i, j] = tsp_problem.get_weight(nodes[i], nodes[j])
 
         return city_coordinates, matrix_graph
     
+    def loadCachedProblem(self, file_path, cache_directory=CACHE_DIRECTORY):
+        """Load a TSPLIB .tsp file or a Files/graph_*.json coordinate list through the binary problem cache.
+
+        The first load parses the file, builds the distance matrix and writes both to a cache file keyed by the
+        hash of the source. Later loads map that file zero-copy, so they skip tsplib95 and the matrix build, and
+        processes opening the same problem share its pages through the OS cache. In lazy mode only the
+        coordinates are cached and the distances are computed on demand.
+
+        returns:
+            tuple: The (read-only) city coordinates and distance matrix
+        """
+        digest = source_hash(file_path)
+        path = cache_path(file_path, digest, cache_directory)
+        lazy = getattr(self, 'lazy', False)
+        cached = read_problem_cache(path, digest, require_matrix=not lazy)
+
+        if cached is None:
+            if file_path.endswith('.json'):
+                self.edge_weight_type = None
+                with open(file_path, "r") as json_file:
+                    city_coordinates = json.load(json_file)
+                matrix_graph = None if lazy else build_distance_matrix(city_coordinates)
+            else:
+                import tsplib95
+                city_coordinates, matrix_graph = self.loadTSPProblem(tsplib95.load(file_path))
+            write_problem_cache(path, city_coordinates, None if isinstance(matrix_graph, LazyDistanceMatrix) else matrix_graph, digest, self.edge_weight_type)
+            cached = read_problem_cache(path, digest)
+
+        city_coordinates, matrix_graph, self.edge_weight_type = cached
+        if lazy and (self.edge_weight_type is None or self.edge_weight_type in SUPPORTED_EDGE_WEIGHT_TYPES):
+            matrix_graph = LazyDistanceMatrix(city_coordinates, self.edge_weight_type)
+        return city_coordinates, matrix_graph
+
     def generateCityCoordinates(self, num_of_cities: int):
         """Generate random city coordinates."""
         return [(random.randint(0, 1000), random.randint(0, 1000)) for _ in range(num_of_cities)]
@@ -54,28 +230,20 @@ class Graph:
         Generates a graph with a specified number of cities, including their coordinates and distance matrix.
 
         Returns:
-            list: A 2D list (matrix) representing the distances between each pair of cities.
+            np.ndarray: A (n, n) float64 matrix representing the distances between each pair of cities (a LazyDistanceMatrix in lazy mode).
         """
-        matrix_graph = [[0] * self.num_of_cities for _ in range(self.num_of_cities)]
-
-        def distance(city1, city2):
-            return math.sqrt((city1[0] - city2[0])**2 + (city1[1] - city2[1])**2)
-
-        for i in range(self.num_of_cities):
-            for j in range(i + 1, self.num_of_cities):
-                dist = distance(self.city_coordinates[i], self.city_coordinates[j])
-                matrix_graph[i][j] = dist
-                matrix_graph[j][i] = dist
-
-        return matrix_graph
+        if self.lazy:
+            return LazyDistanceMatrix(self.city_coordinates[:self.num_of_cities])
+        return build_distance_matrix(self.city_coordinates[:self.num_of_cities])
 
     def create_tsplib_problem(self):
+        import tsplib95
         problem = tsplib95.models.StandardProblem()
         problem.dimension = self.num_of_cities
         problem.node_coords = {i + 1: coord for i, coord in enumerate(self.city_coordinates)}
         return problem
     
-    def generateGraphBySize(self,input_size):
+    def graphFileBySize(self, input_size):
         graph_sizes = {
             10      : graph_size_10,
             50      : graph_size_50,
@@ -83,70 +251,54 @@ class Graph:
             500     : graph_size_500,
             1000    : graph_size_1000
         }
-        file_path = graph_sizes.get(input_size,graph_size_10)
+        return graph_sizes.get(input_size,graph_size_10)
+
+    def generateGraphBySize(self,input_size):
+        file_path = self.graphFileBySize(input_size)
         with open(file_path,"r") as json_file:
             graph = json.load(json_file)
         return graph
     
-    def setupLogging(self):
-        """ Set up logging to a file named logs/{now}.log
-            filename: The filename to log to
-            
-            format: The format to log with
+    def setupLogging(self, filename=None, level=logging.INFO):
+        """ Set up logging to a file named logs/{now}.log, once per run
+            filename: The filename to log to, by default the file of the process that set up logging first
+                      (inherited through the TSP_LOG_FILE environment variable) or a new timestamped file
 
-            filemode: The file mode to open the file with (default is 'w')
+            level: The root logger level (default is logging.INFO, DEBUG adds the per-edge GA logging)
 
-            level: The root logger level (default is logging.WARNING)  
+            Calling it again, or in a worker process of a run that already logs, reuses the same file instead of opening a new one.
         """
+        if logging.getLogger().handlers:
+            return
+        inherited = filename is None and LOG_FILE_VARIABLE in os.environ
+        filename = filename or os.environ.get(LOG_FILE_VARIABLE) or os.path.join("logs", datetime.now().strftime("%Y-%m-%d %H.%M.%S") + ".log")
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        os.environ[LOG_FILE_VARIABLE] = filename
         logging.basicConfig(
-            filename="logs/" + datetime.now().strftime("%Y-%m-%d %H.%M.%S") + ".log",
+            filename=filename,
             format="%(asctime)s - %(message)s",
-            filemode="w",
-            level=logging.DEBUG
+            filemode="a" if inherited else "w",
+            level=level
         )
         logging.getLogger('matplotlib.font_manager').setLevel(logging.WARNING)
         logging.getLogger('matplotlib.pyplot').setLevel(logging.WARNING)
         logging.getLogger('PIL').setLevel(logging.WARNING)
 
     def logDistanceMatrix(self):
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        from tabulate import tabulate
         headers = [''] + [str(i + 1) for i in range(len(self.matrix_graph))]
         rows = [[f"{str(i + 1)}"] + [f"{self.matrix_graph[i][j]:6.0f}" for j in range(len(self.matrix_graph))] for i in range(len(self.matrix_graph))]
         logging.info("Distance Matrix (matrix_graph):")
         logging.info(tabulate(rows, headers=headers, tablefmt='grid'))
 
-    def plotCities(self):
+    def plotCities(self, file_path='city_weighted_graph.png', show=True):
         """
-        Plots the cities and the weighted edges between them in a 2D graph.
+        Plots the cities and the weighted edges between them in a 2D graph and saves it as an image file.
 
-        This method generates a scatter plot of cities with random coordinates and 
-        draws lines between each pair of cities to represent the distances (weights) 
-        between them. The plot is saved as an image file.
+        Small graphs show every edge, larger ones the nearest neighbor edges of every city, and only a spread out
+        subset of the labels is drawn (see utils/renderer.py).
         """
-        x_coords = [coord[0] for coord in self.city_coordinates]
-        y_coords = [coord[1] for coord in self.city_coordinates]
-
-        plt.figure(figsize=(8, 8))
-        plt.scatter(x_coords, y_coords, color='red', zorder=5)
-
-        for i, (x, y) in enumerate(self.city_coordinates):
-            city_label = str(i)
-            plt.text(x, y, city_label, fontsize=16, zorder=10)
-
-        for i in range(self.num_of_cities):
-            for j in range(i + 1, self.num_of_cities):
-                city1 = self.city_coordinates[i]
-                city2 = self.city_coordinates[j]
-                dist = self.matrix_graph[i][j]
-                plt.plot([city1[0], city2[0]], [city1[1], city2[1]], 'gray', linestyle='-', zorder=1)
-                mid_x = (city1[0] + city2[0]) / 2
-                mid_y = (city1[1] + city2[1]) / 2
-                plt.text(mid_x, mid_y, f'{dist:.0f}', color='black', fontsize=8, zorder=10)
-
-        plt.xlim(0, 1000)
-        plt.ylim(0, 1000)
-        plt.title("Random City Locations with Weighted Edges")
-        plt.xlabel("X Coordinate")
-        plt.ylabel("Y Coordinate")
-        plt.grid(True)
-        plt.savefig('city_weighted_graph.png')
-        plt.show()
+        from utils.renderer import render_graph
+        render_graph(self.city_coordinates, self.matrix_graph, "Random City Locations with Weighted Edges", file_path, show)
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from utils.distance_matrix import paired_edge_weights, build_distance_matrix, EARTH_RADIUS, SUPPORTED_EDGE_WEIGHT_TYPES
+import numpy as np
+import math
+
+# Default number of distance rows kept by the LRU cache
+CACHED_ROWS = 256
+
+def _scalar_weight(x1, y1, x2, y2, edge_weight_type):
+    """Single edge weight with plain floats, same formulas and rounding as paired_edge_weights."""
+    if edge_weight_type == 'GEO':
+        latitude1, longitude1 = (math.radians(math.trunc(v) + (v - math.trunc(v)) * 5.0 / 3.0) for v in (x1, y1))
+        latitude2, longitude2 = (math.radians(math.trunc(v) + (v - math.trunc(v)) * 5.0 / 3.0) for v in (x2, y2))
+        q1 = math.cos(longitude1 - longitude2)
+        q2 = math.cos(latitude1 - latitude2)
+        q3 = math.cos(latitude1 + latitude2)
+        return int(EARTH_RADIUS * math.acos(min(max(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0), 1.0)) + 1.0)
+
+    dx, dy = x1 - x2, y1 - y2
+    distance = math.sqrt(dx * dx + dy * dy)
+    if edge_weight_type is None:
+        return distance
+    if edge_weight_type == 'EUC_2D':
+        return int(distance + 0.5)
+    if edge_weight_type == 'CEIL_2D':
+        return math.ceil(distance)
+    value = math.sqrt(distance ** 2 / 10.0)
+    rounded = int(value + 0.5)
+    return rounded + (rounded < value)
+
+class LazyDistanceMatrix:
+    """Distance matrix computed on demand from the city coordinates, memory is O(n) instead of O(n^2).
+
+    Supports the indexing the rest of the code uses on a dense matrix_graph:
+        len(matrix), matrix.shape, matrix.dtype
+        matrix[i]               the full distance row of city i (kept in a bounded LRU cache of hot rows)
+        matrix[i][j]            a single weight through the cached row
+        matrix[cities, others]  elementwise weights for broadcastable index arrays, e.g. matrix[path, np.roll(path, -1)]
+        matrix[i, j]            a single weight as a NumPy scalar
+    Slices in a (rows, columns) key select whole rows or columns like NumPy basic indexing.
+    np.asarray(matrix) and matrix.tolist() build the dense matrix, which is only sensible for small problems.
+    """
+    def __init__(self, city_coordinates, edge_weight_type=None, cached_rows=CACHED_ROWS):
+        if edge_weight_type is not None and edge_weight_type not in SUPPORTED_EDGE_WEIGHT_TYPES:
+            raise ValueError(f"Unsupported edge weight type: {edge_weight_type}")
+        self.city_coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+        self.edge_weight_type = edge_weight_type
+        self.num_of_cities = len(self.city_coordinates)
+        self.shape = (self.num_of_cities, self.num_of_cities)
+        self.ndim = 2
+        self.dtype = np.dtype(np.float64 if edge_weight_type is None else np.int32)
+        self.cached_rows = cached_rows
+        self.rows = OrderedDict()
+        self.xs = self.city_coordinates[:, 0].tolist()
+        self.ys = self.city_coordinates[:, 1].tolist()
+
+    def __len__(self):
+        return self.num_of_cities
+
+    def __getstate__(self):
+        # The row cache is rebuilt on demand, no need to pickle it into worker processes
+        state = self.__dict__.copy()
+        state['rows'] = OrderedDict()
+        return state
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.weights(*key)
+        if isinstance(key, slice) or np.ndim(key) > 0:
+            return self.weights(key, slice(None))
+        return self.row(int(key))
+
+    def row(self, city):
+        """The (read-only) distance row of a city, served from the LRU cache when it is hot."""
+        if city < 0:
+            city += self.num_of_cities
+        row = self.rows.get(city)
+        if row is not None:
+            self.rows.move_to_end(city)
+            return row
+
+        row = paired_edge_weights(self.city_coordinates[city], self.city_coordinates, self.edge_weight_type)
+        row[city] = 0
+        row.flags.writeable = False
+        if self.cached_rows > 0:
+            self.rows[city] = row
+            if len(self.rows) > self.cached_rows:
+                self.rows.popitem(last=False)
+        return row
+
+    def weights(self, rows, columns):
+        """Weights between the 'rows' and 'columns' cities, broadcast like NumPy advanced indexing."""
+        outer = isinstance(rows, slice) or isinstance(columns, slice)
+        rows = np.arange(self.num_of_cities)[rows] if isinstance(rows, slice) else np.asarray(rows, dtype=np.intp)
+        columns = np.arange(self.num_of_cities)[columns] if isinstance(columns, slice) else np.asarray(columns, dtype=np.intp)
+        if outer and rows.ndim and columns.ndim:
+            rows = rows[:, None]
+
+        weights = paired_edge_weights(self.city_coordinates[rows], self.city_coordinates[columns], self.edge_weight_type)
+        # Distances of a city to itself are 0, GEO would otherwise report 1
+        return np.where(rows == columns, weights.dtype.type(0), weights)[()]
+
+    def weight(self, a, b):
+        """A single weight as a plain Python number, the fast path for the local search operators."""
+        if a == b:
+            return 0
+        return _scalar_weight(self.xs[a], self.ys[a], self.xs[b], self.ys[b], self.edge_weight_type)
+
+    def weightTable(self):
+        """A weights[a][b] lookup table for the local search operators that computes every weight on demand."""
+        return _WeightTable(self)
+
+    def toarray(self):
+        """Build the dense (n, n) matrix."""
+        return build_distance_matrix(self.city_coordinates, self.edge_weight_type)
+
+    def tolist(self):
+        return self.toarray().tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        matrix_graph = self.toarray()
+        return matrix_graph if dtype is None else matrix_graph.astype(dtype, copy=False)
+
+class _WeightTable:
+    """weights[a][b] view of a LazyDistanceMatrix, each weight is computed with plain floats when it is looked up."""
+    def __init__(self, matrix_graph):
+        self.matrix_graph = matrix_graph
+
+    def __len__(self):
+        return len(self.matrix_graph)
+
+    def __getitem__(self, a):
+        return _WeightRow(self.matrix_graph, a)
+
+class _WeightRow:
+    __slots__ = ('matrix_graph', 'a')
+
+    def __init__(self, matrix_graph, a):
+        self.matrix_graph = matrix_graph
+        self.a = a
+
+    def __getitem__(self, b):
+        return self.matrix_graph.weight(self.a, b)
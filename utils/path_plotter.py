@@ -1,40 +1,18 @@
-import matplotlib.pyplot as plt
-
-def plot_path(graph, path, title, showPlottedPath):
+def plot_path(graph, path, title, showPlottedPath, file_path=None):
     """
     Plots the given path on a 2D plane and annotates the edges with their weights.
 
     This method generates a plot of the cities and the path taken by the TSP algorithm.
-    It draws lines between each pair of cities in the path and annotates the edges with
-    their respective weights (distances).
+    The tour is drawn as one line collection, and only a spread out subset of the cities and edges
+    are labelled with their index and weight, so that large tours stay readable (see utils/renderer.py).
 
     Parameters:
     graph (Graph): The graph object containing city coordinates and distance matrix.
     path (list): The list of city indices representing the path.
     title (str): The title of the plot.
+    showPlottedPath (bool): Show the plot in a window.
+    file_path (str): Save the plot to this image file.
     """
-    x_coords = [graph.city_coordinates[city][0] for city in path]
-    y_coords = [graph.city_coordinates[city][1] for city in path]
-
-    plt.figure(figsize=(8, 8))
-    plt.plot(x_coords, y_coords, marker='o', linestyle='-', color='b', zorder=5)
-
-    for i, city in enumerate(path):
-        plt.text(graph.city_coordinates[city][0], graph.city_coordinates[city][1], str(city), fontsize=12, ha='right', zorder=10)
-
-    for i in range(len(path) - 1):
-        city1 = path[i]
-        city2 = path[i + 1]
-        mid_x = (graph.city_coordinates[city1][0] + graph.city_coordinates[city2][0]) / 2
-        mid_y = (graph.city_coordinates[city1][1] + graph.city_coordinates[city2][1]) / 2
-        dist = graph.matrix_graph[city1][city2]
-        plt.text(mid_x, mid_y, f'{dist:.0f}', color='black', fontsize=8, ha='center', zorder=10)
-
-    plt.xlim(0, 1000)
-    plt.ylim(0, 1000)
-    plt.title(title)
-    plt.xlabel("X Coordinate")
-    plt.ylabel("Y Coordinate")
-    plt.grid(True)
-    if showPlottedPath:
-        plt.show()
+    # Imported here so that solver-only processes never load matplotlib
+    from utils.renderer import render_tour
+    render_tour(graph.city_coordinates, path, title, graph.matrix_graph, file_path, showPlottedPath)
@@ -0,0 +1,105 @@
+import numpy as np
+import hashlib
+import struct
+import json
+import os
+
+# Bumped whenever the layout below changes, older cache files are then rebuilt
+CACHE_VERSION = 1
+
+CACHE_DIRECTORY = "Files//cache"
+
+MAGIC = b"TSPCACHE"
+
+# Arrays start on multiples of this many bytes
+ALIGNMENT = 64
+
+# Cache file layout:
+#     MAGIC | uint32 header length | JSON header | padding | coordinates | padding | distance matrix (optional)
+# The JSON header records the cache version, the SHA-256 of the source file, the edge weight type and the
+# offset, dtype and shape of every array, which are then opened with np.memmap without copying.
+
+def source_hash(file_path):
+    """SHA-256 hex digest of a problem file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_path(file_path, digest, cache_directory=CACHE_DIRECTORY):
+    """Cache file of a problem file, named after the source and the start of its hash."""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_directory, f"{name}-{digest[:16]}.tspcache")
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_problem_cache(path, city_coordinates, matrix_graph, digest, edge_weight_type):
+    """Write coordinates and (optionally, None to skip it) the distance matrix to a cache file.
+
+    The file is written next to its final path and renamed into place, so readers never see a partial file.
+    """
+    arrays = {'coordinates': np.ascontiguousarray(city_coordinates, dtype=np.float64).reshape(-1, 2)}
+    if matrix_graph is not None:
+        arrays['matrix_graph'] = np.ascontiguousarray(matrix_graph)
+
+    # The offsets depend on the header length and the other way around, lay out again until they agree
+    header = {'version': CACHE_VERSION, 'source_hash': digest, 'edge_weight_type': edge_weight_type, 'arrays': {}}
+    encoded_header = b""
+    while True:
+        offset = _aligned(len(MAGIC) + 4 + len(encoded_header))
+        for name, array in arrays.items():
+            header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset = _aligned(offset + array.nbytes)
+        layout = json.dumps(header).encode()
+        if layout == encoded_header:
+            break
+        encoded_header = layout
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as cache_file:
+        cache_file.write(MAGIC + struct.pack("<I", len(encoded_header)) + encoded_header)
+        for name, array in arrays.items():
+            cache_file.seek(header['arrays'][name]['offset'])
+            cache_file.write(array.tobytes())
+        cache_file.truncate(offset)
+    os.replace(temporary_path, path)
+
+def read_problem_cache(path, digest=None, require_matrix=False):
+    """Open a cache file zero-copy.
+
+    args:
+        path: The cache file
+        digest: The expected source hash, a cache of another version of the source is treated as missing
+        require_matrix: Treat a cache without a distance matrix as missing
+    returns:
+        tuple: The read-only memory-mapped coordinates, distance matrix (None if it was not stored) and the edge weight type,
+               or None if the file is missing, stale or was written by another cache version
+    """
+    try:
+        with open(path, "rb") as cache_file:
+            prefix = cache_file.read(len(MAGIC) + 4)
+            if len(prefix) < len(MAGIC) + 4 or prefix[:len(MAGIC)] != MAGIC:
+                return None
+            header = json.loads(cache_file.read(struct.unpack("<I", prefix[len(MAGIC):])[0]))
+    except (OSError, ValueError):
+        return None
+
+    if header.get('version') != CACHE_VERSION or (digest is not None and header.get('source_hash') != digest):
+        return None
+    if require_matrix and 'matrix_graph' not in header['arrays']:
+        return None
+
+    def open_array(name):
+        layout = header['arrays'].get(name)
+        if layout is None:
+            return None
+        shape = tuple(layout['shape'])
+        # np.memmap cannot map zero bytes
+        if not np.prod(shape):
+            return np.empty(shape, dtype=np.dtype(layout['dtype']))
+        return np.memmap(path, mode='r', dtype=np.dtype(layout['dtype']), offset=layout['offset'], shape=shape)
+
+    return open_array('coordinates'), open_array('matrix_graph'), header['edge_weight_type']
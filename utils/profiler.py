@@ -0,0 +1,63 @@
+from utils.telemetry import OPERATORS
+import numpy as np
+import csv
+import os
+
+class OperatorProfiler:
+    """Per-generation time (perf_counter_ns) and call counts of the operators of the GA main loop.
+
+    Pass one to evolveGenerations to switch it on for that run, the loop then reports every generation with
+    recordGeneration. The calls counted per operator are:
+        selection:   tournaments run
+        crossover:   parent pairs recombined
+        mutation:    offspring passed to the (guided) mutation, and 'mutated' of them actually changed by it
+        evaluation:  tours scored
+        replacement: tours ranked by the survivor sort
+    """
+    def __init__(self):
+        self.generations = []
+        self.durations = []
+        self.calls = []
+        self.mutated = []
+
+    def recordGeneration(self, generation, durations_ns, calls, mutated):
+        self.generations.append(generation)
+        self.durations.append(durations_ns)
+        self.calls.append(calls)
+        self.mutated.append(mutated)
+
+    def breakdown(self):
+        """Per-generation breakdown as a structured array with a <operator>_ns and <operator>_calls field per operator."""
+        fields = [('generation', np.int64)] + [(f'{operator}_ns', np.int64) for operator in OPERATORS] \
+                 + [(f'{operator}_calls', np.int64) for operator in OPERATORS] + [('mutated', np.int64)]
+        breakdown = np.zeros(len(self.generations), dtype=fields)
+        breakdown['generation'] = self.generations
+        durations = np.array(self.durations, dtype=np.int64).reshape(-1, len(OPERATORS))
+        calls = np.array(self.calls, dtype=np.int64).reshape(-1, len(OPERATORS))
+        for i, operator in enumerate(OPERATORS):
+            breakdown[f'{operator}_ns'] = durations[:, i]
+            breakdown[f'{operator}_calls'] = calls[:, i]
+        breakdown['mutated'] = self.mutated
+        return breakdown
+
+    def writeBreakdown(self, file_path):
+        """Write the per-generation breakdown to a CSV file."""
+        breakdown = self.breakdown()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(breakdown.dtype.names)
+            writer.writerows(breakdown.tolist())
+
+    def summary(self):
+        """Totals over the run, one line per operator with its calls, total and per-generation time and share of the loop."""
+        breakdown = self.breakdown()
+        loop_ns = sum(breakdown[f'{operator}_ns'].sum() for operator in OPERATORS) or 1
+        num_of_generations = max(len(breakdown), 1)
+        lines = [f"{'operator':<12} {'calls':>10} {'total ms':>10} {'ms/gen':>9} {'share':>7}"]
+        for operator in OPERATORS:
+            total_ns = breakdown[f'{operator}_ns'].sum()
+            lines.append(f"{operator:<12} {breakdown[f'{operator}_calls'].sum():>10} {total_ns / 1e6:>10.2f} "
+                         f"{total_ns / 1e6 / num_of_generations:>9.3f} {100 * total_ns / loop_ns:>6.1f}%")
+        lines.append(f"{len(breakdown)} generations, {loop_ns / 1e6:.2f} ms in the main loop, {int(breakdown['mutated'].sum())} offspring changed by mutation")
+        return "\n".join(lines)
@@ -0,0 +1,261 @@
+"""Batched, headless rendering of cities and tours.
+
+Every edge set is one LineCollection and every point set one scatter, so drawing stays fast for thousands of cities,
+and only a spread-out subset of the labels is drawn (level of detail). Figures are built with the object oriented
+matplotlib API on the Agg canvas, without pyplot, so rendering works without a display and in worker processes.
+
+TourRenderer draws on a background process, it records the best tour of every GA generation (see the 'renderer'
+argument of evolveGenerations) and writes an image strip and an animation of them at the end.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import os
+
+# At most this many city and edge labels are drawn, spread over the plot
+LABEL_LIMIT = 60
+
+# Above this many cities plotCities draws each city's nearest neighbor edges instead of the complete graph
+COMPLETE_GRAPH_MAX_CITIES = 200
+GRAPH_NEIGHBORS = 5
+
+# The image strip shows at most this many frames, evenly spread over the recorded ones
+MAX_STRIP_FRAMES = 24
+
+# Frames waiting for the render process, further frames are dropped instead of stalling the solver
+MAX_PENDING_FRAMES = 8
+
+FIGURE_SIZE = (8, 8)
+DPI = 100
+
+def thin_labels(points, limit=LABEL_LIMIT):
+    """Pick at most about 'limit' points spread over the plane: one per cell of a grid of about 'limit' cells.
+
+    returns:
+        np.ndarray: The indices of the kept points
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) <= limit:
+        return np.arange(len(points))
+    side = max(1, int(np.sqrt(limit)))
+    lower = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lower, 1e-9)
+    cells = np.minimum(((points - lower) / extent * side).astype(np.intp), side - 1)
+    _, first = np.unique(cells[:, 1] * side + cells[:, 0], return_index=True)
+    return np.sort(first)
+
+def new_figure(figure_size=FIGURE_SIZE, interactive=False):
+    """A Figure on the Agg canvas and its axes, without touching pyplot's global state. Interactive figures are
+    created through pyplot instead, so that plt.show() can open them in a window."""
+    if interactive:
+        import matplotlib.pyplot as plt
+        figure = plt.figure(figsize=figure_size, dpi=DPI)
+        return figure, figure.add_subplot()
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=figure_size, dpi=DPI)
+    FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+def draw_edges(axes, city_coordinates, first, second, weights=None, color='gray', linewidth=0.5, label_limit=LABEL_LIMIT):
+    """Draw the edges first[i] - second[i] as one LineCollection, labelling a thinned subset with their weights."""
+    from matplotlib.collections import LineCollection
+    coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    segments = np.stack([coordinates[first], coordinates[second]], axis=1)
+    collection = LineCollection(segments, colors=color, linewidths=linewidth, zorder=1)
+    axes.add_collection(collection)
+    if weights is not None and label_limit:
+        midpoints = segments.mean(axis=1)
+        for index in thin_labels(midpoints, label_limit).tolist():
+            axes.text(midpoints[index, 0], midpoints[index, 1], f'{weights[index]:.0f}', color='black', fontsize=8, ha='center', zorder=10)
+    return collection
+
+def draw_cities(axes, city_coordinates, color='red', label_limit=LABEL_LIMIT, size=None):
+    """Draw the cities as one scatter, labelling a thinned subset with their index."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    size = size or max(2, min(40, 4000 / max(len(coordinates), 1)))
+    points = axes.scatter(coordinates[:, 0], coordinates[:, 1], s=size, color=color, zorder=5)
+    if label_limit:
+        for city in thin_labels(coordinates, label_limit).tolist():
+            axes.text(coordinates[city, 0], coordinates[city, 1], str(city), fontsize=10, ha='right', zorder=10)
+    return points
+
+def tour_edge_arrays(path):
+    """The (from, to) arrays of a tour's edges, closing it when the start city is not repeated at the end."""
+    path = np.asarray(path, dtype=np.intp)
+    if len(path) > 1 and path[0] != path[-1]:
+        path = np.append(path, path[0])
+    return path[:-1], path[1:]
+
+def finish_axes(axes, city_coordinates, title):
+    coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    lower, upper = coordinates.min(axis=0), coordinates.max(axis=0)
+    margin = np.maximum((upper - lower) * 0.03, 1.0)
+    axes.set_xlim(lower[0] - margin[0], upper[0] + margin[0])
+    axes.set_ylim(lower[1] - margin[1], upper[1] + margin[1])
+    axes.set_title(title)
+    axes.set_xlabel("X Coordinate")
+    axes.set_ylabel("Y Coordinate")
+    axes.grid(True)
+
+def save_figure(figure, file_path):
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    figure.savefig(file_path)
+
+def show_figure():
+    import matplotlib.pyplot as plt
+    plt.show()
+
+def render_graph(city_coordinates, matrix_graph=None, title="Cities", file_path=None, show=False, label_limit=LABEL_LIMIT):
+    """Render the cities with the complete graph (up to COMPLETE_GRAPH_MAX_CITIES) or their nearest neighbor edges."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    num_of_cities = len(coordinates)
+    figure, axes = new_figure(interactive=show)
+    if num_of_cities <= COMPLETE_GRAPH_MAX_CITIES:
+        first, second = np.triu_indices(num_of_cities, k=1)
+    else:
+        from utils.spatial_index import candidate_lists
+        neighbors = candidate_lists(coordinates, GRAPH_NEIGHBORS)
+        first, second = np.repeat(np.arange(num_of_cities), neighbors.shape[1]), neighbors.ravel()
+    weights = None if matrix_graph is None else np.asarray(matrix_graph[first, second])
+    draw_edges(axes, coordinates, first, second, weights, label_limit=label_limit)
+    draw_cities(axes, coordinates, label_limit=label_limit)
+    finish_axes(axes, coordinates, title)
+    if file_path:
+        save_figure(figure, file_path)
+    if show:
+        show_figure()
+    return figure
+
+def render_tour(city_coordinates, path, title="Tour", matrix_graph=None, file_path=None, show=False, label_limit=LABEL_LIMIT):
+    """Render a tour as one LineCollection over the cities."""
+    coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    figure, axes = new_figure(interactive=show)
+    first, second = tour_edge_arrays(path)
+    weights = None if matrix_graph is None else np.asarray(matrix_graph[first, second])
+    draw_edges(axes, coordinates, first, second, weights, color='b', linewidth=1.0, label_limit=label_limit)
+    draw_cities(axes, coordinates, color='b', label_limit=label_limit)
+    finish_axes(axes, coordinates, title)
+    if file_path:
+        save_figure(figure, file_path)
+    if show:
+        show_figure()
+    return figure
+
+# Render process state, set once by _initRenderWorker
+_coordinates = None
+_frames = []
+
+def _initRenderWorker(city_coordinates):
+    global _coordinates
+    import matplotlib
+    matplotlib.use("Agg")
+    _coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+    _frames.clear()
+
+def _addFrame(generation, path, cost, file_path):
+    _frames.append((generation, path, cost))
+    if file_path:
+        render_tour(_coordinates, path, f"Generation {generation}: {cost:.0f}", file_path=file_path, label_limit=0)
+
+def _writeStrip(file_path, columns):
+    """The frames as a grid of small tour plots in one image."""
+    if not _frames:
+        return
+    from matplotlib.collections import LineCollection
+    frames = [_frames[index] for index in np.unique(np.linspace(0, len(_frames) - 1, MAX_STRIP_FRAMES).round().astype(np.intp))]
+    columns = min(columns, len(frames))
+    rows = -(-len(frames) // columns)
+    figure, _ = new_figure((3 * columns, 3 * rows))
+    figure.clear()
+    for index, (generation, path, cost) in enumerate(frames):
+        axes = figure.add_subplot(rows, columns, index + 1)
+        first, second = tour_edge_arrays(path)
+        axes.add_collection(LineCollection(np.stack([_coordinates[first], _coordinates[second]], axis=1), colors='b', linewidths=0.5))
+        axes.autoscale()
+        axes.set_title(f"{generation}: {cost:.0f}", fontsize=8)
+        axes.set_xticks([])
+        axes.set_yticks([])
+    figure.tight_layout()
+    save_figure(figure, file_path)
+
+def _writeAnimation(file_path, fps):
+    """All frames as an animation (GIF with Pillow, other formats with the writers matplotlib finds for them)."""
+    if not _frames:
+        return
+    from matplotlib.animation import FuncAnimation
+    figure, axes = new_figure()
+    draw_cities(axes, _coordinates, color='b', label_limit=0)
+    first, second = tour_edge_arrays(_frames[0][1])
+    collection = draw_edges(axes, _coordinates, first, second, color='b', linewidth=1.0, label_limit=0)
+    finish_axes(axes, _coordinates, "")
+
+    def update(frame):
+        generation, path, cost = _frames[frame]
+        first, second = tour_edge_arrays(path)
+        collection.set_segments(np.stack([_coordinates[first], _coordinates[second]], axis=1))
+        axes.set_title(f"Generation {generation}: {cost:.0f}")
+        return collection,
+
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    animation = FuncAnimation(figure, update, frames=len(_frames), blit=False)
+    animation.save(file_path, writer='pillow' if file_path.endswith('.gif') else None, fps=fps)
+
+class TourRenderer:
+    """Collects the best tour of GA generations on a background render process.
+
+    The solver only hands over a copy of the best tour when it improved (and at most every 'interval' generations),
+    the drawing happens in the render process. When MAX_PENDING_FRAMES frames are still waiting, new ones are
+    dropped instead of blocking, the last best tour is always added on close().
+    """
+    def __init__(self, city_coordinates, directory=None, interval=1, frame_images=False, strip_columns=6, fps=4):
+        """
+        directory: Where close() writes tours.png (image strip) and tours.gif (animation), and frame_images the per-frame PNGs
+        interval: Record at most one frame every this many generations
+        """
+        self.directory = directory
+        self.interval = interval
+        self.frame_images = frame_images
+        self.strip_columns = strip_columns
+        self.fps = fps
+        self.best_cost = np.inf
+        self.last_generation = None
+        self.unsent = None
+        self.pending = []
+        self.dropped = 0
+        self.executor = ProcessPoolExecutor(max_workers=1, initializer=_initRenderWorker, initargs=(np.asarray(city_coordinates, dtype=np.float64),))
+
+    def recordGeneration(self, generation, best_path, best_cost):
+        best_cost = float(best_cost)
+        if best_cost >= self.best_cost:
+            return
+        self.best_cost = best_cost
+        frame = (generation, np.array(best_path, dtype=np.int32), best_cost)
+        if self.last_generation is not None and generation - self.last_generation < self.interval:
+            self.unsent = frame
+            return
+        self.submitFrame(frame)
+
+    def submitFrame(self, frame):
+        self.pending = [future for future in self.pending if not future.done()]
+        if len(self.pending) >= MAX_PENDING_FRAMES:
+            self.dropped += 1
+            self.unsent = frame
+            return
+        generation, path, cost = frame
+        file_path = os.path.join(self.directory, f"generation_{generation:05d}.png") if self.frame_images and self.directory else None
+        self.pending.append(self.executor.submit(_addFrame, generation, path, cost, file_path))
+        self.last_generation = generation
+        self.unsent = None
+
+    def close(self, strip=True, animation=True):
+        """Add the last best tour, write the image strip and the animation, and stop the render process."""
+        if self.unsent is not None:
+            self.pending = []
+            self.submitFrame(self.unsent)
+        try:
+            if self.directory and strip:
+                self.executor.submit(_writeStrip, os.path.join(self.directory, "tours.png"), self.strip_columns).result()
+            if self.directory and animation:
+                self.executor.submit(_writeAnimation, os.path.join(self.directory, "tours.gif"), self.fps).result()
+        finally:
+            self.executor.shutdown()
@@ -0,0 +1,30 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+def share_matrix(matrix_graph):
+    """Copy a distance matrix into a new shared memory block so worker processes can map it instead of unpickling it.
+
+    args:
+        matrix_graph: The (n, n) distance matrix
+    returns:
+        tuple: The SharedMemory block (the caller closes and unlinks it) and a picklable descriptor for attach_matrix
+    """
+    matrix_graph = np.ascontiguousarray(matrix_graph)
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix_graph.nbytes, 1))
+    shared = np.ndarray(matrix_graph.shape, dtype=matrix_graph.dtype, buffer=shm.buf)
+    shared[:] = matrix_graph
+    return shm, (shm.name, matrix_graph.shape, matrix_graph.dtype.str)
+
+def attach_matrix(descriptor):
+    """Map a matrix shared with share_matrix into this process without copying it.
+
+    args:
+        descriptor: The descriptor returned by share_matrix
+    returns:
+        tuple: The SharedMemory block (keep a reference while the array is in use) and the read-only matrix
+    """
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    matrix_graph = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    matrix_graph.flags.writeable = False
+    return shm, matrix_graph
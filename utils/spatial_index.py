@@ -0,0 +1,168 @@
+from itertools import count
+import numpy as np
+
+# Average number of cities per grid cell
+CITIES_PER_CELL = 2
+
+# Side length, in cells, of the tiles processed together when building k-nearest lists
+TILE_SIZE = 8
+
+class SpatialGrid:
+    """Grid bucket spatial index over city coordinates.
+
+    Answers 'nearest remaining city' queries by scanning rings of cells around the query point, and builds
+    k-nearest candidate lists one tile of cells at a time. Distances are planar Euclidean on the raw coordinates,
+    which orders neighbors exactly for EUC_2D, CEIL_2D and ATT problems (up to rounding ties) and
+    approximately for GEO problems.
+    """
+    def __init__(self, city_coordinates, cities_per_cell=CITIES_PER_CELL):
+        self.coordinates = np.asarray(city_coordinates, dtype=np.float64).reshape(-1, 2)
+        self.num_of_cities = len(self.coordinates)
+
+        lower = self.coordinates.min(axis=0) if self.num_of_cities else np.zeros(2)
+        extent = np.maximum(self.coordinates.max(axis=0) - lower, 1e-9) if self.num_of_cities else np.ones(2)
+        num_of_cells = max(1, self.num_of_cities // cities_per_cell)
+        self.cell_size = max(np.sqrt(extent[0] * extent[1] / num_of_cells), extent.max() / num_of_cells)
+        self.origin = lower
+
+        cells = np.floor((self.coordinates - lower) / self.cell_size).astype(np.intp)
+        # The grid is sized from the cells themselves, extent // cell_size can round one below floor(extent / cell_size)
+        self.columns, self.rows = (cells.max(axis=0) + 1).tolist() if self.num_of_cities else (1, 1)
+        self.city_cells = cells
+        cell_ids = cells[:, 1] * self.columns + cells[:, 0]
+        order = np.argsort(cell_ids, kind='stable')
+        # Cities sorted by cell, the cities of cell c are cell_cities[cell_start[c]:cell_start[c + 1]]
+        self.cell_cities = order
+        self.cell_start = np.searchsorted(cell_ids[order], np.arange(self.rows * self.columns + 1))
+
+        # Removal state for nearest remaining city queries
+        self.xs = self.coordinates[:, 0].tolist()
+        self.ys = self.coordinates[:, 1].tolist()
+        self.cell_lists = [order[start:end].tolist() for start, end in zip(self.cell_start[:-1], self.cell_start[1:])]
+        self.alive = [True] * self.num_of_cities
+        self.alive_in_cell = np.bincount(cell_ids, minlength=self.rows * self.columns).tolist()
+        self.num_alive = self.num_of_cities
+
+    def cellOf(self, x, y):
+        column = min(max(int((x - self.origin[0]) // self.cell_size), 0), self.columns - 1)
+        row = min(max(int((y - self.origin[1]) // self.cell_size), 0), self.rows - 1)
+        return column, row
+
+    def remove(self, city):
+        """Remove a city from the nearest remaining city queries."""
+        if self.alive[city]:
+            self.alive[city] = False
+            column, row = self.city_cells[city]
+            self.alive_in_cell[row * self.columns + column] -= 1
+            self.num_alive -= 1
+
+    def nearest(self, x, y):
+        """Return the remaining city nearest to the point (x, y), or None if every city was removed."""
+        if self.num_alive == 0:
+            return None
+
+        column, row = self.cellOf(x, y)
+        best_city, best_distance = None, float('inf')
+        scanned_cells = 0
+        max_ring = max(self.columns, self.rows)
+
+        for ring in count():
+            # Every city in this ring is at least (ring - 1) cells away from the query point
+            if ring > max_ring or (ring > 0 and ((ring - 1) * self.cell_size) ** 2 >= best_distance):
+                break
+            # Far away from every remaining city, one vectorized pass over them is cheaper than more rings
+            if scanned_cells > 64 and scanned_cells > self.num_alive:
+                return self.nearestBruteForce(x, y)
+
+            for cell_column, cell_row in self.ringCells(column, row, ring):
+                scanned_cells += 1
+                cell = cell_row * self.columns + cell_column
+                if not self.alive_in_cell[cell]:
+                    continue
+                for city in self.cell_lists[cell]:
+                    if self.alive[city]:
+                        dx, dy = self.xs[city] - x, self.ys[city] - y
+                        distance = dx * dx + dy * dy
+                        if distance < best_distance:
+                            best_city, best_distance = city, distance
+
+        return best_city
+
+    def nearestBruteForce(self, x, y):
+        remaining = np.flatnonzero(self.alive)
+        distances = ((self.coordinates[remaining] - (x, y)) ** 2).sum(axis=1)
+        return int(remaining[np.argmin(distances)])
+
+    def ringCells(self, column, row, ring):
+        """Yield the in-bounds cells at Chebyshev distance 'ring' from (column, row)."""
+        if ring == 0:
+            yield column, row
+            return
+        for cell_column in range(max(column - ring, 0), min(column + ring, self.columns - 1) + 1):
+            if row - ring >= 0:
+                yield cell_column, row - ring
+            if row + ring < self.rows:
+                yield cell_column, row + ring
+        for cell_row in range(max(row - ring + 1, 0), min(row + ring - 1, self.rows - 1) + 1):
+            if column - ring >= 0:
+                yield column - ring, cell_row
+            if column + ring < self.columns:
+                yield column + ring, cell_row
+
+    def rectangleCities(self, first_column, last_column, first_row, last_row):
+        """All cities in the cells of the given (inclusive, clipped to the grid) column and row range."""
+        first_column, last_column = max(first_column, 0), min(last_column, self.columns - 1)
+        blocks = []
+        for cell_row in range(max(first_row, 0), min(last_row, self.rows - 1) + 1):
+            start = self.cell_start[cell_row * self.columns + first_column]
+            end = self.cell_start[cell_row * self.columns + last_column + 1]
+            blocks.append(self.cell_cities[start:end])
+        return np.concatenate(blocks) if blocks else np.empty(0, dtype=np.intp)
+
+    def kNearest(self, k, tile_size=TILE_SIZE):
+        """Build the k-nearest candidate list of every city (removals are ignored).
+
+        The grid is processed in square tiles of cells, each tile against the block of cells around it,
+        which is grown until the k-th candidate of every city is provably closer than anything outside the block.
+
+        returns:
+            np.ndarray: A (num_of_cities, k) array of city indices, each row sorted from nearest to farthest
+        """
+        k = min(k, self.num_of_cities - 1)
+        neighbors = np.empty((self.num_of_cities, max(k, 0)), dtype=np.intp)
+        if k <= 0:
+            return neighbors
+
+        covers_grid = max(self.columns, self.rows)
+        for first_row in range(0, self.rows, tile_size):
+            for first_column in range(0, self.columns, tile_size):
+                last_row, last_column = first_row + tile_size - 1, first_column + tile_size - 1
+                pending = self.rectangleCities(first_column, last_column, first_row, last_row)
+                # With CITIES_PER_CELL cities per cell the k nearest rarely fit within a single cell of margin
+                radius = 2
+                while len(pending):
+                    candidates = self.rectangleCities(first_column - radius, last_column + radius, first_row - radius, last_row + radius)
+                    if len(candidates) <= k and radius < covers_grid:
+                        radius += 1
+                        continue
+
+                    dx = self.coordinates[pending, 0][:, None] - self.coordinates[candidates, 0][None, :]
+                    dy = self.coordinates[pending, 1][:, None] - self.coordinates[candidates, 1][None, :]
+                    distances = dx * dx + dy * dy
+                    distances[pending[:, None] == candidates[None, :]] = np.inf
+                    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+                    order = np.argsort(nearest_distances, axis=1, kind='stable')
+                    nearest = np.take_along_axis(nearest, order, axis=1)
+
+                    # A city outside the block is at least 'radius' cells away, so farther candidates are not final yet
+                    done = (nearest_distances.max(axis=1) <= (radius * self.cell_size) ** 2) | (radius >= covers_grid)
+                    neighbors[pending[done]] = candidates[nearest[done]]
+                    pending = pending[~done]
+                    radius += 1
+
+        return neighbors
+
+def candidate_lists(city_coordinates, k=10):
+    """k-nearest neighbor candidate lists for the local search and crossover code, without a distance matrix."""
+    return SpatialGrid(city_coordinates).kNearest(k)
@@ -0,0 +1,92 @@
+import numpy as np
+import json
+import csv
+import os
+
+# Telemetry levels, every level records everything the lower levels record
+TELEMETRY_OFF = 0
+TELEMETRY_GENERATIONS = 1   # best, mean, diversity and evaluation count of every generation
+TELEMETRY_OPERATORS = 2     # plus the time spent in every operator of the main loop
+
+# Phases of a generation of the main loop, timed at TELEMETRY_OPERATORS
+OPERATORS = ('selection', 'crossover', 'mutation', 'evaluation', 'replacement')
+
+# Number of generation records buffered before they are written out
+BUFFER_CAPACITY = 1024
+
+GENERATION_DTYPE = np.dtype([('generation', np.int64), ('best', np.float64), ('mean', np.float64), ('diversity', np.float64),
+                             ('evaluations', np.int64)] + [(f'{operator}_time', np.float64) for operator in OPERATORS])
+
+class MetricsRecorder:
+    """Records per-generation metrics of a GA run into a preallocated ring buffer.
+
+    With an output path the buffer is written out in one batch every time it fills up (and on flush/close),
+    as CSV or, when the path ends with .json or .jsonl, as JSON lines. Without one the buffer keeps the
+    last 'capacity' generations in memory. At TELEMETRY_OFF nothing is recorded, and the main loop skips
+    computing the metrics altogether, so a disabled recorder costs one attribute check per generation.
+    """
+    def __init__(self, file_path=None, level=TELEMETRY_GENERATIONS, capacity=BUFFER_CAPACITY):
+        self.file_path = file_path
+        self.level = level
+        self.buffer = np.zeros(capacity, dtype=GENERATION_DTYPE)
+        self.size = 0
+        self.next = 0
+        self.file = None
+        self.writer = None
+
+    def recordGeneration(self, generation, best, mean, diversity, evaluations, timings=None):
+        """Store one generation, timings maps the names in OPERATORS to seconds (NaN when not timed)."""
+        if self.level <= TELEMETRY_OFF:
+            return
+        record = self.buffer[self.next]
+        record['generation'] = generation
+        record['best'] = best
+        record['mean'] = mean
+        record['diversity'] = diversity
+        record['evaluations'] = evaluations
+        for operator in OPERATORS:
+            record[f'{operator}_time'] = timings[operator] if timings else np.nan
+
+        self.next = (self.next + 1) % len(self.buffer)
+        self.size = min(self.size + 1, len(self.buffer))
+        if self.size == len(self.buffer) and self.file_path:
+            self.flush()
+
+    def records(self):
+        """The buffered records, oldest first."""
+        if self.size < len(self.buffer):
+            return self.buffer[:self.size].copy()
+        return np.roll(self.buffer, -self.next)
+
+    def flush(self):
+        """Write the buffered records to the output file in one batch and empty the buffer."""
+        if not self.file_path or not self.size:
+            return
+        records = self.records()
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            self.file = open(self.file_path, "w", newline="")
+            if not self.file_path.endswith(('.json', '.jsonl')):
+                self.writer = csv.writer(self.file)
+                self.writer.writerow(GENERATION_DTYPE.names)
+
+        rows = records.tolist()
+        if self.writer is not None:
+            self.writer.writerows(rows)
+        else:
+            # NaN is not valid JSON, untimed operators are written as null
+            self.file.write("".join(json.dumps({name: None if value != value else value for name, value in zip(GENERATION_DTYPE.names, row)}) + "\n"
+                                    for row in rows))
+        self.file.flush()
+        self.size = 0
+        self.next = 0
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def population_diversity(population_hashes):
+    """Fraction of distinct tours in a population, from the cached tour hashes."""
+    return len(np.unique(population_hashes)) / max(len(population_hashes), 1)